@@ -1,4 +1,5 @@
 import sys
+import atexit
 import pandas as pd
 import time
 from os.path import dirname, abspath
@@ -14,29 +15,20 @@ from Modelo.MotorInferencia.Motor_inferencia import (
     score_sustituto, 
     obtener_efectos,
     procesar_medicamento_actual,
-    buscar_alternativas
+    buscar_alternativas,
+    obtener_contexto
 )
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.preparacion_datos import preparar_datos
+from Modelo.MotorInferencia.cache_consultas import CacheConsultas
+from Modelo.MotorInferencia.memoria_resoluciones import cargar_resoluciones, ruta_resoluciones, resumen_etapas
 from Vista.presentacion_explicativa_main import (
     mostrar_resultado_final, 
     mostrar_analisis_detallado
 )
 
-def limpiar_y_convertir(valor):
-    """Convierte valores a string y limpia NaN/None, manteniendo números como números"""
-    if pd.isna(valor):
-        return ""
-    try:
-        # Intentar mantener como número si es posible
-        return float(valor) if str(valor).replace('.', '', 1).isdigit() else str(valor).strip()
-    except:
-        return str(valor).strip()
-
-def limpiar_dataframe(df):
-    """Limpia un dataframe manteniendo los tipos numéricos donde sea posible"""
-    for col in df.columns:
-        if df[col].dtype == object:  # Solo para columnas de texto
-            df[col] = df[col].apply(lambda x: limpiar_y_convertir(x))
-    return df
+# Respuestas de consultas repetidas (mismo medicamento, diagnóstico, razón y alérgenos)
+CACHE_CONSULTAS = CacheConsultas()
 
 def validar_entrada(prompt, tipo="texto", min_len=3):
     """
@@ -163,7 +155,7 @@ def solicitar_datos_paciente():
     
     return notas, diagnostico, med_input, razon 
 
-def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
+def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None, cache=CACHE_CONSULTAS):
     """
     Procesa el medicamento considerando la razón (alergia/desabastecimiento)
     
@@ -173,13 +165,17 @@ def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
         diagnostico: diagnóstico principal
         datos: diccionario con dataframes y listas necesarias
         razon: motivo de la sustitución ('alergia' o 'desabastecimiento')
+        cache: CacheConsultas donde se guardan las respuestas (None para no usarla)
     """
-    # Limpieza previa de datos manteniendo tipos numéricos (opcional pero recomendado)
-    if 'df_info' in datos and hasattr(datos['df_info'], 'copy'):
-        datos['df_info'] = limpiar_dataframe(datos['df_info'])
-    if 'df_sust' in datos and hasattr(datos['df_sust'], 'copy'):
-        datos['df_sust'] = limpiar_dataframe(datos['df_sust'])
-    
+    # Los datos se preparan una sola vez al cargarlos; aquí solo se verifica la marca
+    preparar_datos(datos)
+
+    if cache is None:
+        return calcular_respuesta(med_input, notas, diagnostico, datos, razon)
+    return cache.consultar(med_input, notas, diagnostico, datos, razon, calcular_respuesta)
+
+def calcular_respuesta(med_input, notas, diagnostico, datos, razon=None, contexto=None):
+    """Resuelve la consulta completa sin caché (datos ya preparados)"""
     # Obtener información del medicamento actual
     resultados = procesar_medicamento_actual(med_input, datos['df_sust'], datos['df_info'])
     
@@ -192,6 +188,9 @@ def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
     
     med_act_en, med_act_es, clase_act, review_act, composicion_act, comp_principal = resultados
     
+    # Notas, diagnóstico y alérgenos se analizan una sola vez para todos los candidatos
+    contexto = obtener_contexto(notas, diagnostico, datos['lista_alergenos'], contexto)
+
     # Obtener los pares de sustitutos
     sust_pairs = obtener_pares_sustitutos(med_act_en, datos['df_sust'])
     en_orden = []
@@ -202,7 +201,8 @@ def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
             es_name, en_name, notas, 
             diagnostico, clase_act, 
             datos['lista_alergenos'], datos['df_info'],
-            razon  # Pasar la razón al evaluador
+            razon,  # Pasar la razón al evaluador
+            contexto
         )
         en_orden.append((en_name, score, just))
     
@@ -217,12 +217,12 @@ def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
     # Buscar alternativas adicionales (también pasando la razón)
     alternativas = []
     if not validos:
-        fila_act = datos['df_info'][datos['df_info']["medicamento"].str.lower() == med_act_en.lower()].iloc[0]
+        fila_act = obtener_indice(datos['df_info']).fila_por_nombre(med_act_en)
         alternativas = buscar_alternativas(
         clase_act, diagnostico, fila_act, 
         med_act_en, sust_pairs, datos['df_info'], 
         notas, datos['lista_alergenos'],
-        razon
+        razon, contexto
     )
     
     response = {
@@ -239,25 +239,6 @@ def procesar_medicamento(med_input, notas, diagnostico, datos, razon=None):
     
     return response
 
-# Función auxiliar para limpiar datos (según la implementación del profesor)
-def limpiar_dataframe(df):
-    """Limpia un dataframe manteniendo los tipos numéricos donde sea posible"""
-    df_copy = df.copy()
-    for col in df_copy.columns:
-        if df_copy[col].dtype == object:  # Solo para columnas de texto
-            df_copy[col] = df_copy[col].apply(lambda x: limpiar_y_convertir(x))
-    return df_copy
-
-def limpiar_y_convertir(valor):
-    """Convierte valores a string y limpia NaN/None, manteniendo números como números"""
-    if pd.isna(valor):
-        return ""
-    try:
-        # Intentar mantener como número si es posible
-        return float(valor) if str(valor).replace('.', '', 1).isdigit() else str(valor).strip()
-    except:
-        return str(valor).strip()
-
 def mostrar_opciones_reintento():
     """Muestra opciones cuando falla el procesamiento"""
     print("\n" + "="*50)
@@ -279,9 +260,13 @@ def main():
         print(" SISTEMA EXPERTO DE SUSTITUCIÓN DE MEDICAMENTOS ".center(50, "="))
         print("="*50)
         
-        # Cargar y limpiar datos
-        datos = cargar_datos(configurar_rutas())
-        datos['lista_alergenos'] = [limpiar_y_convertir(a) for a in datos['lista_alergenos']]
+        # Cargar datos (ya preparados por cargar_datos)
+        rutas = configurar_rutas()
+        datos = cargar_datos(rutas)
+
+        # Resoluciones de medicamentos de sesiones anteriores; se guardan al salir
+        memoria = cargar_resoluciones(datos, rutas)
+        atexit.register(memoria.guardar, ruta_resoluciones(rutas))
 
         tiempos = []   # <--- aquí guardaremos cada tiempo de respuesta
         
@@ -370,7 +355,11 @@ def main():
             
             if len(tiempos) >= 3:
                 avg = sum(tiempos) / len(tiempos)
-                print(f"🔢 Tiempo promedio sobre {len(tiempos)} casos: {avg:.3f} s\n")
+                print(f"🔢 Tiempo promedio sobre {len(tiempos)} casos: {avg:.3f} s")
+                stats = CACHE_CONSULTAS.estadisticas()
+                print(f"🗃️ Caché de consultas: {stats['aciertos']} aciertos, {stats['fallos']} fallos "
+                      f"({stats['tasa_aciertos']:.0%})")
+                print(f"🔎 Resolución del medicamento por etapa: {resumen_etapas(memoria.estadisticas())}\n")
                 tiempos.clear()   # empieza a contar de nuevo si quieres repetir
             ##################TIEMPO##########################
 
@@ -15,28 +15,12 @@ from Modelo.MotorInferencia.Motor_inferencia_Data import (
     procesar_medicamento_actual,
     buscar_alternativas
 )
+from Modelo.MotorInferencia.preparacion_datos import preparar_datos
 from Vista.presentacion_explicativa import (
     mostrar_resultado_final, 
     mostrar_analisis_detallado
 )
 
-def limpiar_y_convertir(valor):
-    """Convierte valores a string y limpia NaN/None, manteniendo números como números"""
-    if pd.isna(valor):
-        return ""
-    try:
-        # Intentar mantener como número si es posible
-        return float(valor) if str(valor).replace('.', '', 1).isdigit() else str(valor).strip()
-    except:
-        return str(valor).strip()
-
-def limpiar_dataframe(df):
-    """Limpia un dataframe manteniendo los tipos numéricos donde sea posible"""
-    for col in df.columns:
-        if df[col].dtype == object:  # Solo para columnas de texto
-            df[col] = df[col].apply(lambda x: limpiar_y_convertir(x))
-    return df
-
 def validar_entrada(prompt, tipo="texto", min_len=3):
     """
     Valida la entrada del usuario con diferentes criterios según el tipo
@@ -96,9 +80,8 @@ def solicitar_datos_paciente():
 
 def procesar_medicamento(med_input, notas, diagnostico, datos):
     """Procesa un medicamento y devuelve resultados o None si no se encuentra"""
-    # Limpieza previa de datos manteniendo tipos numéricos
-    datos['df_info'] = limpiar_dataframe(datos['df_info'])
-    datos['df_sust'] = limpiar_dataframe(datos['df_sust'])
+    # Los datos se preparan una sola vez al cargarlos; aquí solo se verifica la marca
+    preparar_datos(datos)
     
     resultados = procesar_medicamento_actual(med_input, datos['df_sust'], datos['df_info'])
     if not resultados[0]:  # Si no se encontró el medicamento
@@ -167,9 +150,8 @@ def main():
         print(" SISTEMA EXPERTO DE SUSTITUCIÓN DE MEDICAMENTOS ".center(50, "="))
         print("="*50)
         
-        # Cargar y limpiar datos
+        # Cargar datos (ya preparados por cargar_datos)
         datos = cargar_datos(configurar_rutas())
-        datos['lista_alergenos'] = [limpiar_y_convertir(a) for a in datos['lista_alergenos']]
         
         while True:
             # Solicitar datos
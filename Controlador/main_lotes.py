@@ -0,0 +1,198 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import statistics
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from os.path import dirname, abspath
+
+# Configuración de rutas
+project_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(project_dir)
+
+from Vista.rutas import configurar_rutas, cargar_datos
+from Controlador.main import procesar_medicamento
+from Controlador.main_with_Data import verificar_datos_clinicos
+
+CAMPOS_SALIDA = [
+    "registro", "medicamento_input", "diagnostico", "razon", "status",
+    "medicamento", "recomendacion", "score", "justificacion", "fuente",
+    "n_sustitutos", "n_alternativas", "latencia_ms", "error"
+]
+
+# Datos cargados una sola vez por proceso trabajador
+_DATOS = None
+
+
+def inicializar_trabajador(usar_snapshot=True):
+    """Carga la base de conocimiento una vez en cada proceso del pool"""
+    global _DATOS
+    _DATOS = cargar_datos(configurar_rutas(), usar_snapshot=usar_snapshot)
+
+
+def separar_medicamentos(texto):
+    """Un registro puede listar varios medicamentos separados por comas"""
+    if pd.isna(texto):
+        return []
+    return [m.strip() for m in str(texto).split(",") if m.strip()]
+
+
+def procesar_registro(registro, med_input, notas, diagnostico, razon):
+    """Procesa un medicamento de un registro y devuelve una fila de resultados"""
+    fila = {
+        "registro": registro, "medicamento_input": med_input,
+        "diagnostico": diagnostico, "razon": razon or ""
+    }
+    t0 = time.perf_counter()
+    try:
+        resultado = procesar_medicamento(med_input, notas, diagnostico, _DATOS, razon)
+        if resultado.get("status") == "error":
+            fila.update(status="no_encontrado", error=resultado["message"])
+        else:
+            if resultado['validos']:
+                recomendacion, fuente = resultado['validos'][0], "sustituto_directo"
+            elif resultado['alternativas']:
+                recomendacion, fuente = resultado['alternativas'][0], "alternativa_terapeutica"
+            else:
+                recomendacion, fuente = None, ""
+            fila.update(
+                status="ok" if recomendacion else "sin_opciones",
+                medicamento=resultado['medicamento'],
+                recomendacion=recomendacion[0] if recomendacion else "",
+                score=recomendacion[1] if recomendacion else "",
+                justificacion=recomendacion[2] if recomendacion else "",
+                fuente=fuente,
+                n_sustitutos=len(resultado['sustitutos']),
+                n_alternativas=len(resultado['alternativas'])
+            )
+    except Exception as e:
+        fila.update(status="error", error=str(e))
+    fila["latencia_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    return fila
+
+
+def procesar_lote(lote, razon):
+    """Procesa un fragmento de registros dentro de un trabajador"""
+    filas = []
+    for registro, notas, meds, diagnostico in lote:
+        for med_input in separar_medicamentos(meds):
+            filas.append(procesar_registro(registro, med_input, notas, diagnostico, razon))
+    return filas
+
+
+def generar_lotes(ruta_entrada, tam_lote, filas_lectura=50000):
+    """Lee el CSV clínico por partes y produce fragmentos de registros"""
+    columnas = None
+    for parte in pd.read_csv(ruta_entrada, chunksize=filas_lectura):
+        if columnas is None:
+            columnas = verificar_datos_clinicos(parte)
+            if not columnas:
+                raise ValueError("clinical_data.csv no tiene las columnas requeridas")
+        registros = list(zip(
+            parte.index,
+            parte[columnas['notas_clinicas']].fillna("").astype(str),
+            parte[columnas['medicamentos']],
+            parte[columnas['diagnosticos']].fillna("No especificado").astype(str)
+        ))
+        for i in range(0, len(registros), tam_lote):
+            yield registros[i:i + tam_lote]
+
+
+class EscritorResultados:
+    """Escribe los resultados a medida que llegan, en CSV o JSONL según la extensión"""
+
+    def __init__(self, ruta_salida):
+        self.archivo = open(ruta_salida, "w", encoding="utf-8", newline="")
+        self.jsonl = str(ruta_salida).lower().endswith((".jsonl", ".json"))
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.archivo, fieldnames=CAMPOS_SALIDA)
+            self.writer.writeheader()
+
+    def escribir(self, filas):
+        for fila in filas:
+            if self.jsonl:
+                self.archivo.write(json.dumps(fila, ensure_ascii=False, default=str) + "\n")
+            else:
+                self.writer.writerow(fila)
+        self.archivo.flush()
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+def ejecutar_lotes(ruta_entrada, ruta_salida, procesos=None, tam_lote=25, razon=None, usar_snapshot=True):
+    """Reparte los registros clínicos entre procesos y devuelve las latencias por registro"""
+    # Generar el snapshot antes de lanzar el pool para que cada trabajador solo lo lea
+    if usar_snapshot:
+        cargar_datos(configurar_rutas())
+
+    procesos = procesos or os.cpu_count() or 1
+    escritor = EscritorResultados(ruta_salida)
+    latencias = []
+    estados = {}
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_trabajador,
+                                 initargs=(usar_snapshot,)) as pool:
+            max_pendientes = 2 * procesos
+            pendientes = set()
+
+            def recoger(listos):
+                for futuro in listos:
+                    filas = futuro.result()
+                    escritor.escribir(filas)
+                    for fila in filas:
+                        latencias.append(fila["latencia_ms"])
+                        estados[fila["status"]] = estados.get(fila["status"], 0) + 1
+
+            for lote in generar_lotes(ruta_entrada, tam_lote):
+                pendientes.add(pool.submit(procesar_lote, lote, razon))
+                if len(pendientes) >= max_pendientes:
+                    listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    recoger(listos)
+            recoger(pendientes)
+    finally:
+        escritor.cerrar()
+
+    mostrar_resumen(latencias, estados, time.perf_counter() - t0, ruta_salida)
+    return latencias
+
+
+def mostrar_resumen(latencias, estados, total_s, ruta_salida):
+    """Imprime rendimiento global y latencia por registro"""
+    print("\n" + "="*60)
+    print(" RESUMEN DEL PROCESAMIENTO POR LOTES ".center(60, "="))
+    print("="*60)
+    print(f"📁 Resultados: {ruta_salida}")
+    print(f"🔢 Consultas procesadas: {len(latencias)} " +
+          "(" + ", ".join(f"{k}: {v}" for k, v in sorted(estados.items())) + ")")
+    print(f"⌛ Tiempo total: {total_s:.2f} s")
+    if latencias:
+        ordenadas = sorted(latencias)
+        p95 = ordenadas[min(len(ordenadas) - 1, int(0.95 * len(ordenadas)))]
+        print(f"🚀 Rendimiento: {len(latencias) / total_s:.1f} consultas/s")
+        print(f"📊 Latencia por registro (ms): media {statistics.mean(latencias):.1f} | "
+              f"mediana {statistics.median(latencias):.1f} | p95 {p95:.1f} | máx {ordenadas[-1]:.1f}")
+
+
+def main():
+    rutas = configurar_rutas()
+    parser = argparse.ArgumentParser(description="Sustitución de medicamentos por lotes sobre clinical_data.csv")
+    parser.add_argument("--entrada", default=str(rutas['clinical']), help="CSV clínico de entrada")
+    parser.add_argument("--salida", default="resultados_lote.jsonl", help="Archivo de salida (.csv o .jsonl)")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos (por defecto, CPUs)")
+    parser.add_argument("--tam-lote", type=int, default=25, help="Registros por fragmento enviado a cada proceso")
+    parser.add_argument("--razon", choices=["alergia", "desabastecimiento"], default=None,
+                        help="Motivo de sustitución aplicado a todos los registros")
+    parser.add_argument("--sin-snapshot", action="store_true", help="Leer siempre los CSV")
+    args = parser.parse_args()
+
+    ejecutar_lotes(args.entrada, args.salida, args.procesos, args.tam_lote, args.razon,
+                   usar_snapshot=not args.sin_snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import atexit
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from urllib.parse import urlsplit, parse_qs
+from os.path import dirname, abspath
+
+# Configuración de rutas
+project_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(project_dir)
+
+from Vista.rutas import configurar_rutas, cargar_datos
+from Controlador.main import procesar_medicamento, CACHE_CONSULTAS
+from Modelo.MotorInferencia.Motor_inferencia import procesar_medicamento_actual
+from Modelo.MotorInferencia.memoria_resoluciones import (
+    cargar_resoluciones, ruta_resoluciones, obtener_memoria_resoluciones, ruta_parcial, guardar_con_parciales
+)
+
+# Límites de las peticiones HTTP
+MAX_CUERPO = 64 * 1024
+MAX_CABECERAS = 100
+TIEMPO_LECTURA = 30
+
+ESTADOS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+# Datos cargados una sola vez por proceso (el servidor o cada trabajador del pool)
+_DATOS = None
+
+
+def inicializar_trabajador(usar_snapshot=True, ruta_memoria=None):
+    """
+    Carga la base de conocimiento y las resoluciones guardadas una vez en cada
+    proceso del pool. Al terminar, el proceso deja sus resoluciones en un archivo
+    parcial que el servidor une al archivo de resoluciones cuando se detiene.
+    """
+    global _DATOS
+    rutas = configurar_rutas()
+    _DATOS = cargar_datos(rutas, usar_snapshot=usar_snapshot)
+
+    ruta_memoria = ruta_memoria or ruta_resoluciones(rutas)
+    memoria = obtener_memoria_resoluciones(_DATOS['df_info'], _DATOS['df_sust'])
+    memoria.cargar(ruta_memoria)
+    # Los procesos del pool no ejecutan atexit; los finalizadores de multiprocessing sí
+    Finalize(None, memoria.guardar, args=(ruta_parcial(ruta_memoria, os.getpid()),), exitpriority=10)
+
+
+class ErrorPeticion(Exception):
+    """Error de la petición que se devuelve al cliente con su código HTTP"""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def campo_texto(consulta, nombre, obligatorio=True):
+    """Valor de texto de la consulta; sin él la petición es inválida"""
+    valor = consulta.get(nombre)
+    if valor is None and not obligatorio:
+        return None
+    if not isinstance(valor, str) or not valor.strip():
+        raise ErrorPeticion(400, f"Falta el campo de texto '{nombre}'")
+    return valor
+
+
+def resolver_medicamento(med_input, datos):
+    """Medicamento reconocido para la entrada (sin buscar sustitutos) o None"""
+    med_en, med_es, clase, review, composicion, componente = procesar_medicamento_actual(
+        med_input, datos['df_sust'], datos['df_info']
+    )
+    if not med_en:
+        return None
+    return {
+        'medicamento_en': med_en,
+        'medicamento': med_es,
+        'clase': clase,
+        'composicion': composicion,
+        'componente': componente,
+        'review': review,
+    }
+
+
+def ejecutar_consulta(ruta, med_input, notas=None, diagnostico=None, razon=None):
+    """
+    Atiende /substitute o /resolve con los datos del proceso actual.
+    Se ejecuta en el pool de trabajadores; devuelve (estado HTTP, respuesta).
+    """
+    if ruta == '/resolve':
+        resultado = resolver_medicamento(med_input, _DATOS)
+        if resultado is None:
+            return 404, {"status": "error", "message": "No se encontró información del medicamento ingresado"}
+        return 200, resultado
+
+    resultado = procesar_medicamento(med_input, notas, diagnostico, _DATOS, razon)
+    if resultado.get("status") == "error":
+        return 404, resultado
+    return 200, resultado
+
+
+def validar_consulta(ruta, consulta):
+    """Argumentos de ejecutar_consulta a partir del JSON recibido"""
+    med_input = campo_texto(consulta, 'medicamento')
+    if ruta == '/resolve':
+        return (ruta, med_input)
+
+    notas = consulta.get('notas') or ""
+    if not isinstance(notas, str):
+        raise ErrorPeticion(400, "notas debe ser texto")
+    razon = campo_texto(consulta, 'razon', obligatorio=False)
+    if razon is not None and razon.lower() not in ('alergia', 'desabastecimiento'):
+        raise ErrorPeticion(400, "razon debe ser 'alergia' o 'desabastecimiento'")
+    return (ruta, med_input, notas, campo_texto(consulta, 'diagnostico'), razon)
+
+
+def a_json(respuesta):
+    """Serializa la respuesta; los escalares de numpy se convierten a tipos de Python"""
+    def convertir(valor):
+        if hasattr(valor, "item"):
+            return valor.item()
+        return str(valor)
+    return json.dumps(respuesta, ensure_ascii=False, default=convertir).encode("utf-8")
+
+
+class ServidorInferencia:
+    """
+    Servicio HTTP/JSON sobre asyncio que comparte una base de conocimiento ya cargada.
+    Las conexiones se atienden en el bucle de eventos y las consultas (CPU) se
+    ejecutan en el pool de trabajadores, para que una consulta lenta no bloquee al resto.
+
+        GET  /health                      estado del servicio y de la caché (solo con hilos)
+        GET  /resolve?medicamento=...     medicamento reconocido
+        POST /resolve     {"medicamento"}
+        POST /substitute  {"medicamento", "diagnostico", "notas", "razon"}
+    """
+
+    RUTAS_CONSULTA = ('/substitute', '/resolve')
+
+    def __init__(self, datos, executor):
+        self.datos = datos
+        self.executor = executor
+        self.inicio = time.time()
+        self.atendidas = 0
+
+    def salud(self):
+        salud = {
+            "status": "ok",
+            "version": self.datos.get('version'),
+            "medicamentos": len(self.datos['df_info']),
+            "sustitutos": len(self.datos['df_sust']),
+            "activo_s": round(time.time() - self.inicio, 1),
+            "consultas_atendidas": self.atendidas,
+            "trabajadores": "procesos" if isinstance(self.executor, ProcessPoolExecutor) else "hilos",
+        }
+        # Con procesos cada trabajador tiene su propia caché: la del servidor no se usa
+        if salud["trabajadores"] == "hilos":
+            cache = CACHE_CONSULTAS.estadisticas()
+            salud["cache"] = {"aciertos": cache["aciertos"], "fallos": cache["fallos"], "entradas": cache["entradas"]}
+        return salud
+
+    async def responder(self, metodo, destino, cuerpo):
+        """Devuelve (estado HTTP, respuesta) para la petición"""
+        partes = urlsplit(destino)
+        ruta = partes.path.rstrip('/') or '/'
+
+        if ruta == '/health':
+            if metodo != 'GET':
+                raise ErrorPeticion(405, "Use GET en /health")
+            return 200, self.salud()
+
+        if ruta not in self.RUTAS_CONSULTA:
+            raise ErrorPeticion(404, f"Ruta desconocida: {ruta}")
+
+        if metodo == 'GET' and ruta == '/resolve':
+            consulta = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        elif metodo == 'POST':
+            try:
+                consulta = json.loads(cuerpo or b"{}")
+            except ValueError:
+                raise ErrorPeticion(400, "El cuerpo no es JSON válido")
+            if not isinstance(consulta, dict):
+                raise ErrorPeticion(400, "El cuerpo debe ser un objeto JSON")
+        else:
+            raise ErrorPeticion(405, f"Método no permitido en {ruta}")
+
+        argumentos = validar_consulta(ruta, consulta)
+        loop = asyncio.get_running_loop()
+        estado, respuesta = await loop.run_in_executor(self.executor, ejecutar_consulta, *argumentos)
+        self.atendidas += 1
+        return estado, respuesta
+
+    async def leer_peticion(self, reader):
+        """Lee una petición HTTP/1.1; devuelve (método, destino, cabeceras, cuerpo) o None si se cerró"""
+        linea = await asyncio.wait_for(reader.readline(), TIEMPO_LECTURA)
+        if not linea.strip():
+            return None
+        try:
+            metodo, destino, _ = linea.decode("latin-1").split()
+        except ValueError:
+            raise ErrorPeticion(400, "Línea de petición inválida")
+
+        cabeceras = {}
+        while True:
+            linea = await asyncio.wait_for(reader.readline(), TIEMPO_LECTURA)
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            if len(cabeceras) >= MAX_CABECERAS:
+                raise ErrorPeticion(400, "Demasiadas cabeceras")
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        try:
+            longitud = int(cabeceras.get("content-length", 0))
+        except ValueError:
+            raise ErrorPeticion(400, "Content-Length inválido")
+        if longitud > MAX_CUERPO:
+            raise ErrorPeticion(413, "Cuerpo demasiado grande")
+        cuerpo = await asyncio.wait_for(reader.readexactly(longitud), TIEMPO_LECTURA) if longitud > 0 else b""
+        return metodo.upper(), destino, cabeceras, cuerpo
+
+    async def atender_conexion(self, reader, writer):
+        """Atiende peticiones de una conexión (keep-alive) hasta que el cliente la cierra"""
+        try:
+            while True:
+                mantener = False
+                try:
+                    peticion = await self.leer_peticion(reader)
+                    if peticion is None:
+                        break
+                    metodo, destino, cabeceras, cuerpo = peticion
+                    mantener = cabeceras.get("connection", "").lower() != "close"
+                    estado, respuesta = await self.responder(metodo, destino, cuerpo)
+                except ErrorPeticion as e:
+                    estado, respuesta = e.estado, {"status": "error", "message": str(e)}
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    estado, respuesta = 500, {"status": "error", "message": f"Error interno: {e}"}
+
+                contenido = a_json(respuesta)
+                writer.write(
+                    f"HTTP/1.1 {estado} {ESTADOS.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(contenido)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + contenido
+                )
+                await writer.drain()
+                if not mantener:
+                    break
+        finally:
+            writer.close()
+
+    async def iniciar(self, host="127.0.0.1", puerto=8765):
+        """Abre el socket de escucha y devuelve el asyncio.Server"""
+        return await asyncio.start_server(self.atender_conexion, host, puerto)
+
+
+def crear_executor(hilos=4, procesos=0, usar_snapshot=True, ruta_memoria=None):
+    """
+    Pool de trabajadores para las consultas. Con hilos comparten los datos y las
+    cachés del servidor; con procesos cada trabajador carga su propia copia.
+    """
+    if procesos:
+        return ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_trabajador,
+                                   initargs=(usar_snapshot, ruta_memoria))
+    return ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="consulta")
+
+
+async def servir(host, puerto, hilos, procesos, usar_snapshot):
+    global _DATOS
+    rutas = configurar_rutas()
+    _DATOS = cargar_datos(rutas, usar_snapshot=usar_snapshot)
+
+    # Resoluciones de medicamentos de sesiones anteriores; se guardan al salir,
+    # junto con las de los procesos trabajadores (que terminan antes)
+    memoria = cargar_resoluciones(_DATOS, rutas)
+    atexit.register(guardar_con_parciales, memoria, ruta_resoluciones(rutas))
+
+    with crear_executor(hilos, procesos, usar_snapshot, ruta_resoluciones(rutas)) as executor:
+        servidor = await ServidorInferencia(_DATOS, executor).iniciar(host, puerto)
+        direcciones = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in servidor.sockets)
+        print(f"🌐 Servicio de inferencia escuchando en {direcciones}")
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de sustitución de medicamentos")
+    parser.add_argument("--host", default="127.0.0.1", help="Interfaz de escucha (0.0.0.0 para la red local)")
+    parser.add_argument("--puerto", type=int, default=8765, help="Puerto TCP")
+    parser.add_argument("--hilos", type=int, default=4, help="Hilos del pool de consultas")
+    parser.add_argument("--procesos", type=int, default=0,
+                        help="Usar un pool de procesos en lugar de hilos (cada uno carga los datos)")
+    parser.add_argument("--sin-snapshot", action="store_true", help="Leer siempre los CSV")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.hilos, args.procesos, not args.sin_snapshot))
+    except KeyboardInterrupt:
+        print("\n👋 Servicio detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Configuración de rutas
+project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(project_dir)
+
+from Modelo.BaseConocimiento import union_med, union_sustitutos
+from Modelo.BaseConocimiento.snapshot import firma_fuentes, fuentes_vigentes
+from Modelo.ReglasClinicas import alergenos
+from Modelo.dataset import normalizacion_limpieza as limpieza
+
+# Incrementar cuando cambie el formato del manifiesto o de las cachés de filas
+VERSION_CONSTRUCCION = 1
+NOMBRE_MANIFIESTO = "manifiesto_construccion.json"
+CARPETA_CACHES = ".construccion"
+RUTA_MODELO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class CacheFilas:
+    """
+    Filas derivadas de un paso de construcción, indexadas por el hash de la fila
+    de origen (pd.util.hash_pandas_object). Al reconstruir solo se transforman
+    las filas nuevas o modificadas; las que ya no aparecen se eliminan al guardar.
+    La transformación debe ser fila a fila: una fila derivada por fila de origen.
+    """
+
+    def __init__(self, ruta, firma=None):
+        self.ruta = Path(ruta)
+        self.firma = firma
+        self.columnas_origen = None
+        self.columnas = None
+        self.filas = {}
+        self.usadas = set()
+        self.procesadas = 0
+        self.reutilizadas = 0
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, "rb") as f:
+                contenido = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        if contenido.get("version") == VERSION_CONSTRUCCION and contenido.get("firma") == self.firma:
+            self.columnas_origen = contenido["columnas_origen"]
+            self.columnas = contenido["columnas"]
+            self.filas = contenido["filas"]
+
+    def aplicar(self, df, transformar):
+        """Devuelve transformar(df) reutilizando las filas derivadas ya conocidas"""
+        if self.columnas_origen is not None and self.columnas_origen != list(df.columns):
+            self.filas.clear()  # cambió el formato de origen: nada de lo guardado sirve
+        self.columnas_origen = list(df.columns)
+        if df.empty and self.columnas is None:
+            return transformar(df)
+
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        nuevas = np.fromiter((h not in self.filas for h in hashes), dtype=bool, count=len(hashes))
+        if nuevas.any():
+            derivadas = transformar(df[nuevas])
+            if self.columnas is not None and self.columnas != list(derivadas.columns):
+                self.filas.clear()
+                nuevas[:] = True
+                derivadas = transformar(df)
+            self.columnas = list(derivadas.columns)
+            self.filas.update(zip(hashes[nuevas], derivadas.itertuples(index=False, name=None)))
+
+        self.usadas.update(hashes)
+        self.procesadas += int(nuevas.sum())
+        self.reutilizadas += int(len(hashes) - nuevas.sum())
+        return pd.DataFrame.from_records([self.filas[h] for h in hashes], columns=self.columnas, index=df.index)
+
+    def guardar(self):
+        """Guarda solo las filas usadas en esta construcción y devuelve cuántas se eliminaron"""
+        eliminadas = len(self.filas) - len(self.usadas & self.filas.keys())
+        self.filas = {h: fila for h, fila in self.filas.items() if h in self.usadas}
+        contenido = {
+            "version": VERSION_CONSTRUCCION, "firma": self.firma,
+            "columnas_origen": self.columnas_origen, "columnas": self.columnas, "filas": self.filas,
+        }
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta.with_name(self.ruta.name + ".tmp")
+        with open(temporal, "wb") as f:
+            pickle.dump(contenido, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, self.ruta)
+        return eliminadas
+
+    def estadisticas(self, eliminadas):
+        return {"procesadas": self.procesadas, "reutilizadas": self.reutilizadas, "eliminadas": eliminadas}
+
+
+def escribir_csv(df, ruta):
+    """Escribe el CSV de forma atómica solo si su contenido cambia; indica si lo escribió"""
+    contenido = df.to_csv(index=False).encode("utf-8")
+    ruta = Path(ruta)
+    if ruta.exists() and ruta.read_bytes() == contenido:
+        return False
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+    return True
+
+
+class ConstruccionIncremental:
+    """
+    Reconstruye la base de conocimiento a partir de los datasets traducidos:
+    normalización -> medicamentos_info / sustitutos -> posibles alérgenos -> snapshot.
+    El manifiesto guarda la firma de las entradas y salidas de cada paso: un paso
+    cuyas entradas no cambiaron no se ejecuta, y uno que sí cambió solo procesa
+    las filas nuevas o modificadas (CacheFilas).
+    """
+
+    def __init__(self, raiz=RUTA_MODELO, completa=False):
+        self.raiz = Path(raiz)
+        self.carpeta = self.raiz / "BaseConocimiento"
+        self.ruta_manifiesto = self.carpeta / NOMBRE_MANIFIESTO
+        self.completa = completa
+        self.manifiesto = {"version": VERSION_CONSTRUCCION, "pasos": {}}
+        if not completa and self.ruta_manifiesto.exists():
+            try:
+                manifiesto = json.loads(self.ruta_manifiesto.read_text(encoding="utf-8"))
+                if manifiesto.get("version") == VERSION_CONSTRUCCION:
+                    self.manifiesto = manifiesto
+            except ValueError:
+                pass
+        self.resumen = []
+
+    def cache(self, nombre, firma=None):
+        ruta = self.carpeta / CARPETA_CACHES / f"{nombre}.pkl"
+        if self.completa and ruta.exists():
+            ruta.unlink()
+        return CacheFilas(ruta, firma)
+
+    def ejecutar_paso(self, nombre, entradas, salidas, construir):
+        """
+        Ejecuta construir() si alguna entrada o salida cambió desde la última vez.
+        construir devuelve (estadísticas, salida_modificada). Indica si el paso modificó salidas.
+        """
+        faltantes = [str(r) for r in entradas.values() if not Path(r).exists()]
+        if faltantes:
+            self.resumen.append((nombre, f"omitido, falta {', '.join(faltantes)}"))
+            return False
+
+        registro = self.manifiesto["pasos"].get(nombre)
+        if (registro and all(Path(r).exists() for r in salidas.values())
+                and fuentes_vigentes(registro["entradas"], entradas)
+                and fuentes_vigentes(registro["salidas"], salidas)):
+            self.resumen.append((nombre, "sin cambios"))
+            return False
+
+        t0 = time.perf_counter()
+        estadisticas, modificada = construir()
+        segundos = time.perf_counter() - t0
+        self.manifiesto["pasos"][nombre] = {
+            "entradas": firma_fuentes(entradas),
+            "salidas": firma_fuentes(salidas),
+            **estadisticas,
+            "segundos": round(segundos, 3),
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.resumen.append((nombre, f"{estadisticas['procesadas']} filas procesadas, "
+                                     f"{estadisticas['reutilizadas']} reutilizadas, "
+                                     f"{estadisticas['eliminadas']} eliminadas "
+                                     f"({'actualizado' if modificada else 'sin cambios en la salida'}, {segundos:.2f} s)"))
+        return modificada
+
+    def normalizacion(self, dataset):
+        """Normaliza y limpia un dataset traducido (normalizacion_limpieza.py)"""
+        entrada, salida = limpieza.rutas_dataset(dataset["archivo_entrada"], dataset["archivo_salida"], self.raiz)
+        nombre = "normalizacion_" + Path(dataset["archivo_salida"]).stem
+
+        def construir():
+            df = pd.read_csv(entrada, low_memory=False)
+            columnas = limpieza.columnas_a_normalizar(df, dataset["archivo_salida"])
+            cache = self.cache(nombre, firma=columnas)
+            df = cache.aplicar(df, lambda parte: limpieza.normalizar_dataframe(parte, columnas))
+            df = limpieza.eliminar_duplicados(df, dataset["columnas_clave"])
+            modificada = escribir_csv(df, salida)
+            return cache.estadisticas(cache.guardar()), modificada
+
+        return self.ejecutar_paso(nombre, {"entrada": entrada}, {"salida": salida}, construir)
+
+    def medicamentos_info(self):
+        """Une drogas y medicamentos en medicamentos_info.csv (union_med.py)"""
+        entradas = {"drug": self.raiz / "dataset" / "drug_data.csv",
+                    "medicine": self.raiz / "dataset" / "medicine_data_limpio.csv"}
+        salida = self.carpeta / "medicamentos_info.csv"
+
+        def construir():
+            cache = self.cache("union_med")
+            df_drug = union_med.leer_drug(entradas["drug"])
+            df_medicine = union_med.leer_medicine(
+                entradas["medicine"], set(df_drug["medicamento"].dropna()),
+                reducir=lambda parte: cache.aplicar(parte, union_med.reducir_medicine)
+            )
+            modificada = escribir_csv(union_med.unir_info(df_drug, df_medicine), salida)
+            return cache.estadisticas(cache.guardar()), modificada
+
+        return self.ejecutar_paso("union_med", entradas, {"salida": salida}, construir)
+
+    def sustitutos(self):
+        """Tabla de sustitutos en inglés y español (union_sustitutos.py)"""
+        entrada = self.raiz / "dataset" / "medicine_data_limpio.csv"
+        salida = self.carpeta / "sustitutos_medicamentos.csv"
+
+        def construir():
+            cache = self.cache("union_sustitutos")
+            df = pd.read_csv(entrada, usecols=union_sustitutos.COLUMNAS_MEDICINE)
+            df = cache.aplicar(df[union_sustitutos.COLUMNAS_MEDICINE], union_sustitutos.construir_sustitutos)
+            modificada = escribir_csv(df, salida)
+            return cache.estadisticas(cache.guardar()), modificada
+
+        return self.ejecutar_paso("union_sustitutos", {"medicine": entrada}, {"salida": salida}, construir)
+
+    def alergenos(self):
+        """Posibles alérgenos extraídos de las composiciones (alergenos.py)"""
+        entrada = self.carpeta / "medicamentos_info.csv"
+        salida = self.raiz / "ReglasClinicas" / "posibles_alergenos.csv"
+
+        def componentes(parte):
+            return pd.DataFrame({"componentes": [tuple(sorted(alergenos.componentes_de(c)))
+                                                 for c in parte["composicion"]]})
+
+        def construir():
+            cache = self.cache("alergenos")
+            composiciones = pd.read_csv(entrada, usecols=["composicion"])["composicion"].dropna()
+            derivadas = cache.aplicar(composiciones.to_frame(), componentes)
+            unicos = set().union(*derivadas["componentes"]) if len(derivadas) else set()
+            modificada = escribir_csv(alergenos.tabla_alergenos(unicos), salida)
+            return cache.estadisticas(cache.guardar()), modificada
+
+        return self.ejecutar_paso("alergenos", {"info": entrada}, {"salida": salida}, construir)
+
+    def rutas_base_conocimiento(self):
+        return {
+            'info': self.carpeta / "medicamentos_info.csv",
+            'sustitutos': self.carpeta / "sustitutos_medicamentos.csv",
+            'alergenos': self.raiz / "ReglasClinicas" / "posibles_alergenos.csv",
+            'clinical': self.raiz / "01Hechos" / "clinical_data.csv",
+        }
+
+    def snapshot(self):
+        """Regenera el snapshot de la base de conocimiento si alguna de sus fuentes cambió"""
+        from Vista.rutas import cargar_datos
+        from Modelo.BaseConocimiento.snapshot import ruta_snapshot
+
+        rutas = self.rutas_base_conocimiento()
+        if not all(r.exists() for r in rutas.values()):
+            self.resumen.append(("snapshot", "omitido, faltan archivos de la base de conocimiento"))
+            return
+        antes = ruta_snapshot(rutas).stat().st_mtime_ns if ruta_snapshot(rutas).exists() else None
+        cargar_datos(rutas)
+        despues = ruta_snapshot(rutas).stat().st_mtime_ns if ruta_snapshot(rutas).exists() else None
+        self.resumen.append(("snapshot", "regenerado" if despues != antes else "vigente"))
+
+    def ejecutar(self, actualizar_snapshot=True):
+        """Ejecuta todos los pasos en orden de dependencias y guarda el manifiesto"""
+        for dataset in limpieza.DATASETS:
+            self.normalizacion(dataset)
+        self.medicamentos_info()
+        self.sustitutos()
+        self.alergenos()
+        if actualizar_snapshot:
+            self.snapshot()
+
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_manifiesto.with_name(self.ruta_manifiesto.name + ".tmp")
+        temporal.write_text(json.dumps(self.manifiesto, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(temporal, self.ruta_manifiesto)
+        return self.resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construcción incremental de la base de conocimiento")
+    parser.add_argument("--raiz", default=RUTA_MODELO, help="Carpeta Modelo/ con los datasets")
+    parser.add_argument("--completa", action="store_true", help="Ignorar el manifiesto y reconstruir todo")
+    parser.add_argument("--sin-snapshot", action="store_true", help="No regenerar el snapshot")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    resumen = ConstruccionIncremental(args.raiz, args.completa).ejecutar(not args.sin_snapshot)
+    for paso, detalle in resumen:
+        print(f"🔁 {paso}: {detalle}")
+    print(f"✅ Base de conocimiento actualizada en {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import pickle
+import hashlib
+import platform
+from pathlib import Path
+import pandas as pd
+
+# Incrementar cuando cambie la estructura de los datos preparados
+VERSION_SNAPSHOT = 3
+NOMBRE_SNAPSHOT = "base_conocimiento.snapshot.pkl"
+
+
+def ruta_snapshot(rutas):
+    """
+    Ruta del snapshot binario. Se guarda junto a los CSV de la base de conocimiento;
+    en el ejecutable de PyInstaller se guarda junto al .exe, porque la carpeta
+    temporal de extracción se borra en cada ejecución.
+    """
+    if getattr(sys, "frozen", False):
+        return Path(sys.executable).resolve().parent / NOMBRE_SNAPSHOT
+    return Path(rutas['info']).parent / NOMBRE_SNAPSHOT
+
+
+def _hash_archivo(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for parte in iter(lambda: f.read(bloque), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def _estado_archivo(ruta):
+    st = os.stat(ruta)
+    return st.st_size, st.st_mtime_ns
+
+
+def firma_fuentes(rutas):
+    """Tamaño, fecha de modificación y hash SHA-256 de cada CSV fuente"""
+    firma = {}
+    for nombre, ruta in sorted(rutas.items()):
+        tam, mtime = _estado_archivo(ruta)
+        firma[nombre] = {"tam": tam, "mtime": mtime, "sha256": _hash_archivo(ruta)}
+    return firma
+
+
+def _cabecera(firma):
+    huella = hashlib.sha256(
+        "|".join(f"{k}:{v['sha256']}" for k, v in sorted(firma.items())).encode()
+    ).hexdigest()
+    return {
+        "version": VERSION_SNAPSHOT,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "fuentes": firma,
+        "huella": huella,
+    }
+
+
+def _es_compatible(cabecera):
+    return (
+        isinstance(cabecera, dict)
+        and cabecera.get("version") == VERSION_SNAPSHOT
+        and cabecera.get("python") == platform.python_version()
+        and cabecera.get("pandas") == pd.__version__
+    )
+
+
+def fuentes_vigentes(fuentes, rutas):
+    """
+    Comprueba que los archivos no cambiaron respecto a su firma (firma_fuentes).
+    Si tamaño y fecha coinciden no se lee nada; si la fecha cambió
+    (p. ej. al extraer el .exe) se compara el hash del contenido.
+    """
+    if set(fuentes) != set(rutas):
+        return False
+    for nombre, ruta in rutas.items():
+        guardado = fuentes[nombre]
+        tam, mtime = _estado_archivo(ruta)
+        if tam != guardado["tam"]:
+            return False
+        if mtime != guardado["mtime"] and _hash_archivo(ruta) != guardado["sha256"]:
+            return False
+    return True
+
+
+def cargar_snapshot(rutas):
+    """Devuelve los datos preparados del snapshot o None si no existe o está desactualizado"""
+    ruta = ruta_snapshot(rutas)
+    if not ruta.exists():
+        return None
+    try:
+        with open(ruta, "rb") as f:
+            cabecera = pickle.load(f)
+            if not _es_compatible(cabecera) or not fuentes_vigentes(cabecera.get("fuentes", {}), rutas):
+                return None
+            datos = pickle.load(f)
+        datos['version'] = cabecera["huella"]
+        return datos
+    except Exception as e:
+        print(f"⚠️ Snapshot descartado ({e}), se leerán los CSV")
+        return None
+
+
+def guardar_snapshot(rutas, datos):
+    """Escribe el snapshot de forma atómica y devuelve la huella de las fuentes"""
+    ruta = ruta_snapshot(rutas)
+    cabecera = _cabecera(firma_fuentes(rutas))
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    try:
+        with open(temporal, "wb") as f:
+            pickle.dump(cabecera, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el snapshot: {e}")
+        try:
+            temporal.unlink()
+        except OSError:
+            pass
+    return cabecera["huella"]
@@ -1,35 +1,16 @@
-import pandas as pd
 import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
 
-# Crear carpeta si no existe
-output_folder = r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\BaseConocimiento"
-os.makedirs(output_folder, exist_ok=True)
-
-# Cargar archivos base
-df_drug = pd.read_csv(r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\dataset\drug_data.csv")
-df_medicine = pd.read_csv(r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\dataset\medicine_data_limpio.csv")
-
-# Unificar columna clave
-df_drug.rename(columns={"nombre_medicamento": "medicamento"}, inplace=True)
-df_medicine.rename(columns={"name": "medicamento"}, inplace=True)
-
-# Unir los datos por medicamento
-df_info = pd.merge(df_drug, df_medicine, on="medicamento", how="outer")
-
-# Agrupar los efectos secundarios extendidos
-efectos_cols = [col for col in df_info.columns if "sideEffect" in col]
-df_info["efectos_secundarios_detallados"] = df_info[efectos_cols].apply(
-    lambda row: ', '.join([str(val) for val in row if pd.notnull(val)]), axis=1
-)
-
-# Agrupar los usos clínicos extendidos
-usos_cols = [col for col in df_info.columns if "use" in col and "_es" in col]
-df_info["usos_clinicos_ext"] = df_info[usos_cols].apply(
-    lambda row: ', '.join([str(val) for val in row if pd.notnull(val)]), axis=1
-)
+# Rutas por defecto, relativas a Modelo/
+ruta_modelo = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUTA_DRUG = os.path.join(ruta_modelo, "dataset", "drug_data.csv")
+RUTA_MEDICINE = os.path.join(ruta_modelo, "dataset", "medicine_data_limpio.csv")
+RUTA_SALIDA = os.path.join(ruta_modelo, "BaseConocimiento", "medicamentos_info.csv")
 
-# Seleccionar columnas limpias
-df_final = df_info[[ 
+COLUMNAS_FINALES = [
     "medicamento",
     "composicion",
     "usos",
@@ -37,18 +18,124 @@ df_final = df_info[[
     "review_excelente",
     "efectos_secundarios_detallados",
     "usos_clinicos_ext",
-    "Chemical Class_es",
-    "Therapeutic Class_es"
-]]
+    "clase quimica",
+    "clase terapeutica"
+]
 
-df_final.rename(columns={
+CLASES = {
     "Chemical Class_es": "clase quimica",
     "Therapeutic Class_es": "clase terapeutica"
-}, inplace=True)
+}
+
+
+def es_columna_efecto(col):
+    return "sideEffect" in col
+
+
+def es_columna_uso(col):
+    return "use" in col and "_es" in col
+
+
+def unir_columnas(df, columnas, sep=", "):
+    """
+    Une por fila los valores no nulos de las columnas (equivale a
+    sep.join(str(v) for v in fila if pd.notnull(v))), columna a columna y sin apply.
+    """
+    resultado = np.full(len(df), "", dtype=object)
+    vacia = np.ones(len(df), dtype=bool)
+    for col in columnas:
+        valores = df[col]
+        presente = valores.notna().to_numpy()
+        texto = valores[presente].astype(str).to_numpy(dtype=object)
+        resultado[presente] = np.where(vacia[presente], texto, resultado[presente] + sep + texto)
+        vacia &= ~presente
+    return pd.Series(resultado, index=df.index)
+
+
+def reducir_medicine(parte):
+    """Filas del dataset de medicamentos reducidas a las columnas de medicamentos_info"""
+    reducida = pd.DataFrame({"medicamento": parte["name"]})
+    reducida["efectos_secundarios_detallados"] = unir_columnas(parte, [c for c in parte.columns if es_columna_efecto(c)])
+    reducida["usos_clinicos_ext"] = unir_columnas(parte, [c for c in parte.columns if es_columna_uso(c)])
+    for col, nueva in CLASES.items():
+        reducida[nueva] = parte[col]
+    return reducida
+
+
+def columna_util(col):
+    """Columnas del dataset de medicamentos que se leen"""
+    return col == "name" or col in CLASES or es_columna_efecto(col) or es_columna_uso(col)
+
+
+def leer_medicine(ruta_medicine, nombres, filas_lectura=50000, reducir=reducir_medicine):
+    """
+    Lee el dataset de medicamentos por partes, solo con las columnas necesarias,
+    y conserva las filas cuyo nombre está en `nombres` ya reducidas a las
+    columnas de medicamentos_info. La memoria depende de las coincidencias,
+    no del tamaño del archivo.
+    """
+    partes = []
+    for parte in pd.read_csv(ruta_medicine, usecols=columna_util, chunksize=filas_lectura, low_memory=False):
+        parte = parte[parte["name"].isin(nombres)]
+        if not parte.empty:
+            partes.append(reducir(parte))
+
+    if not partes:
+        return pd.DataFrame(columns=["medicamento", "efectos_secundarios_detallados", "usos_clinicos_ext", *CLASES.values()])
+    return pd.concat(partes, ignore_index=True)
+
+
+def leer_drug(ruta_drug):
+    """Dataset de drogas con la columna clave unificada y sin filas sin composición"""
+    df_drug = pd.read_csv(ruta_drug).rename(columns={"nombre_medicamento": "medicamento"})
+
+    # 🚨 Eliminar filas sin composición
+    return df_drug[df_drug["composicion"].notna() & (df_drug["composicion"].str.strip() != "")]
+
+
+def unir_info(df_drug, df_medicine):
+    """
+    Mismo resultado que la unión outer seguida del filtro de composición:
+    orden por nombre y, con nombres repetidos, el orden de aparición
+    """
+    df_info = pd.merge(df_drug, df_medicine, on="medicamento", how="left")
+    df_info = df_info.sort_values("medicamento", kind="mergesort", na_position="last")
+    for col in ("efectos_secundarios_detallados", "usos_clinicos_ext"):
+        df_info[col] = df_info[col].fillna("")
+    return df_info[COLUMNAS_FINALES]
+
+
+def construir_medicamentos_info(ruta_drug=RUTA_DRUG, ruta_medicine=RUTA_MEDICINE, ruta_salida=RUTA_SALIDA,
+                                filas_lectura=50000):
+    """
+    Une el dataset de drogas (composición, usos, reviews) con el de medicamentos
+    (efectos, usos y clases) y guarda medicamentos_info.csv.
+    Solo se conservan medicamentos con composición, así que del dataset de
+    medicamentos basta con las filas cuyo nombre aparece en el de drogas.
+    """
+    df_drug = leer_drug(ruta_drug)
+    df_medicine = leer_medicine(ruta_medicine, set(df_drug["medicamento"].dropna()), filas_lectura)
+    df_final = unir_info(df_drug, df_medicine)
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_salida)), exist_ok=True)
+    df_final.to_csv(ruta_salida, index=False)
+    return df_final
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye medicamentos_info.csv de la base de conocimiento")
+    parser.add_argument("--drug", default=RUTA_DRUG, help="Dataset de drogas limpio (drug_data.csv)")
+    parser.add_argument("--medicine", default=RUTA_MEDICINE,
+                        help="Dataset de medicamentos traducido y limpio (admite el de 250k filas completo)")
+    parser.add_argument("--salida", default=RUTA_SALIDA, help="CSV de salida")
+    parser.add_argument("--filas-lectura", type=int, default=50000, help="Filas leídas por parte del dataset de medicamentos")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    df_final = construir_medicamentos_info(args.drug, args.medicine, args.salida, args.filas_lectura)
+    print(f"✅ Archivo '{os.path.basename(args.salida)}' generado con {len(df_final)} medicamentos "
+          f"(sin registros peligrosos sin composición) en {time.perf_counter() - t0:.2f} s.")
 
-# 🚨 Eliminar filas sin composición
-df_final = df_final[df_final["composicion"].notna() & (df_final["composicion"].str.strip() != "")]
 
-# Guardar CSV limpio y seguro
-df_final.to_csv(os.path.join(output_folder, "medicamentos_info.csv"), index=False)
-print("✅ Archivo 'medicamentos_info.csv' generado sin registros peligrosos (sin composición).")
+if __name__ == "__main__":
+    main()
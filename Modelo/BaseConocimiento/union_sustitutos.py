@@ -1,41 +1,48 @@
-import pandas as pd
 import os
+import argparse
+import pandas as pd
 
-# Crear carpeta si no existe
-output_folder = r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\BaseConocimiento"
-os.makedirs(output_folder, exist_ok=True)
-
-# Cargar MEDICINE_DATA traducido (ya con columnas *_es)
-df_medicine = pd.read_csv(r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\dataset\medicine_data_limpio.csv")
-
-# Renombrar nombre principal
-df_medicine.rename(columns={
-    "name": "medicamento_en",
-    "name_es": "medicamento_principal"
-}, inplace=True)
+# Rutas por defecto, relativas a Modelo/
+ruta_modelo = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUTA_MEDICINE = os.path.join(ruta_modelo, "dataset", "medicine_data_limpio.csv")
+RUTA_SALIDA = os.path.join(ruta_modelo, "BaseConocimiento", "sustitutos_medicamentos.csv")
 
 # Seleccionar columnas de sustitutos en inglés y español
 sustituto_en_cols = [f"substitute{i}" for i in range(5)]
 sustituto_es_cols = [f"substitute{i}_es" for i in range(5)]
+COLUMNAS_MEDICINE = ["name", "name_es"] + sustituto_en_cols + sustituto_es_cols
+
+
+def construir_sustitutos(df_medicine):
+    """Tabla de sustitutos en inglés y español a partir de MEDICINE_DATA traducido (ya con columnas *_es)"""
+    # Renombrar nombre principal
+    df_sustitutos = df_medicine[COLUMNAS_MEDICINE].rename(columns={
+        "name": "medicamento_en",
+        "name_es": "medicamento_principal"
+    })
+
+    # Renombrar columnas para mayor claridad
+    df_sustitutos = df_sustitutos.rename(columns={
+        **{f"substitute{i}": f"sustituto{i + 1}_en" for i in range(5)},
+        **{f"substitute{i}_es": f"sustituto{i + 1}_es" for i in range(5)}
+    })
+    return df_sustitutos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye sustitutos_medicamentos.csv de la base de conocimiento")
+    parser.add_argument("--medicine", default=RUTA_MEDICINE, help="Dataset de medicamentos traducido y limpio")
+    parser.add_argument("--salida", default=RUTA_SALIDA, help="CSV de salida")
+    args = parser.parse_args()
+
+    df_medicine = pd.read_csv(args.medicine, usecols=COLUMNAS_MEDICINE)
+    df_sustitutos = construir_sustitutos(df_medicine)
+
+    # Guardar archivo
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    df_sustitutos.to_csv(args.salida, index=False)
+    print("✅ Archivo 'sustitutos_medicamentos.csv' generado con sustitutos en español e inglés.")
+
 
-# Construir el DataFrame final con ambas versiones
-df_sustitutos = df_medicine[["medicamento_en", "medicamento_principal"] + sustituto_en_cols + sustituto_es_cols].copy()
-
-# Renombrar columnas para mayor claridad
-df_sustitutos.rename(columns={
-    "substitute0": "sustituto1_en",
-    "substitute1": "sustituto2_en",
-    "substitute2": "sustituto3_en",
-    "substitute3": "sustituto4_en",
-    "substitute4": "sustituto5_en",
-    "substitute0_es": "sustituto1_es",
-    "substitute1_es": "sustituto2_es",
-    "substitute2_es": "sustituto3_es",
-    "substitute3_es": "sustituto4_es",
-    "substitute4_es": "sustituto5_es"
-}, inplace=True)
-
-# Guardar archivo
-df_sustitutos.to_csv(os.path.join(output_folder, "sustitutos_medicamentos.csv"), index=False)
-
-print("✅ Archivo 'sustitutos_medicamentos.csv' generado con sustitutos en español e inglés.")
+if __name__ == "__main__":
+    main()
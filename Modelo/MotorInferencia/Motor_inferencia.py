@@ -1,8 +1,21 @@
 import pandas as pd
 import re
-from difflib import get_close_matches
 from Modelo.ReglasClinicas.reglas import regla_alergia_por_composicion, regla_sintomas_vs_efectos_secundarios
-from Modelo.ReglasClinicas.reglas_apoyo import contar_sintomas, evaluar_clase, obtener_componente_principal, obtener_composicion
+from Modelo.ReglasClinicas.reglas_apoyo import (
+    contar_sintomas, evaluar_clase, obtener_componente_principal, obtener_composicion, obtener_nombre_espanol,
+    normalizar_texto, obtener_sinonimos_diagnostico, misma_familia
+)
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.contexto_paciente import ContextoPaciente, obtener_contexto
+from Modelo.MotorInferencia.indice_usos import obtener_indice_usos
+from Modelo.MotorInferencia.resolvedor_nombres import obtener_resolvedor
+from Modelo.MotorInferencia.mapa_nombres import obtener_mapa_nombres, normalizar_medicamento
+from Modelo.MotorInferencia.indice_composiciones import obtener_indice_composiciones
+from Modelo.MotorInferencia.indice_palabras import obtener_indice_palabras
+from Modelo.MotorInferencia.tabla_componentes import obtener_tabla_componentes
+from Modelo.MotorInferencia.matriz_alergenos import obtener_matriz_alergenos
+from Modelo.MotorInferencia.memoria_resoluciones import obtener_memoria_resoluciones
+from Modelo.MotorInferencia.puntaje_vectorizado import puntuar_candidatos, redactar_justificacion, valor_score
 
 def obtener_pares_sustitutos(med_en, df_sust):
     """Obtiene pares de sustitutos (español, inglés) para un medicamento"""
@@ -17,7 +30,7 @@ def obtener_pares_sustitutos(med_en, df_sust):
                 pairs.append((es.strip(), en.strip())) 
     return list({en:(es,en) for es,en in pairs}.values())
 
-def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, razon=None):
+def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, razon=None, contexto=None):
     
     """
     Calcula el score de compatibilidad para un sustituto considerando la razón.
@@ -30,16 +43,17 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
         alergenos: lista de alérgenos del paciente
         df_info: DataFrame con información de medicamentos
         razon: motivo de la sustitución ('alergia' o 'desabastecimiento')
+        contexto: ContextoPaciente de la consulta; si no se pasa se construye aquí
     """
-    # Filtrar el registro correspondiente
-    f = df_info[
-        (df_info["medicamento"].str.lower() == en.lower()) |
-        (df_info["composicion"].str.lower().str.contains(en.lower(), na=False))
-    ]
-    if f.empty:
+    contexto = obtener_contexto(notas, diagnostico, alergenos, contexto)
+
+    # Localizar el registro correspondiente en el índice
+    indice = obtener_indice(df_info)
+    pos = indice.buscar_nombre_o_composicion(en)
+    if pos is None:
         return -5, "⚠️ Información no encontrada"
 
-    d = f.iloc[0]
+    d = indice.fila(pos)
     score = 0
     just = []
 
@@ -50,12 +64,13 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
     elif rev >= 50:
         score += 1; just.append("✔️ Buen puntaje de review (50–79)")
 
-    # 2) Componente principal
-    comp = obtener_componente_principal(d.get("composicion", ""))
+    # 2) Componente principal (ya separado en la tabla de componentes)
+    tabla = obtener_tabla_componentes(df_info)
+    comp = tabla.principal_texto[pos]
     comp_actual = obtener_componente_principal(es)  # es = medicamento original
 
     if comp and comp_actual:
-        if normalizar_texto(comp) == normalizar_texto(comp_actual):
+        if tabla.principal[pos] == tabla.id_ingrediente(comp_actual):
             score += 5
             just.append("✔️ Mismo componente principal")
         else:
@@ -67,7 +82,7 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
     # 3) Clase terapéutica
     # Validar clase terapéutica solo si tiene uso clínico para el diagnóstico
     usos_all = (str(d.get("usos", "")) + " " + str(d.get("usos_clinicos_ext", ""))).lower()
-    diag = diagnostico.lower() if diagnostico else ""
+    diag = contexto.diag_lower
     if evaluar_clase(clase_act, d.get("clase terapeutica", "")) and diag in usos_all:
         score += 2
         just.append(f"✔️ Misma clase terapéutica y uso apropiado para {diagnostico}")
@@ -83,7 +98,6 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
         score += 1; just.append("✔️ Misma clase química")
 
     # 5) Indicación genérica según diagnóstico
-    diag = diagnostico.lower() if diagnostico else ""
     usos_ext = str(d.get("usos_clinicos_ext", "")).lower()
     usos_bas = str(d.get("usos", "")).lower()
     if diag and diag in usos_ext:
@@ -100,7 +114,7 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
 
     # 7) Factor de alergias (combinado)
     # Verificar alergias conocidas del paciente
-    alerg = regla_alergia_por_composicion(notas, d.get("composicion", ""), alergenos)
+    alerg = regla_alergia_por_composicion(notas, d.get("composicion", ""), alergenos, contexto)
     comp_actual = comp.lower() if comp else ""
     comp_sustituto = str(d.get("composicion", "")).lower()
     
@@ -113,23 +127,7 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
         comp_act_norm = comp_actual.lower().strip()
         comp_sust_norm = comp_sustituto.lower().strip()
         
-        # Diccionario de familias alergénicas conocidas
-        familias_alergenicas = {
-            "penicilina": ["amoxicilina", "ampicilina", "penicilina", "cloxacilina"],
-            "cefalosporina": ["cefalexina", "cefuroxima", "cefixima", "ceftazidima"],
-            "macrólidos": ["azitromicina", "claritromicina", "eritromicina"],
-            "tetraciclinas": ["doxiciclina", "tetraciclina"],
-            "sulfas": ["sulfametoxazol", "sulfadiazina", "sulfisoxazol"]
-            # SE PUEDE AÑADIR MAS FAMILIAS
-        }
-
-        def misma_familia(comp1, comp2, familias):
-            for fam, comps in familias.items():
-                if any(comp1 in c for c in comps) and any(comp2 in c for c in comps):
-                    return True
-            return False
-
-        if misma_familia(comp_act_norm, comp_sust_norm, familias_alergenicas):
+        if misma_familia(comp_act_norm, comp_sust_norm):
             score -= 5
             just.append("⚠️ Posible cruce con familia alergénica (revisión médica necesaria)")
         else:
@@ -140,7 +138,8 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
     # 8) Otros factores de razón
     if razon and razon.lower() == 'desabastecimiento':
         # Evaluar si hay coincidencia exacta o similaridad real
-        if comp_actual and comp_actual in comp_sustituto and comp_actual != "":
+        # (comp_actual es el componente principal del sustituto; se compara por id)
+        if comp_actual and tabla.contiene_ingrediente(pos, tabla.principal[pos]):
             score += 3
             just.append("✔️ Composición parcialmente similar")
         else:
@@ -153,105 +152,86 @@ def score_sustituto(es, en, notas, diagnostico, clase_act, alergenos, df_info, r
 
 def obtener_efectos(nombre_medicamento, df_info):
     """Obtiene efectos secundarios de un medicamento"""
-    fila = df_info[df_info["medicamento"].str.lower() == nombre_medicamento.lower()]
-    if not fila.empty:
-        efectos_raw = fila.iloc[0]["efectos_secundarios"]
+    fila = obtener_indice(df_info).fila_por_nombre(nombre_medicamento)
+    if fila is not None:
+        efectos_raw = fila["efectos_secundarios"]
         if pd.notna(efectos_raw) and efectos_raw:
             return efectos_raw
     return "No disponibles"
 
 def procesar_medicamento_actual(med_input, df_sust, df_info):
-    """Versión mejorada para captura exacta de composición"""
-    def crear_mapa_nombres(df):
-        map_en = {}
-        map_es = {}
-        for _, r in df.iterrows():
-            en_name = r["medicamento_en"].lower().strip()
-            es_name = r["medicamento_principal"].lower().strip()
-            map_en[en_name] = en_name
-            map_en[es_name] = en_name
-            map_es[en_name] = es_name
-        return map_en, map_es
-    
-    def normalizar_medicamento(texto):
-        """Normaliza para comparación exacta"""
-        texto = str(texto).lower()
-        texto = re.sub(r'[^a-z0-9\s]', '', texto)  # Eliminar caracteres especiales
-        texto = re.sub(r'\s+', ' ', texto).strip()  # Unificar espacios
-        texto = re.sub(r'(\d)\s*(mg|%|ml|g)', r'\1\2', texto)  # Normalizar unidades
-        return texto
-    
+    """
+    Versión mejorada para captura exacta de composición.
+    La cascada de búsqueda se memoriza por entrada (también las no encontradas).
+    """
     try:
-        in_lower = normalizar_medicamento(med_input)
-        map_en, map_es = crear_mapa_nombres(df_sust)
-
-        # PRIMERO: Búsqueda exacta en composiciones
-        df_info["composicion_normalizada"] = df_info["composicion"].apply(normalizar_medicamento)
-        mask_exacta = df_info["composicion_normalizada"] == in_lower
-        
-        if mask_exacta.any():
-            # Ordenar por número de componentes (priorizar fórmulas más simples)
-            df_temp = df_info[mask_exacta].copy()
-            df_temp["num_componentes"] = df_temp["composicion"].str.count('\+') + 1
-            df_temp = df_temp.sort_values("num_componentes")
-            
-            fila_act = df_temp.iloc[0]
-            med_act_en = fila_act["medicamento"]
-            med_act_es = map_es.get(med_act_en.lower(), med_act_en)
-            return extraer_datos_medicamento(fila_act, med_act_en, med_act_es)
-
-        # SEGUNDO: Búsqueda directa en el mapa (mantener tu lógica original)
-        if in_lower in map_en:
-            med_act_en = map_en[in_lower]
-            fila_act = df_info[df_info["medicamento"].str.lower()==med_act_en].iloc[0]
-            med_act_es = map_es.get(med_act_en, med_act_en)
-            return extraer_datos_medicamento(fila_act, med_act_en, med_act_es)
-
-        # TERCERO: Búsqueda por palabras clave mejorada
-        def buscar_por_palabras_clave_mejorada(in_lower, df_info):
-            """Búsqueda que prioriza fórmulas más simples"""
-            toks = re.findall(r"\w+", in_lower)
-            stop = {"mg","pp","p","de","la","el","en","crema","gel","tableta","capsula","%","pv"}
-            kws = [t for t in toks if t not in stop]
-            
-            if not kws:
-                return None
-            
-            mask = pd.Series(True, index=df_info.index)
-            for k in kws:
-                pat = rf'\b{re.escape(k)}\b'
-                mask &= (
-                    df_info["medicamento"].str.lower().str.contains(pat, na=False) |
-                    df_info["composicion"].str.lower().str.contains(pat, na=False))
-            
-            if mask.any():
-                # Ordenar por número de componentes
-                df_temp = df_info[mask].copy()
-                df_temp["num_componentes"] = df_temp["composicion"].str.count('\+') + 1
-                df_temp = df_temp.sort_values("num_componentes")
-                
-                fila_act = df_temp.iloc[0]
-                med_act_en = fila_act["medicamento"]
-                return fila_act, med_act_en, med_act_en  # Asumir nombre en inglés
-            
-            return None
-
-        resultados = buscar_por_palabras_clave_mejorada(in_lower, df_info)
-        if resultados:
-            fila_act, med_act_en, med_act_es = resultados
-            return extraer_datos_medicamento(fila_act, med_act_en, med_act_es)
-
-        # CUARTO: Búsqueda aproximada (mantener tu lógica original)
-        resultados = buscar_aproximado(in_lower, df_info, map_es)
-        if resultados:
-            fila_act, med_act_en, med_act_es = resultados
-            return extraer_datos_medicamento(fila_act, med_act_en, med_act_es)
+        memoria = obtener_memoria_resoluciones(df_info, df_sust)
+        resuelto = memoria.resolver(med_input, ETAPAS_RESOLUCION)
+        if resuelto:
+            pos, med_act_en, med_act_es = resuelto
+            return extraer_datos_medicamento(df_info.iloc[pos], med_act_en, med_act_es)
 
     except Exception as e:
         print(f"Error procesando medicamento: {str(e)}")
     
     return None, None, None, None, None, None
 
+def etapa_composicion_exacta(in_lower, df_info, df_sust):
+    """PRIMERO: Búsqueda exacta en composiciones (priorizando fórmulas más simples)"""
+    exactas = obtener_indice_composiciones(df_info).buscar_exacta(in_lower)
+    if exactas:
+        med_act_en = df_info.iloc[exactas[0]]["medicamento"]
+        return exactas[0], med_act_en, obtener_mapa_nombres(df_sust).nombre_espanol(med_act_en)
+    return None
+
+def etapa_mapa_nombres(in_lower, df_info, df_sust):
+    """SEGUNDO: Búsqueda directa en el mapa bilingüe de nombres"""
+    mapa = obtener_mapa_nombres(df_sust)
+    if in_lower in mapa.map_en:
+        med_act_en = mapa.map_en[in_lower]
+        pos = obtener_indice(df_info).buscar_nombre(med_act_en)
+        if pos is None:
+            raise LookupError(f"'{med_act_en}' no está en la base de medicamentos")
+        return pos, med_act_en, mapa.nombre_espanol(med_act_en)
+    return None
+
+def etapa_palabras_clave(in_lower, df_info, df_sust):
+    """TERCERO: Búsqueda por palabras clave que prioriza fórmulas más simples"""
+    toks = re.findall(r"\w+", in_lower)
+    stop = {"mg","pp","p","de","la","el","en","crema","gel","tableta","capsula","%","pv"}
+    kws = [t for t in toks if t not in stop]
+    
+    if not kws:
+        return None
+    
+    posiciones = obtener_indice_palabras(df_info).buscar(kws)
+    
+    if posiciones:
+        # Ordenar por número de componentes (precalculado)
+        orden = obtener_indice_composiciones(df_info).orden_componentes
+        pos = min(posiciones, key=orden.__getitem__)
+        med_act_en = df_info.iloc[pos]["medicamento"]
+        return pos, med_act_en, med_act_en  # Asumir nombre en inglés
+    
+    return None
+
+def etapa_aproximada(in_lower, df_info, df_sust):
+    """CUARTO: Búsqueda aproximada por similitud de nombres"""
+    nombre_en = obtener_resolvedor(df_info, df_sust).resolver(in_lower, cutoff=0.6)
+    if nombre_en:
+        pos = obtener_indice(df_info).buscar_nombre(nombre_en)
+        med_act_en = df_info.iloc[pos]["medicamento"]
+        return pos, med_act_en, obtener_mapa_nombres(df_sust).nombre_espanol(med_act_en)
+    return None
+
+# Cascada de búsqueda del medicamento actual, en orden
+ETAPAS_RESOLUCION = [
+    ("composicion", etapa_composicion_exacta),
+    ("mapa_nombres", etapa_mapa_nombres),
+    ("palabras_clave", etapa_palabras_clave),
+    ("aproximada", etapa_aproximada),
+]
+
 def extraer_datos_medicamento(fila_act, med_act_en, med_act_es):
     """Extrae los datos comunes de un medicamento"""
     clase_act = fila_act.get("clase terapeutica", "")
@@ -269,54 +249,76 @@ def buscar_por_palabras_clave(in_lower, df_info):
     if not kws:
         return None
     
-    mask = pd.Series(True, index=df_info.index)
-    for k in kws:
-        pat = rf"\b{re.escape(k)}\b"
-        mask &= (
-            df_info["medicamento"].str.lower().str.contains(pat, na=False) |
-            df_info["composicion"].str.lower().str.contains(pat, na=False)
-        )
+    posiciones = obtener_indice_palabras(df_info).buscar(kws)
     
-    if mask.any():
-        fila_act = df_info[mask].iloc[0]
+    if posiciones:
+        fila_act = df_info.iloc[posiciones[0]]
         med_act_en = fila_act["medicamento"]
         med_act_es = med_act_en  # Asumimos nombre en inglés si no está en el mapa
         return fila_act, med_act_en, med_act_es
     
     return None
 
-def buscar_aproximado(in_lower, df_info, map_es):
-    """Búsqueda aproximada por similitud"""
-    matches = get_close_matches(in_lower, df_info["medicamento"].str.lower(), n=1, cutoff=0.6)
-    if matches:
-        fila_act = df_info[df_info["medicamento"].str.lower()==matches[0]].iloc[0]
+def buscar_aproximado(in_lower, df_info, map_es, df_sust=None):
+    """Búsqueda aproximada por similitud (nombres en inglés y, con df_sust, en español)"""
+    nombre_en = obtener_resolvedor(df_info, df_sust).resolver(in_lower, cutoff=0.6)
+    if nombre_en:
+        fila_act = obtener_indice(df_info).fila_por_nombre(nombre_en)
         med_act_en = fila_act["medicamento"]
-        med_act_es = map_es.get(med_act_en.lower(), med_act_en)
+        med_act_es = obtener_nombre_espanol(med_act_en, map_es)
         return fila_act, med_act_en, med_act_es
     return None
 
-def normalizar_texto(texto):
-    """Normaliza texto para búsquedas (quita tildes, mayúsculas, etc.)"""
-    if pd.isna(texto):
-        return ""
-    
-    # Convertir a minúsculas y quitar tildes
-    texto = texto.lower()
-    reemplazos = {
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'ü': 'u', 'ñ': 'n'
-    }
-    for orig, repl in reemplazos.items():
-        texto = texto.replace(orig, repl)
-    
-    # Eliminar caracteres especiales y múltiples espacios
-    texto = re.sub(r'[^a-z0-9\s]', '', texto)
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    
-    return texto
+def excluir_por_alergenos(candidatos, df_info, detector, indices):
+    """
+    Descarta los candidatos cuya composición contiene alguno de los alérgenos
+    (índices en la lista del detector): un AND entre el bitset de cada candidato
+    y el de los alérgenos del paciente.
+    """
+    if not indices or candidatos.empty:
+        return candidatos
+    matriz = obtener_matriz_alergenos(df_info, detector)
+    posiciones = df_info.index.get_indexer(candidatos.index)
+    return candidatos[~matriz.con_alergenos(indices, posiciones)]
 
-def buscar_alternativas(clase_act, diagnostico, fila_act, med_act_en, sust_pairs, df_info, notas, lista_alergenos, razon=None):
+def mejores_alternativas(candidatos, limite, origen, df_info, clase_act, contexto, razon=None):
+    """
+    Puntúa todos los candidatos en una sola operación vectorizada y devuelve los
+    'limite' mejores como (nombre, score, justificación, origen), en orden estable.
+    Cada candidato se evalúa igual que score_sustituto(nombre, nombre, ...).
+    """
+    if candidatos.empty:
+        return []
+
+    indice = obtener_indice(df_info)
+    nombres = candidatos["medicamento"].tolist()
+    posiciones = [indice.buscar_nombre_o_composicion(n) for n in nombres]
+    encontrados = [i for i, pos in enumerate(posiciones) if pos is not None]
+
+    scores = [-5] * len(nombres)
+    justificaciones = ["⚠️ Información no encontrada"] * len(nombres)
+    if encontrados:
+        puntajes = puntuar_candidatos(
+            df_info, clase_act, contexto, razon,
+            posiciones=[posiciones[i] for i in encontrados],
+            nombres_es=[nombres[i] for i in encontrados],
+            justificar=False
+        )
+        for i, sc in zip(encontrados, puntajes["score"]):
+            scores[i] = valor_score(sc)
+
+    orden = sorted(range(len(nombres)), key=lambda i: scores[i], reverse=True)[:limite]
+
+    # La justificación solo se redacta para los candidatos seleccionados
+    filas = dict(zip(encontrados, puntajes.itertuples(index=False))) if encontrados else {}
+    for i in orden:
+        if i in filas:
+            justificaciones[i] = redactar_justificacion(filas[i], contexto.diagnostico)
+    return [(nombres[i], scores[i], justificaciones[i], origen) for i in orden]
+
+def buscar_alternativas(clase_act, diagnostico, fila_act, med_act_en, sust_pairs, df_info, notas, lista_alergenos, razon=None, contexto=None):
     """Busca alternativas terapéuticas compatibles, priorizando diagnóstico clínico"""
+    contexto = obtener_contexto(notas, diagnostico, lista_alergenos, contexto)
 
     def limpiar_texto(texto):
         if pd.isna(texto):
@@ -329,61 +331,41 @@ def buscar_alternativas(clase_act, diagnostico, fila_act, med_act_en, sust_pairs
     # ---------------------------
     # 1. Alternativas por diagnóstico
     # ---------------------------
-    diag_norm = limpiar_texto(diagnostico)
+    diag_norm = contexto.diag_norm
 
     if diag_norm:
-        mask_diag = (
-            df_info["usos"].apply(limpiar_texto).str.contains(rf"\b{diag_norm}\b", na=False) |
-            df_info["usos_clinicos_ext"].apply(limpiar_texto).str.contains(rf"\b{diag_norm}\b", na=False)
-        )
+        # Índice invertido de usos: diagnóstico y sinónimos, ordenados por fuerza de coincidencia
+        coincidencias = obtener_indice_usos(df_info).buscar_diagnostico(diag_norm, contexto.sinonimos)
 
-        cand_diag = df_info[mask_diag]
+        cand_diag = df_info.iloc[[pos for pos, _ in coincidencias]]
         cand_diag = cand_diag[~cand_diag["medicamento"].str.lower().isin(usados)]
 
-        # Filtrado por alérgenos
+        # Filtrado por alérgenos mencionados como palabra completa en las notas
         if lista_alergenos:
-            for alergeno in lista_alergenos:
-                alergeno = limpiar_texto(alergeno)
-                if re.search(rf"\b{re.escape(alergeno)}\b", notas.lower()):
-                    cand_diag = cand_diag[~cand_diag["composicion"].str.lower().str.contains(alergeno, na=False)]
+            cand_diag = excluir_por_alergenos(cand_diag, df_info, contexto.detector_norm, contexto.indices_palabra_norm)
 
-        for row in cand_diag.head(10).itertuples():
-            enm = row.medicamento
-            sc, js = score_sustituto(enm, enm, notas, diagnostico, clase_act, lista_alergenos, df_info, razon)
-            alternativas.append((enm, sc, js, "diagnóstico"))
+        # Se puntúan todos los candidatos y se conservan los 10 mejores
+        alternativas += mejores_alternativas(cand_diag, 10, "diagnóstico", df_info, clase_act, contexto, razon)
 
     # ---------------------------
     # 2. Alternativas por clase terapéutica
     # ---------------------------
     if clase_act and not pd.isna(clase_act):
-        cand_clase = df_info[df_info["clase terapeutica"].str.lower() == clase_act.lower()]
+        cand_clase = obtener_indice(df_info).filas_clase(clase_act)
         usados_clase = usados | {a[0].lower() for a in alternativas}
         cand_clase = cand_clase[~cand_clase["medicamento"].str.lower().isin(usados_clase)]
 
-        # Filtrar por usos parecidos
+        # Eliminar candidatos sin usos definidos (si el medicamento actual tiene usos)
         uso_str = limpiar_texto(fila_act.get("usos", "") + " " + fila_act.get("usos_clinicos_ext", ""))
-        uso_toks = re.findall(r"\w+", uso_str)
-
-        if uso_toks:
-            mask_uso = pd.Series(False, index=cand_clase.index)
-            for tok in uso_toks:
-                mask_uso |= cand_clase["usos"].apply(limpiar_texto).str.contains(tok, na=False)
-                mask_uso |= cand_clase["usos_clinicos_ext"].apply(limpiar_texto).str.contains(tok, na=False)
-            # Eliminar candidatos sin usos definidos
+        if re.search(r"\w", uso_str):
             cand_clase = cand_clase[cand_clase["usos"].notna() | cand_clase["usos_clinicos_ext"].notna()]
 
-
-        # Filtrado por alérgenos
+        # Filtrado por alérgenos mencionados en las notas
         if lista_alergenos:
-            for alergeno in lista_alergenos:
-                alergeno = limpiar_texto(alergeno)
-                if alergeno in notas.lower():
-                    cand_clase = cand_clase[~cand_clase["composicion"].str.lower().str.contains(alergeno, na=False)]
+            cand_clase = excluir_por_alergenos(cand_clase, df_info, contexto.detector_norm, contexto.indices_contenidos_norm)
 
-        for row in cand_clase.head(5).itertuples():
-            enm = row.medicamento
-            sc, js = score_sustituto(enm, enm, notas, diagnostico, clase_act, lista_alergenos, df_info, razon)
-            alternativas.append((enm, sc, js, "clase terapéutica"))
+        # Se puntúan todos los candidatos y se conservan los 5 mejores
+        alternativas += mejores_alternativas(cand_clase, 5, "clase terapéutica", df_info, clase_act, contexto, razon)
 
     # ---------------------------
     # 3. Orden y retorno
@@ -409,24 +391,19 @@ def capturar_composicion_exacta(med_input, diagnostico, df_info):
     1. Coincidencia exacta con la composición simple
     2. Diagnóstico para confirmar relevancia clínica
     """
-    # Normalización robusta
-    def normalizar(texto):
-        texto = str(texto).lower()
-        texto = re.sub(r'[^a-z0-9\s]', '', texto)  # Eliminar caracteres especiales
-        texto = re.sub(r'\s+', ' ', texto).strip()  # Unificar espacios
-        texto = re.sub(r'(\d)\s*(mg|%|ml|g)', r'\1\2', texto)  # Normalizar unidades
-        return texto
+    # Normalización robusta (la misma que en procesar_medicamento_actual)
+    normalizar = normalizar_medicamento
 
     med_buscado = normalizar(med_input)
     diag_norm = normalizar(diagnostico) if diagnostico else ""
 
     # 1. Buscar coincidencia EXACTA en composición
-    df_info["composicion_normalizada"] = df_info["composicion"].apply(normalizar)
-    mask_exacta = df_info["composicion_normalizada"] == med_buscado
+    indice_comp = obtener_indice_composiciones(df_info)
+    exactas = indice_comp.exactas.get(med_buscado, ())
     
     # Si encontramos resultados exactos
-    if mask_exacta.any():
-        candidatos = df_info[mask_exacta].copy()
+    if exactas:
+        candidatos = df_info.iloc[list(exactas)].copy()
         
         # Priorizar por diagnóstico si hay múltiples coincidencias exactas
         if len(candidatos) > 1 and diag_norm:
@@ -444,13 +421,13 @@ def capturar_composicion_exacta(med_input, diagnostico, df_info):
 
     # 2. Si no hay coincidencia exacta, buscar por componente principal
     componente_principal = med_buscado.split()[0]  # Extrae "amoxicilina" de "amoxicilina500mg"
-    mask_componente = df_info["composicion_normalizada"].str.contains(componente_principal, regex=False)
+    posiciones = indice_comp.buscar_contenida(componente_principal)
     
-    if mask_componente.any():
-        candidatos = df_info[mask_componente].copy()
+    if posiciones:
+        candidatos = df_info.iloc[posiciones].copy()
         
         # Priorizar formulaciones más simples (menos componentes)
-        candidatos["num_componentes"] = candidatos["composicion"].str.count('\+') + 1
+        candidatos["num_componentes"] = [indice_comp.orden_componentes[p] for p in posiciones]
         candidatos = candidatos.sort_values("num_componentes")
         
         # Filtrar por diagnóstico si está disponible
@@ -471,14 +448,3 @@ def calcular_relevancia_diagnostico(row, diag_norm):
     if diag_norm in usos:
         return 2
     return 1 if any(sin in usos for sin in obtener_sinonimos_diagnostico(diag_norm)) else 0
-
-def obtener_sinonimos_diagnostico(diagnostico):
-    """Sinónimos clínicos para mejor matching"""
-    diag_clean = re.sub(r'[^a-z0-9\s]', '', diagnostico.lower())
-    sinonimos = {
-        "bronquitis": ["inflamacion bronquios", "infeccion vias respiratorias"],
-        "acne": ["acne vulgar", "comedones"],
-        "neumonia": ["infeccion pulmonar", "pulmonia"]
-    }
-    return sinonimos.get(diag_clean, [])
-
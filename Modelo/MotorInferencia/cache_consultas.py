@@ -0,0 +1,115 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+from Modelo.MotorInferencia.contexto_paciente import ContextoPaciente
+from Modelo.MotorInferencia.mapa_nombres import normalizar_medicamento
+
+
+def version_datos(datos):
+    """
+    Versión de la base de conocimiento: la huella del snapshot (cambia con los CSV)
+    y la identidad de df_info (cambia al recargar los datos).
+    """
+    return datos.get('version'), id(datos.get('df_info'))
+
+
+class CacheConsultas:
+    """
+    Caché LRU con caducidad de respuestas completas de procesar_medicamento.
+    La clave solo contiene lo que influye en la respuesta: el medicamento normalizado
+    (igual que lo normaliza procesar_medicamento_actual), el diagnóstico, la razón y
+    los alérgenos detectados en las notas. Al cambiar la versión de los datos se vacía.
+    Es segura para usarla desde varios hilos.
+    """
+
+    def __init__(self, max_entradas=512, ttl=15 * 60, reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.reloj = reloj
+        self._entradas = OrderedDict()  # clave -> (instante, respuesta)
+        self._version = None
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducadas = 0
+        self.invalidaciones = 0
+
+    @staticmethod
+    def clave(med_input, diagnostico, razon, contexto):
+        """
+        Clave de la consulta. El diagnóstico va tal cual porque aparece en el texto
+        de las justificaciones; de las notas solo cuentan los alérgenos detectados.
+        """
+        return (
+            normalizar_medicamento(med_input),
+            diagnostico,
+            razon.lower() if isinstance(razon, str) else razon,
+            isinstance(contexto.notas, str),
+            tuple(contexto.alergenos_mencionados),
+            tuple(contexto.indices_palabra_norm),
+            tuple(contexto.indices_contenidos_norm),
+        )
+
+    def _comprobar_version(self, version):
+        if version != self._version:
+            if self._entradas:
+                self.invalidaciones += 1
+            self._entradas.clear()
+            self._version = version
+
+    def obtener(self, clave, version):
+        """Respuesta guardada para la clave o None si no está, caducó o los datos cambiaron"""
+        with self._lock:
+            self._comprobar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self.reloj() - entrada[0] > self.ttl:
+                del self._entradas[clave]
+                self.caducadas += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return copy.deepcopy(entrada[1])
+
+    def guardar(self, clave, version, respuesta):
+        """Guarda una copia de la respuesta, descartando la usada hace más tiempo si está llena"""
+        with self._lock:
+            self._comprobar_version(version)
+            self._entradas[clave] = (self.reloj(), copy.deepcopy(respuesta))
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def consultar(self, med_input, notas, diagnostico, datos, razon, calcular):
+        """
+        Devuelve la respuesta guardada o la calcula con
+        calcular(med_input, notas, diagnostico, datos, razon, contexto) y la guarda.
+        """
+        contexto = ContextoPaciente(notas, diagnostico, datos['lista_alergenos'])
+        clave = self.clave(med_input, diagnostico, razon, contexto)
+        version = version_datos(datos)
+        respuesta = self.obtener(clave, version)
+        if respuesta is None:
+            respuesta = calcular(med_input, notas, diagnostico, datos, razon, contexto)
+            self.guardar(clave, version, respuesta)
+        return respuesta
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Aciertos, fallos, tasa de aciertos y tamaño actual de la caché"""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total if total else 0.0,
+                "caducadas": self.caducadas,
+                "invalidaciones": self.invalidaciones,
+                "entradas": len(self._entradas),
+            }
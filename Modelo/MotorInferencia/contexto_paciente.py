@@ -0,0 +1,54 @@
+import re
+import pandas as pd
+from Modelo.ReglasClinicas.reglas import alergenos_mencionados, extraer_palabras
+from Modelo.ReglasClinicas.reglas_apoyo import normalizar_texto, obtener_sinonimos_diagnostico
+from Modelo.ReglasClinicas.detector_alergenos import obtener_detector
+
+
+class ContextoPaciente:
+    """
+    Análisis de las notas clínicas y del diagnóstico hecho una sola vez por consulta.
+    Se comparte entre todas las evaluaciones de candidatos (sustitutos y alternativas).
+    """
+
+    def __init__(self, notas, diagnostico, alergenos):
+        self.notas = notas
+        self.diagnostico = diagnostico
+        self.alergenos = alergenos
+
+        # Notas clínicas
+        hay_notas = isinstance(notas, str)
+        self.notas_lower = notas.lower() if hay_notas else ""
+        self.tokens_notas = re.findall(r"\w+", self.notas_lower)
+        self.palabras_notas = extraer_palabras(notas) if hay_notas else set()
+
+        # Diagnóstico
+        self.diag_lower = diagnostico.lower() if isinstance(diagnostico, str) else ""
+        self.diag_norm = normalizar_texto(str(diagnostico)) if not pd.isna(diagnostico) else ""
+        self.sinonimos = obtener_sinonimos_diagnostico(self.diag_norm)
+
+        # Alérgenos: regla de alergia (texto en minúsculas) y filtros de alternativas (texto normalizado)
+        # (como índices en la lista de alérgenos, para cruzarlos con los bitsets del catálogo)
+        self.detector = None
+        self.detector_norm = None
+        self.alergenos_mencionados = []
+        self.indices_palabra_norm = []
+        self.indices_contenidos_norm = []
+        if alergenos and hay_notas:
+            self.detector = obtener_detector(alergenos)
+            self.alergenos_mencionados = alergenos_mencionados(notas, self.detector)
+            self.detector_norm = obtener_detector(alergenos, normalizar_texto)
+            self.indices_palabra_norm = self.detector_norm.como_palabra(self.notas_lower)
+            self.indices_contenidos_norm = self.detector_norm.contenidos(self.notas_lower)
+        self.alergenos_palabra_norm = self._patrones_norm(self.indices_palabra_norm)
+        self.alergenos_contenidos_norm = self._patrones_norm(self.indices_contenidos_norm)
+
+    def _patrones_norm(self, indices):
+        return [self.detector_norm.patrones[i] for i in indices]
+
+
+def obtener_contexto(notas, diagnostico, alergenos, contexto=None):
+    """Devuelve el contexto recibido o construye uno nuevo para la consulta"""
+    if contexto is not None:
+        return contexto
+    return ContextoPaciente(notas, diagnostico, alergenos)
@@ -0,0 +1,67 @@
+import weakref
+from types import MappingProxyType
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.mapa_nombres import normalizar_medicamento
+
+# Índices de composiciones ya construidos, uno por índice de medicamentos
+_indices_composiciones = weakref.WeakKeyDictionary()
+
+
+class IndiceComposiciones:
+    """
+    Composiciones de df_info normalizadas una sola vez (normalizar_medicamento) y
+    mapa composición normalizada -> posiciones de las filas, en orden de la tabla.
+    Es de solo lectura: se puede compartir entre hilos sin copiar ni bloquear, y
+    se puede serializar para enviarlo a otros procesos.
+    """
+
+    def __init__(self, df_info):
+        if "composicion" in df_info.columns:
+            originales = list(df_info["composicion"])
+        else:
+            originales = [None] * len(df_info)
+        valores = [str(v) for v in originales]
+        cache = {v: normalizar_medicamento(v) for v in set(valores)}
+        self.normalizadas = tuple(cache[v] for v in valores)
+        # Sin composición (nulo o vacía) = 0 componentes
+        self.num_componentes = tuple(
+            v.count("+") + 1 if isinstance(o, str) and v.strip() else 0
+            for o, v in zip(originales, valores)
+        )
+        # Clave para priorizar fórmulas simples: las filas sin composición van al final
+        self.orden_componentes = tuple(n if n else float("inf") for n in self.num_componentes)
+
+        exactas = {}
+        for pos, comp in enumerate(self.normalizadas):
+            exactas.setdefault(comp, []).append(pos)
+        self.exactas = MappingProxyType({c: tuple(p) for c, p in exactas.items()})
+
+    def __len__(self):
+        return len(self.normalizadas)
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado["exactas"] = dict(self.exactas)
+        return estado
+
+    def __setstate__(self, estado):
+        estado["exactas"] = MappingProxyType(estado["exactas"])
+        self.__dict__.update(estado)
+
+    def buscar_exacta(self, comp_norm):
+        """Posiciones con la composición normalizada exacta, de menos a más componentes"""
+        posiciones = self.exactas.get(comp_norm, ())
+        return sorted(posiciones, key=self.orden_componentes.__getitem__)
+
+    def buscar_contenida(self, texto):
+        """Posiciones cuya composición normalizada contiene el texto"""
+        return [pos for pos, comp in enumerate(self.normalizadas) if texto in comp]
+
+
+def obtener_indice_composiciones(df_info):
+    """Devuelve el índice de composiciones de df_info, construyéndolo solo la primera vez"""
+    indice = obtener_indice(df_info)
+    indice_comp = _indices_composiciones.get(indice)
+    if indice_comp is None:
+        indice_comp = _indices_composiciones[indice] = IndiceComposiciones(indice.df)
+    return indice_comp
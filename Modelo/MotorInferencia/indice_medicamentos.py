@@ -0,0 +1,103 @@
+from Modelo.MotorInferencia.registro_dataframes import asociar, asociado
+
+# Atributo del DataFrame donde se guarda su índice (vive lo mismo que el DataFrame)
+_ATRIBUTO_INDICE = "_indice_medicamentos"
+
+
+def _columna_texto(df, columna):
+    """Devuelve la columna como lista de textos en minúsculas (vacío si falta)"""
+    if columna not in df.columns:
+        return [""] * len(df)
+    return df[columna].fillna("").astype(str).str.strip().str.lower().tolist()
+
+
+class DrugIndex:
+    """
+    Índice en memoria de medicamentos_info construido una sola vez.
+    Guarda mapas hash nombre -> fila, composición -> filas y clase -> filas,
+    de modo que las búsquedas no recorren todo el DataFrame en cada llamada.
+    """
+
+    def __init__(self, df_info):
+        self.df = df_info
+        self.nombres = _columna_texto(df_info, "medicamento")
+        self.composiciones = _columna_texto(df_info, "composicion")
+        self.clases = _columna_texto(df_info, "clase terapeutica")
+
+        self.por_nombre = {}
+        self.por_composicion = {}
+        self.por_clase = {}
+        for i, (nombre, comp, clase) in enumerate(zip(self.nombres, self.composiciones, self.clases)):
+            if nombre:
+                self.por_nombre.setdefault(nombre, i)  # Conserva la primera aparición
+            if comp:
+                self.por_composicion.setdefault(comp, []).append(i)
+            if clase:
+                self.por_clase.setdefault(clase, []).append(i)
+
+        registrar_indice(self)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        registrar_indice(self)
+
+    def fila(self, posicion):
+        """Devuelve la fila (Series) en la posición indicada"""
+        return self.df.iloc[posicion]
+
+    def buscar_nombre(self, nombre):
+        """Posición de la fila cuyo nombre coincide exactamente (sin mayúsculas)"""
+        if not isinstance(nombre, str):
+            return None
+        return self.por_nombre.get(nombre.strip().lower())
+
+    def buscar_composicion(self, composicion):
+        """Posición de la primera fila con la composición exacta"""
+        if not isinstance(composicion, str):
+            return None
+        filas = self.por_composicion.get(composicion.strip().lower())
+        return filas[0] if filas else None
+
+    def buscar_nombre_o_composicion(self, texto):
+        """
+        Busca por nombre exacto, luego composición exacta y por último
+        composición que contenga el texto (solo en caso de fallo).
+        """
+        if not isinstance(texto, str):
+            return None
+        pos = self.buscar_nombre(texto)
+        if pos is None:
+            pos = self.buscar_composicion(texto)
+        if pos is None:
+            t = texto.strip().lower()
+            pos = next((i for i, comp in enumerate(self.composiciones) if t in comp), None)
+        return pos
+
+    def fila_por_nombre(self, nombre):
+        """Fila del medicamento por nombre exacto o None si no existe"""
+        pos = self.buscar_nombre(nombre)
+        return None if pos is None else self.fila(pos)
+
+    def filas_clase(self, clase):
+        """DataFrame con los medicamentos de una clase terapéutica"""
+        if not isinstance(clase, str):
+            return self.df.iloc[[]]
+        return self.df.iloc[self.por_clase.get(clase.strip().lower(), [])]
+
+
+def registrar_indice(indice):
+    """Asocia un índice a su DataFrame para reutilizarlo en llamadas posteriores"""
+    asociar(indice.df, _ATRIBUTO_INDICE, indice)
+
+
+def obtener_indice(df_info):
+    """Devuelve el DrugIndex de df_info, construyéndolo solo la primera vez"""
+    if isinstance(df_info, DrugIndex):
+        return df_info
+    indice = asociado(df_info, _ATRIBUTO_INDICE)
+    if indice is not None and len(indice) == len(df_info):
+        return indice
+    return DrugIndex(df_info)
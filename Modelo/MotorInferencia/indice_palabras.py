@@ -0,0 +1,46 @@
+import re
+import weakref
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+
+# Índices de palabras ya construidos, uno por índice de medicamentos
+_indices_palabras = weakref.WeakKeyDictionary()
+
+
+class IndicePalabras:
+    """
+    Índice invertido de las palabras del nombre y de la composición de cada
+    medicamento: palabra -> posiciones de las filas que la contienen en alguno
+    de los dos campos. Varias palabras clave se resuelven intersectando listas.
+    """
+
+    def __init__(self, indice):
+        postings = {}
+        for textos in (indice.nombres, indice.composiciones):
+            for pos, texto in enumerate(textos):
+                for palabra in set(re.findall(r"\w+", texto)):
+                    postings.setdefault(palabra, set()).add(pos)
+        self.postings = {p: frozenset(posiciones) for p, posiciones in postings.items()}
+
+    def buscar(self, palabras):
+        """
+        Posiciones, en orden de la tabla, cuyo nombre o composición contiene cada
+        palabra como palabra completa (equivale a \\bpalabra\\b en alguno de los campos).
+        """
+        if not palabras:
+            return []
+        listas = sorted((self.postings.get(p, frozenset()) for p in set(palabras)), key=len)
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            if not candidatos:
+                break
+            candidatos &= lista
+        return sorted(candidatos)
+
+
+def obtener_indice_palabras(df_info):
+    """Devuelve el índice de palabras de df_info, construyéndolo solo la primera vez"""
+    indice = obtener_indice(df_info)
+    indice_palabras = _indices_palabras.get(indice)
+    if indice_palabras is None:
+        indice_palabras = _indices_palabras[indice] = IndicePalabras(indice)
+    return indice_palabras
@@ -0,0 +1,77 @@
+import weakref
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.preparacion_datos import columna_normalizada
+from Modelo.ReglasClinicas.reglas_apoyo import normalizar_texto
+
+# Índices de usos ya construidos, uno por índice de medicamentos
+_indices_usos = weakref.WeakKeyDictionary()
+
+# Peso de cada coincidencia al ordenar candidatos por diagnóstico
+PESO_DIAGNOSTICO = 2
+PESO_SINONIMO = 1
+
+
+class IndiceUsos:
+    """
+    Índice invertido de los usos clínicos: palabra -> posiciones de los medicamentos
+    cuyo texto normalizado de 'usos' o 'usos_clinicos_ext' la contiene.
+    Una frase se busca intersectando las listas de sus palabras y verificando
+    la frase completa solo en esos candidatos.
+    """
+
+    COLUMNAS = ("usos", "usos_clinicos_ext")
+
+    def __init__(self, df_info):
+        self.textos = {}
+        self.postings = {}
+        for col in self.COLUMNAS:
+            textos = columna_normalizada(df_info, col).tolist()
+            postings = {}
+            for pos, texto in enumerate(textos):
+                for palabra in set(texto.split()):
+                    postings.setdefault(palabra, []).append(pos)
+            self.textos[col] = textos
+            self.postings[col] = postings
+
+    def buscar_frase(self, frase, columna):
+        """Posiciones cuyo texto contiene la frase como palabras completas (equivale a \\bfrase\\b)"""
+        palabras = frase.split()
+        if not palabras:
+            return set()
+        postings = self.postings[columna]
+        listas = sorted((postings.get(p, []) for p in set(palabras)), key=len)
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            if not candidatos:
+                break
+            candidatos.intersection_update(lista)
+        if len(palabras) == 1:
+            return candidatos
+        buscada = f" {' '.join(palabras)} "
+        textos = self.textos[columna]
+        return {pos for pos in candidatos if buscada in f" {textos[pos]} "}
+
+    def buscar_diagnostico(self, diag_norm, sinonimos=()):
+        """
+        Medicamentos indicados para el diagnóstico o sus sinónimos, ordenados por
+        fuerza de coincidencia (diagnóstico exacto en cada columna pesa más que un
+        sinónimo) y, a igual fuerza, por su orden en la tabla.
+        Devuelve una lista de (posición, fuerza).
+        """
+        fuerza = {}
+        frases = [(diag_norm, PESO_DIAGNOSTICO)]
+        frases += [(normalizar_texto(s), PESO_SINONIMO) for s in sinonimos]
+        for frase, peso in frases:
+            for col in self.COLUMNAS:
+                for pos in self.buscar_frase(frase, col):
+                    fuerza[pos] = fuerza.get(pos, 0) + peso
+        return sorted(fuerza.items(), key=lambda x: (-x[1], x[0]))
+
+
+def obtener_indice_usos(df_info):
+    """Devuelve el índice de usos de df_info, construyéndolo solo la primera vez"""
+    indice = obtener_indice(df_info)
+    indice_usos = _indices_usos.get(indice)
+    if indice_usos is None:
+        indice_usos = _indices_usos[indice] = IndiceUsos(indice.df)
+    return indice_usos
@@ -0,0 +1,106 @@
+import re
+from Modelo.MotorInferencia.registro_dataframes import asociar, asociado
+
+# Atributo de df_sust donde se guarda su mapa (vive lo mismo que el DataFrame)
+_ATRIBUTO_MAPA = "_mapa_nombres"
+
+
+def normalizar_medicamento(texto):
+    """Normaliza para comparación exacta"""
+    texto = str(texto).lower()
+    texto = re.sub(r'[^a-z0-9\s]', '', texto)  # Eliminar caracteres especiales
+    texto = re.sub(r'\s+', ' ', texto).strip()  # Unificar espacios
+    texto = re.sub(r'(\d)\s*(mg|%|ml|g)', r'\1\2', texto)  # Normalizar unidades
+    return texto
+
+
+def _columna_nombres(df, columna):
+    """Nombres de la columna sin espacios sobrantes (vacío si falta)"""
+    if columna not in df.columns:
+        return [""] * len(df)
+    return [v.strip() if isinstance(v, str) else "" for v in df[columna]]
+
+
+class MapaNombres:
+    """
+    Diccionario bilingüe de nombres de medicamentos construido una sola vez a partir
+    de df_sust: cualquier nombre (inglés, español o su forma normalizada) -> nombre
+    en inglés, y nombre en inglés -> nombre en español.
+    """
+
+    def __init__(self, df_sust):
+        self.df = df_sust
+        self.map_en = {}
+        self.map_es = {}
+        self.pares = []  # (inglés en minúsculas, nombre comercial en español) en el orden de la tabla
+        self._primera_fila = {}
+        for en, es in zip(_columna_nombres(df_sust, "medicamento_en"),
+                          _columna_nombres(df_sust, "medicamento_principal")):
+            en_name, es_name = en.lower(), es.lower()
+            self.map_en[en_name] = en_name
+            self.map_en[es_name] = en_name
+            self.map_es[en_name] = es_name
+            self._primera_fila.setdefault(en_name, es)
+            self.pares.append((en_name, es))
+
+        # Alias normalizados; los nombres tal cual tienen prioridad
+        for nombre, en_name in list(self.map_en.items()):
+            alias = normalizar_medicamento(nombre)
+            if alias:
+                self.map_en.setdefault(alias, en_name)
+
+        self._comerciales = {}
+        registrar_mapa(self)
+
+    def __len__(self):
+        return len(self.pares)
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        registrar_mapa(self)
+
+    def resolver(self, texto):
+        """Nombre en inglés para un nombre en cualquiera de los dos idiomas, o None"""
+        if not isinstance(texto, str):
+            return None
+        clave = texto.lower().strip()
+        en_name = self.map_en.get(clave)
+        if en_name is None:
+            en_name = self.map_en.get(normalizar_medicamento(clave))
+        return en_name
+
+    def nombre_espanol(self, nombre_en):
+        """Nombre en español de un medicamento en inglés (el mismo nombre si no hay traducción)"""
+        return self.map_es.get(str(nombre_en).lower(), nombre_en)
+
+    def nombre_comercial_es(self, nombre_en):
+        """
+        Nombre comercial en español para mostrar: primero por nombre exacto y,
+        si no lo hay, la primera fila cuyo nombre en inglés contiene al buscado.
+        """
+        buscado = str(nombre_en).lower()
+        if buscado in self._comerciales:
+            return self._comerciales[buscado] or nombre_en
+
+        es_name = self._primera_fila.get(buscado)
+        if es_name is None and buscado:
+            es_name = next((es for en, es in self.pares if buscado in en), None)
+        if len(self._comerciales) >= 1024:
+            self._comerciales.clear()
+        self._comerciales[buscado] = es_name or ""
+        return es_name or nombre_en
+
+
+def registrar_mapa(mapa):
+    """Asocia un mapa a su df_sust para reutilizarlo en llamadas posteriores"""
+    asociar(mapa.df, _ATRIBUTO_MAPA, mapa)
+
+
+def obtener_mapa_nombres(df_sust):
+    """Devuelve el MapaNombres de df_sust, construyéndolo solo la primera vez"""
+    if isinstance(df_sust, MapaNombres):
+        return df_sust
+    mapa = asociado(df_sust, _ATRIBUTO_MAPA)
+    if mapa is not None and len(mapa) == len(df_sust):
+        return mapa
+    return MapaNombres(df_sust)
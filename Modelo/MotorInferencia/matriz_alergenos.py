@@ -0,0 +1,62 @@
+import weakref
+import numpy as np
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+
+# Matrices ya construidas: índice de medicamentos -> {detector: matriz}
+_matrices = weakref.WeakKeyDictionary()
+
+
+class MatrizAlergenos:
+    """
+    Alérgenos contenidos en la composición de cada medicamento, como un bitset por
+    fila (bit i = alérgeno i de la lista del detector). Se construye una sola vez
+    recorriendo con el autómata del detector cada composición distinta; después,
+    cruzar los alérgenos de un paciente con miles de candidatos es un AND de bits.
+    """
+
+    def __init__(self, df_info, detector):
+        self.detector = detector
+        self.num_alergenos = len(detector.alergenos)
+
+        if "composicion" in df_info.columns:
+            composicion = df_info["composicion"]
+            textos = composicion.astype(str).str.lower().where(composicion.notna(), "")
+        else:
+            textos = np.full(len(df_info), "", dtype=object)
+        unicos, inversa = np.unique(np.asarray(textos, dtype=object).astype(str), return_inverse=True)
+
+        bits = np.zeros((len(unicos), max(self.num_alergenos, 1)), dtype=bool)
+        for j, texto in enumerate(unicos):
+            for _, _, i in detector.buscar(texto):
+                bits[j, i] = True
+        self.bits = np.packbits(bits, axis=1)[inversa]
+
+    def mascara(self, indices):
+        """Bitset de los alérgenos indicados (p. ej. los declarados por el paciente)"""
+        bits = np.zeros(self.bits.shape[1] * 8, dtype=bool)
+        bits[list(indices)] = True
+        return np.packbits(bits)
+
+    def contiene(self, i, posiciones=None):
+        """Filas cuya composición contiene el alérgeno i"""
+        columna = self.bits[:, i >> 3] if posiciones is None else self.bits[posiciones, i >> 3]
+        return (columna >> (7 - (i & 7))) & 1 == 1
+
+    def con_alergenos(self, indices, posiciones=None):
+        """Filas cuya composición contiene alguno de los alérgenos indicados"""
+        bits = self.bits if posiciones is None else self.bits[posiciones]
+        if not len(indices):
+            return np.zeros(len(bits), dtype=bool)
+        return (bits & self.mascara(indices)).any(axis=1)
+
+
+def obtener_matriz_alergenos(df_info, detector):
+    """Devuelve la matriz de alérgenos de df_info para el detector, construyéndola solo la primera vez"""
+    indice = obtener_indice(df_info)
+    matrices = _matrices.setdefault(indice, {})
+    matriz = matrices.get(detector)
+    if matriz is None:
+        if len(matrices) >= 8:
+            matrices.clear()
+        matriz = matrices[detector] = MatrizAlergenos(indice.df, detector)
+    return matriz
@@ -0,0 +1,191 @@
+import json
+import time
+import hashlib
+import weakref
+from pathlib import Path
+from collections import OrderedDict
+from threading import Lock
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.mapa_nombres import normalizar_medicamento, obtener_mapa_nombres
+from Modelo.MotorInferencia.registro_dataframes import obtener_o_construir
+from Modelo.BaseConocimiento.snapshot import ruta_snapshot
+
+# Incrementar cuando cambie el formato del archivo de resoluciones
+VERSION_RESOLUCIONES = 1
+NOMBRE_RESOLUCIONES = "resoluciones_medicamentos.json"
+
+# Atributo de df_info donde se guarda su memoria (vive lo mismo que el DataFrame)
+_ATRIBUTO_MEMORIA = "_memoria_resoluciones"
+
+
+class MemoriaResoluciones:
+    """
+    Memoria acotada (LRU) de la cascada de búsqueda del medicamento actual:
+    entrada normalizada -> (posición en df_info, nombre en inglés, nombre en español, etapa).
+    Las entradas que no se encuentran también se guardan, para no repetir la cascada.
+    Cuenta cuántas consultas resuelve cada etapa y cuánto tarda cada una.
+    """
+
+    def __init__(self, df_info, df_sust, max_entradas=4096):
+        # Referencias débiles: la memoria no debe mantener vivos los DataFrames
+        self._df_info = weakref.ref(df_info)
+        self._df_sust = weakref.ref(df_sust)
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.etapas = {}  # etapa -> {"consultas", "intentos", "resueltos", "tiempo_s"}
+
+    @property
+    def df_info(self):
+        return self._df_info()
+
+    @property
+    def df_sust(self):
+        return self._df_sust()
+
+    def _etapa(self, nombre):
+        return self.etapas.setdefault(nombre, {"consultas": 0, "intentos": 0, "resueltos": 0, "tiempo_s": 0.0})
+
+    def resolver(self, med_input, etapas):
+        """
+        Devuelve (posición, nombre en inglés, nombre en español) o None si no se encuentra.
+        etapas: lista de (nombre, función(in_lower, df_info, df_sust)) que se prueban en orden
+        solo si la entrada no está en la memoria.
+        """
+        clave = normalizar_medicamento(med_input)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                self._etapa(entrada[3] or "no_encontrado")["consultas"] += 1
+                return entrada[:3] if entrada[0] is not None else None
+
+        entrada = (None, None, None, None)
+        duraciones = []
+        for nombre, funcion in etapas:
+            t0 = time.perf_counter()
+            resultado = funcion(clave, self.df_info, self.df_sust)
+            duraciones.append((nombre, time.perf_counter() - t0))
+            if resultado is not None:
+                pos, med_en, med_es = resultado
+                entrada = (int(pos), med_en, med_es, nombre)
+                break
+
+        with self._lock:
+            self.fallos += 1
+            for nombre, duracion in duraciones:
+                stats = self._etapa(nombre)
+                stats["intentos"] += 1
+                stats["tiempo_s"] += duracion
+            if entrada[3] is not None:
+                self._etapa(entrada[3])["resueltos"] += 1
+            self._etapa(entrada[3] or "no_encontrado")["consultas"] += 1
+            self._guardar_entrada(clave, entrada)
+        return entrada[:3] if entrada[0] is not None else None
+
+    def _guardar_entrada(self, clave, entrada):
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def estadisticas(self):
+        """Aciertos y fallos de la memoria y, por etapa, consultas servidas, intentos y tiempo medio"""
+        with self._lock:
+            etapas = {
+                nombre: {**stats, "tiempo_medio_ms": 1000 * stats["tiempo_s"] / stats["intentos"] if stats["intentos"] else 0.0}
+                for nombre, stats in self.etapas.items()
+            }
+            return {"aciertos": self.aciertos, "fallos": self.fallos, "entradas": len(self._entradas), "etapas": etapas}
+
+    def huella(self):
+        """Huella de los datos de los que dependen las resoluciones (nombres, composiciones y mapa)"""
+        indice = obtener_indice(self.df_info)
+        h = hashlib.sha256()
+        for textos in (indice.nombres, indice.composiciones):
+            h.update("\x1f".join(textos).encode("utf-8"))
+        for en, es in obtener_mapa_nombres(self.df_sust).pares:
+            h.update(f"\x1e{en}\x1f{es}".encode("utf-8"))
+        return h.hexdigest()
+
+    def guardar(self, ruta):
+        """Escribe las resoluciones en un archivo JSON de forma atómica"""
+        ruta = Path(ruta)
+        with self._lock:
+            entradas = [[clave, *entrada] for clave, entrada in self._entradas.items()]
+        contenido = {"version": VERSION_RESOLUCIONES, "huella": self.huella(), "entradas": entradas}
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(contenido, f, ensure_ascii=False)
+            temporal.replace(ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar las resoluciones: {e}")
+
+    def cargar(self, ruta):
+        """Carga las resoluciones de una sesión anterior si corresponden a los mismos datos"""
+        ruta = Path(ruta)
+        if not ruta.exists():
+            return 0
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                contenido = json.load(f)
+            if contenido.get("version") != VERSION_RESOLUCIONES or contenido.get("huella") != self.huella():
+                return 0
+            with self._lock:
+                for clave, pos, en, es, etapa in contenido["entradas"]:
+                    self._guardar_entrada(clave, (pos, en, es, etapa))
+            return len(contenido["entradas"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Resoluciones descartadas ({e})")
+            return 0
+
+
+def obtener_memoria_resoluciones(df_info, df_sust):
+    """Devuelve la memoria de resoluciones de los datos, creándola solo la primera vez"""
+    return obtener_o_construir(
+        df_info, _ATRIBUTO_MEMORIA,
+        lambda: MemoriaResoluciones(df_info, df_sust),
+        vigente=lambda memoria: memoria.df_sust is df_sust
+    )
+
+
+def ruta_resoluciones(rutas):
+    """Archivo de resoluciones, junto al snapshot de la base de conocimiento"""
+    return ruta_snapshot(rutas).with_name(NOMBRE_RESOLUCIONES)
+
+
+def ruta_parcial(ruta, pid):
+    """Archivo de resoluciones de un proceso trabajador (resoluciones_medicamentos.<pid>.json)"""
+    ruta = Path(ruta)
+    return ruta.with_name(f"{ruta.stem}.{pid}{ruta.suffix}")
+
+
+def guardar_con_parciales(memoria, ruta):
+    """
+    Une a la memoria las resoluciones que dejaron los procesos trabajadores,
+    borra sus archivos parciales y guarda el archivo de resoluciones
+    """
+    ruta = Path(ruta)
+    for parcial in sorted(ruta.parent.glob(f"{ruta.stem}.*{ruta.suffix}")):
+        memoria.cargar(parcial)
+        parcial.unlink(missing_ok=True)
+    memoria.guardar(ruta)
+
+
+def cargar_resoluciones(datos, rutas):
+    """Memoria de resoluciones de los datos con lo guardado en sesiones anteriores"""
+    memoria = obtener_memoria_resoluciones(datos['df_info'], datos['df_sust'])
+    memoria.cargar(ruta_resoluciones(rutas))
+    return memoria
+
+
+def resumen_etapas(estadisticas):
+    """Texto de una línea con las consultas resueltas por cada etapa y su tiempo medio"""
+    return " | ".join(
+        f"{nombre}: {stats['consultas']} ({stats['tiempo_medio_ms']:.1f} ms)"
+        for nombre, stats in estadisticas["etapas"].items()
+    )
@@ -0,0 +1,113 @@
+import pandas as pd
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.mapa_nombres import obtener_mapa_nombres
+from Modelo.ReglasClinicas.reglas_apoyo import normalizar_texto
+
+MARCA_PREPARADO = "preparado"
+
+# Columnas de df_info que se guardan también normalizadas (sin tildes ni signos)
+COLUMNAS_NORMALIZADAS = ["usos", "usos_clinicos_ext", "composicion", "medicamento", "clase terapeutica", "clase quimica"]
+
+
+def limpiar_y_convertir(valor):
+    """Convierte valores a string y limpia NaN/None, manteniendo números como números"""
+    if pd.isna(valor):
+        return ""
+    try:
+        return float(valor) if str(valor).replace('.', '', 1).isdigit() else str(valor).strip()
+    except:
+        return str(valor).strip()
+
+
+def esta_preparado(df):
+    """Indica si el DataFrame ya pasó por la etapa de preparación"""
+    return bool(getattr(df, "attrs", {}).get(MARCA_PREPARADO, False))
+
+
+def _es_columna_texto(serie):
+    return pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie)
+
+
+def preparar_dataframe(df):
+    """
+    Prepara un DataFrame una sola vez: columnas de texto sin NaN y sin espacios
+    sobrantes, y columnas totalmente numéricas convertidas a float.
+    Si ya está preparado lo devuelve tal cual.
+    """
+    if esta_preparado(df):
+        return df
+
+    df = df.copy()
+    for col in df.columns:
+        if not _es_columna_texto(df[col]):
+            continue
+        texto = df[col].fillna("").astype(str).str.strip()
+        no_vacios = texto[texto != ""]
+        if len(no_vacios) and no_vacios.str.replace('.', '', n=1, regex=False).str.isdigit().all():
+            df[col] = pd.to_numeric(texto.where(texto != ""), errors="coerce")
+        else:
+            df[col] = texto.astype(object)
+
+    df.attrs[MARCA_PREPARADO] = True
+    return df
+
+
+def nombre_normalizado(columna):
+    """Nombre de la columna normalizada: 'clase terapeutica' -> 'clase_terapeutica_norm'"""
+    return columna.replace(" ", "_") + "_norm"
+
+
+def normalizar_serie(serie):
+    """Aplica normalizar_texto una sola vez por valor distinto de la serie"""
+    valores = serie.fillna("").astype(str)
+    return valores.map({v: normalizar_texto(v) for v in valores.unique()})
+
+
+def agregar_columnas_normalizadas(df):
+    """Añade las columnas *_norm de df_info para que las búsquedas solo las consulten"""
+    for col in COLUMNAS_NORMALIZADAS:
+        if col in df.columns and nombre_normalizado(col) not in df.columns:
+            df[nombre_normalizado(col)] = normalizar_serie(df[col])
+    return df
+
+
+def columna_normalizada(df, columna):
+    """Columna normalizada precalculada; si el DataFrame no la tiene, se calcula al vuelo"""
+    nombre = nombre_normalizado(columna)
+    if nombre in df.columns:
+        return df[nombre]
+    if columna not in df.columns:
+        return pd.Series("", index=df.index)
+    return normalizar_serie(df[columna])
+
+
+def preparar_datos(datos):
+    """
+    Etapa única de preparación de la base de conocimiento.
+    Limpia df_info y df_sust, añade a df_info las columnas de texto normalizado,
+    normaliza la lista de alérgenos y construye el índice de medicamentos y el
+    mapa bilingüe de nombres. Es idempotente: en llamadas posteriores no recorre las tablas.
+    """
+    if datos.get(MARCA_PREPARADO) and all(
+        esta_preparado(datos[k]) for k in ("df_info", "df_sust") if k in datos
+    ):
+        return datos
+
+    for clave in ("df_info", "df_sust"):
+        if clave in datos and hasattr(datos[clave], "copy"):
+            datos[clave] = preparar_dataframe(datos[clave])
+
+    if "df_info" in datos and hasattr(datos["df_info"], "columns"):
+        agregar_columnas_normalizadas(datos["df_info"])
+
+    if "lista_alergenos" in datos:
+        datos["lista_alergenos"] = [limpiar_y_convertir(a) for a in datos["lista_alergenos"]]
+
+    if "df_info" in datos:
+        datos["indice"] = obtener_indice(datos["df_info"])
+
+    if "df_sust" in datos and hasattr(datos["df_sust"], "columns"):
+        datos["mapa_nombres"] = obtener_mapa_nombres(datos["df_sust"])
+
+    datos[MARCA_PREPARADO] = True
+    return datos
@@ -0,0 +1,238 @@
+import weakref
+import numpy as np
+import pandas as pd
+from Modelo.ReglasClinicas.reglas_apoyo import misma_familia, obtener_componente_principal
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.tabla_componentes import obtener_tabla_componentes
+from Modelo.MotorInferencia.matriz_alergenos import obtener_matriz_alergenos
+
+# Códigos de justificación y su texto (mismo texto que score_sustituto)
+JUSTIFICACIONES = {
+    "REVIEW_EXCELENTE": "✔️ Excelente puntaje de review (≥80)",
+    "REVIEW_BUENA": "✔️ Buen puntaje de review (50–79)",
+    "MISMO_COMPONENTE": "✔️ Mismo componente principal",
+    "COMPONENTE_DIFERENTE": "🔹 Componente diferente, pero cumple función terapéutica similar",
+    "COMPONENTE_NO_IDENTIFICADO": "⚠️ Componente no identificado correctamente",
+    "CLASE_Y_USO": "✔️ Misma clase terapéutica y uso apropiado para {diagnostico}",
+    "NO_INDICADO": "🔹 No indicado para {diagnostico}",
+    "CLASE_SIN_INDICACION": "⚠️ Clase terapéutica coincide, pero sin indicación clara para el diagnóstico",
+    "MISMA_CLASE_QUIMICA": "✔️ Misma clase química",
+    "INDICADO_ESPECIFICO": "✔️ Indicado específicamente para {diagnostico}",
+    "USOS_GENERALES": "✔️ Coincide en usos generales para {diagnostico}",
+    "RIESGO_GRAVE": "⚠️ Riesgo de reacción grave",
+    "IRRITACION_LEVE": "⚠️ Puede causar irritación leve",
+    "ALERGIA": "❌ Alergia detectada a {alergeno}",
+    "CRUCE_FAMILIA": "⚠️ Posible cruce con familia alergénica (revisión médica necesaria)",
+    "OTRA_FAMILIA": "✔️ Diferente familia farmacológica (mayor seguridad en alergias)",
+    "COMPOSICION_SIMILAR": "✔️ Composición parcialmente similar",
+    "COMPOSICION_DIFERENTE": "🔹 Composición diferente",
+}
+
+# Una columna de código por regla, en el orden en que score_sustituto arma la justificación
+REGLAS = ["review", "componente", "clase", "clase_quimica", "indicacion", "efectos", "alergia", "razon"]
+
+# Rasgos del catálogo que no dependen del paciente, calculados una vez por índice
+_rasgos = weakref.WeakKeyDictionary()
+
+
+def _columna(df, nombre, defecto=""):
+    if nombre in df.columns:
+        return df[nombre]
+    return pd.Series(defecto, index=df.index)
+
+
+def _componente_principal(serie):
+    """Versión vectorizada de obtener_componente_principal"""
+    return (serie.fillna("").astype(str).str.lower()
+            .str.split("+", regex=False).str[0]
+            .str.split("(", regex=False).str[0].str.strip())
+
+
+def _ids_unicos(serie, tabla):
+    """Id de ingrediente de cada valor distinto de la serie"""
+    return {v: tabla.id_ingrediente(v) for v in serie.unique()}
+
+
+def _contiene(textos, texto):
+    return np.fromiter((texto in t for t in textos), dtype=bool, count=len(textos))
+
+
+def rasgos_catalogo(df_info):
+    """
+    Columnas derivadas de df_info que las reglas usan en cada consulta (texto en
+    minúsculas, componente principal, efectos graves, familia alergénica...).
+    Se calculan una sola vez por DataFrame y se reutilizan en todas las consultas.
+    """
+    indice = obtener_indice(df_info)
+    rasgos = _rasgos.get(indice)
+    if rasgos is not None:
+        return rasgos
+
+    df = indice.df
+    tabla = obtener_tabla_componentes(indice)
+    composicion = _columna(df, "composicion")
+    comp = pd.Series(tabla.principal_texto, index=df.index)
+    comp_sustituto = composicion.astype(str).str.lower()
+    usos_bas = _columna(df, "usos").astype(str).str.lower()
+    usos_ext = _columna(df, "usos_clinicos_ext").astype(str).str.lower()
+    clase_ter = _columna(df, "clase terapeutica")
+    detalles = _columna(df, "efectos_secundarios_detallados").astype(str).str.lower()
+    comp_nombre = _componente_principal(_columna(df, "medicamento"))
+    grave = detalles.str.contains(r"(?:quemadura|fotosensibilidad)", na=False).to_numpy()
+
+    rasgos = {
+        "nombre": _columna(df, "medicamento").to_numpy(),
+        "review": pd.to_numeric(_columna(df, "review_excelente", 0), errors="coerce").to_numpy(),
+        "comp": comp.to_numpy(),
+        "comp_id": tabla.principal,
+        "comp_nombre": comp_nombre.to_numpy(),
+        "comp_nombre_id": comp_nombre.map(_ids_unicos(comp_nombre, tabla)).to_numpy(dtype=np.int32),
+        "comp_sustituto": comp_sustituto.to_numpy(),
+        "composicion_valida": composicion.notna().to_numpy(),
+        "usos_bas": usos_bas.to_numpy(),
+        "usos_ext": usos_ext.to_numpy(),
+        "usos_all": (usos_bas + " " + usos_ext).to_numpy(),
+        "clase_es_texto": clase_ter.map(lambda c: isinstance(c, str)).to_numpy(dtype=bool),
+        "clase_ter": clase_ter.astype(str).str.strip().str.lower().to_numpy(),
+        "clase_quimica": _columna(df, "clase quimica").astype(str).str.lower().to_numpy(),
+        "efecto_grave": grave,
+        "efecto_leve": ~grave & detalles.str.contains(r"(?:sequedad|irritaci[oó]n leve)", na=False).to_numpy(),
+        "misma_familia": np.array([misma_familia(a.strip(), b.strip()) for a, b in zip(comp, comp_sustituto)], dtype=bool),
+        # El componente principal siempre forma parte de la propia composición
+        "comp_similar": tabla.principal >= 0,
+    }
+    _rasgos[indice] = rasgos
+    return rasgos
+
+
+def puntuar_candidatos(df_info, clase_act, contexto, razon=None, posiciones=None, nombres_es=None, justificar=True):
+    """
+    Aplica las reglas de score_sustituto como operaciones de columna sobre varios candidatos.
+    Parámetros:
+        df_info: DataFrame con información de medicamentos
+        clase_act: clase terapéutica del medicamento actual
+        contexto: ContextoPaciente de la consulta
+        razon: motivo de la sustitución ('alergia' o 'desabastecimiento')
+        posiciones: posiciones de los candidatos en df_info (por defecto, todo el catálogo)
+        nombres_es: nombre en español de cada candidato (por defecto, su propio nombre)
+        justificar: si es False no se redacta la columna 'justificacion'
+    Devuelve un DataFrame con medicamento, score, el código de cada regla, el alérgeno
+    detectado y, opcionalmente, la justificación en texto.
+    """
+    rasgos = rasgos_catalogo(df_info)
+    if posiciones is None:
+        posiciones = np.arange(len(df_info))
+    else:
+        posiciones = np.asarray(posiciones, dtype=int)
+    r = {k: v[posiciones] for k, v in rasgos.items()}
+    n = len(posiciones)
+    diag = contexto.diag_lower
+    razon = razon.lower() if razon else None
+    base = np.zeros(n, dtype=int)
+    codigos = {}
+
+    # 1) Review escalada
+    excelente, buena = r["review"] >= 80, r["review"] >= 50
+    base += np.where(excelente, 2, np.where(buena, 1, 0))
+    codigos["review"] = np.select([excelente, buena], ["REVIEW_EXCELENTE", "REVIEW_BUENA"], None)
+
+    # 2) Componente principal
+    comp_actual, comp_actual_id = r["comp_nombre"], r["comp_nombre_id"]
+    if nombres_es is not None:
+        # Solo se recalcula para los nombres que no coinciden con el del propio candidato
+        tabla = obtener_tabla_componentes(df_info)
+        comp_actual, comp_actual_id = comp_actual.copy(), comp_actual_id.copy()
+        for k, (nombre, propio) in enumerate(zip(nombres_es, r["nombre"])):
+            if nombre != propio:
+                comp_actual[k] = obtener_componente_principal(nombre)
+                comp_actual_id[k] = tabla.id_ingrediente(comp_actual[k])
+    identificados = (r["comp"] != "") & (comp_actual != "")
+    mismo = identificados & (r["comp_id"] == comp_actual_id)
+    base += np.where(mismo, 5, 0)
+    codigos["componente"] = np.where(mismo, "MISMO_COMPONENTE", np.where(
+        identificados, "COMPONENTE_DIFERENTE", "COMPONENTE_NO_IDENTIFICADO")).astype(object)
+
+    # 3) Clase terapéutica con uso clínico para el diagnóstico
+    diag_en_usos = _contiene(r["usos_all"], diag)
+    if isinstance(clase_act, str):
+        misma_clase = r["clase_es_texto"] & (r["clase_ter"] == clase_act.strip().lower())
+    else:
+        misma_clase = np.zeros(n, dtype=bool)
+    clase_y_uso = misma_clase & diag_en_usos
+    no_indicado = ~clase_y_uso & bool(diag) & ~diag_en_usos
+    base += np.where(clase_y_uso, 2, np.where(no_indicado, -1, 0))
+    codigos["clase"] = np.where(clase_y_uso, "CLASE_Y_USO", np.where(
+        no_indicado, "NO_INDICADO", "CLASE_SIN_INDICACION")).astype(object)
+
+    # 4) Clase química genérica
+    misma_quimica = r["clase_quimica"] == clase_act.lower()
+    base += np.where(misma_quimica, 1, 0)
+    codigos["clase_quimica"] = np.where(misma_quimica, "MISMA_CLASE_QUIMICA", None)
+
+    # 5) Indicación genérica según diagnóstico (suma 0.5)
+    if diag:
+        especifico = _contiene(r["usos_ext"], diag)
+        generales = ~especifico & _contiene(r["usos_bas"], diag)
+    else:
+        especifico = generales = np.zeros(n, dtype=bool)
+    codigos["indicacion"] = np.select([especifico, generales], ["INDICADO_ESPECIFICO", "USOS_GENERALES"], None)
+
+    # 6) Penalizaciones por efectos secundarios
+    base += np.where(r["efecto_grave"], -2, np.where(r["efecto_leve"], -1, 0))
+    codigos["efectos"] = np.select([r["efecto_grave"], r["efecto_leve"]], ["RIESGO_GRAVE", "IRRITACION_LEVE"], None)
+
+    # 7) Alergias del paciente (primer alérgeno mencionado que está en la composición)
+    alergeno = np.full(n, None, dtype=object)
+    alergia = np.zeros(n, dtype=bool)
+    if contexto.alergenos_mencionados and isinstance(contexto.notas, str):
+        detector = contexto.detector
+        matriz = obtener_matriz_alergenos(df_info, detector)
+        for i in contexto.alergenos_mencionados:
+            nuevos = ~alergia & r["composicion_valida"] & matriz.contiene(i, posiciones)
+            alergeno[nuevos] = detector.alergenos[i]
+            alergia |= nuevos
+    base += np.where(alergia, -10, 0)
+    codigos["alergia"] = np.where(alergia, "ALERGIA", None)
+    if razon == 'alergia':
+        base += np.where(alergia, 0, np.where(r["misma_familia"], -5, 5))
+        codigos["alergia"] = np.where(alergia, "ALERGIA", np.where(
+            r["misma_familia"], "CRUCE_FAMILIA", "OTRA_FAMILIA")).astype(object)
+
+    # 8) Otros factores de razón
+    codigos["razon"] = np.full(n, None, dtype=object)
+    if razon == 'desabastecimiento':
+        base += np.where(r["comp_similar"], 3, 0)
+        codigos["razon"] = np.where(r["comp_similar"], "COMPOSICION_SIMILAR", "COMPOSICION_DIFERENTE").astype(object)
+
+    # 9) Normalizar a rango [0,10]
+    score = np.clip(base + np.where(especifico | generales, 0.5, 0.0), 0, 10)
+
+    resultado = pd.DataFrame({"medicamento": r["nombre"], "score": score})
+    for regla in REGLAS:
+        resultado[regla] = codigos[regla]
+    resultado["alergeno"] = alergeno
+    if justificar:
+        resultado["justificacion"] = [
+            redactar_justificacion(fila, contexto.diagnostico)
+            for fila in resultado[REGLAS + ["alergeno"]].itertuples(index=False)
+        ]
+    return resultado
+
+
+def codigos_justificacion(fila):
+    """Códigos de las reglas aplicadas a un candidato, en orden"""
+    return tuple(c for c in (getattr(fila, regla) for regla in REGLAS) if c is not None)
+
+
+def redactar_justificacion(fila, diagnostico):
+    """Texto de la justificación a partir de los códigos, igual al de score_sustituto"""
+    return ", ".join(
+        JUSTIFICACIONES[c].format(diagnostico=diagnostico, alergeno=fila.alergeno)
+        for c in codigos_justificacion(fila)
+    )
+
+
+def valor_score(score):
+    """Devuelve el score con el mismo tipo que score_sustituto (entero si no tiene decimales)"""
+    score = float(score)
+    return int(score) if score.is_integer() else score
@@ -0,0 +1,33 @@
+from threading import RLock
+
+# Candado de construcción: dos hilos no construyen a la vez la misma estructura
+_lock = RLock()
+
+
+def asociar(df, nombre, objeto):
+    """
+    Guarda una estructura derivada en el propio DataFrame, de modo que vive lo
+    mismo que él: no se copia con df.copy() ni se serializa con el DataFrame.
+    """
+    object.__setattr__(df, nombre, objeto)
+
+
+def asociado(df, nombre):
+    """Estructura guardada con asociar, o None si no existe"""
+    return getattr(df, "__dict__", {}).get(nombre)
+
+
+def obtener_o_construir(df, nombre, construir, vigente=None):
+    """
+    Estructura asociada al DataFrame; si no existe (o vigente(estructura) es
+    falso) se construye con construir() una sola vez, aunque la pidan varios hilos.
+    """
+    objeto = asociado(df, nombre)
+    if objeto is not None and (vigente is None or vigente(objeto)):
+        return objeto
+    with _lock:
+        objeto = asociado(df, nombre)
+        if objeto is None or (vigente is not None and not vigente(objeto)):
+            objeto = construir()
+            asociar(df, nombre, objeto)
+        return objeto
@@ -0,0 +1,141 @@
+import weakref
+import numpy as np
+from difflib import SequenceMatcher
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.registro_dataframes import obtener_o_construir
+
+# Atributo de df_info donde se guarda (referencia débil a df_sust, resolvedor)
+_ATRIBUTO_RESOLVEDOR = "_resolvedor_nombres"
+
+
+def trigramas(texto):
+    """Trigramas de caracteres del texto con relleno en los extremos"""
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class ResolvedorNombres:
+    """
+    Búsqueda aproximada de nombres de medicamentos (inglés y español).
+    Un índice de trigramas preselecciona los nombres más parecidos y solo a esos se
+    les calcula la similitud de difflib. Después, una cota superior de la similitud
+    (caracteres en común, la misma que usa quick_ratio) descarta el resto del
+    catálogo sin calcular nada, de modo que el resultado es el mismo que el de
+    get_close_matches sobre todos los nombres.
+    """
+
+    def __init__(self, nombres, preseleccion=32):
+        """nombres: dict nombre en minúsculas -> nombre en inglés del medicamento"""
+        self.textos = list(nombres)
+        self.claves = [nombres[t] for t in self.textos]
+        self.preseleccion = preseleccion
+
+        postings = {}
+        self.num_trigramas = np.zeros(len(self.textos), dtype=np.int32)
+        for i, texto in enumerate(self.textos):
+            grams = trigramas(texto)
+            self.num_trigramas[i] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+        # Conteo de cada carácter por nombre, para la cota de similitud
+        self.alfabeto = {ch: j for j, ch in enumerate(sorted(set("".join(self.textos))))}
+        self.conteos = np.zeros((len(self.textos), len(self.alfabeto)), dtype=np.int16)
+        for i, texto in enumerate(self.textos):
+            for ch in texto:
+                self.conteos[i, self.alfabeto[ch]] += 1
+        self.longitudes = np.array([len(t) for t in self.textos], dtype=np.int32)
+
+    def _preseleccion(self, grams):
+        """Posiciones de los nombres con más trigramas en común con la consulta"""
+        listas = [self.postings[g] for g in grams if g in self.postings]
+        if not listas:
+            return np.array([], dtype=np.int64)
+        comunes = np.bincount(np.concatenate(listas), minlength=len(self.textos))
+        dice = 2 * comunes / (len(grams) + self.num_trigramas)
+        if len(dice) > self.preseleccion:
+            elegidos = np.argpartition(-dice, self.preseleccion)[:self.preseleccion]
+        else:
+            elegidos = np.arange(len(dice))
+        return elegidos[comunes[elegidos] > 0]
+
+    def _cota(self, consulta):
+        """SequenceMatcher.quick_ratio() de la consulta con cada nombre: cota superior de ratio()"""
+        cq = np.zeros(len(self.alfabeto), dtype=np.int16)
+        for ch in consulta:
+            j = self.alfabeto.get(ch)
+            if j is not None:
+                cq[j] += 1
+        comunes = np.minimum(self.conteos, cq).sum(axis=1)
+        return 2.0 * comunes / (len(consulta) + self.longitudes)
+
+    def candidatos(self, consulta, k=5, cutoff=0.6):
+        """Los k nombres más parecidos como (nombre, nombre_en, similitud), de mayor a menor"""
+        consulta = str(consulta).strip().lower()
+        if not consulta or not self.textos:
+            return []
+
+        s = SequenceMatcher()
+        s.set_seq2(consulta)
+        resultado = []
+        evaluados = set()
+
+        def evaluar(i):
+            # La cota es quick_ratio(), así que solo falta calcular ratio()
+            evaluados.add(i)
+            s.set_seq1(self.textos[i])
+            ratio = s.ratio()
+            if ratio >= cutoff:
+                resultado.append((ratio, self.textos[i], self.claves[i]))
+
+        def umbral():
+            if len(resultado) < k:
+                return cutoff
+            return max(cutoff, sorted(resultado, reverse=True)[k - 1][0])
+
+        cota = self._cota(consulta)
+        for i in self._preseleccion(trigramas(consulta)):
+            if cota[i] >= cutoff:
+                evaluar(int(i))
+
+        # Solo se revisan los nombres cuya cota aún puede superar a los k mejores
+        restantes = np.flatnonzero(cota >= umbral())
+        for i in restantes[np.argsort(-cota[restantes], kind="stable")]:
+            if cota[i] < umbral():
+                break
+            if int(i) not in evaluados:
+                evaluar(int(i))
+
+        resultado.sort(reverse=True)
+        return [(texto, clave, ratio) for ratio, texto, clave in resultado[:k]]
+
+    def resolver(self, consulta, cutoff=0.6):
+        """Nombre en inglés del medicamento más parecido o None"""
+        mejores = self.candidatos(consulta, k=1, cutoff=cutoff)
+        return mejores[0][1] if mejores else None
+
+
+def nombres_catalogo(df_info, df_sust=None):
+    """Nombres en inglés de df_info y nombres en español de df_sust que apuntan a ellos"""
+    indice = obtener_indice(df_info)
+    nombres = {n: n for n in indice.nombres if n}
+    if df_sust is not None and {"medicamento_en", "medicamento_principal"} <= set(df_sust.columns):
+        for en, es in zip(df_sust["medicamento_en"], df_sust["medicamento_principal"]):
+            if not isinstance(en, str) or not isinstance(es, str):
+                continue
+            en, es = en.strip().lower(), es.strip().lower()
+            if es and es not in nombres and indice.buscar_nombre(en) is not None:
+                nombres[es] = en
+    return nombres
+
+
+def obtener_resolvedor(df_info, df_sust=None):
+    """Devuelve el resolvedor de nombres de los datos, construyéndolo solo la primera vez"""
+    ref_sust = weakref.ref(df_sust) if df_sust is not None else (lambda: None)
+    _, resolvedor = obtener_o_construir(
+        df_info, _ATRIBUTO_RESOLVEDOR,
+        lambda: (ref_sust, ResolvedorNombres(nombres_catalogo(df_info, df_sust))),
+        vigente=lambda entrada: entrada[0]() is df_sust
+    )
+    return resolvedor
@@ -0,0 +1,141 @@
+import re
+import weakref
+import numpy as np
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.ReglasClinicas.reglas_apoyo import normalizar_texto
+
+# Tablas de componentes ya construidas, una por índice de medicamentos
+_tablas = weakref.WeakKeyDictionary()
+
+# Id de un ingrediente que no aparece en ninguna composición del catálogo
+DESCONOCIDO = -2
+
+# Dosis al final del componente: "(500 mg)", "(0.5% p/v)", "(62.5mcg)"
+_DOSIS = re.compile(r"\(\s*(\d+(?:\.\d+)?)\s*([^()]*?)\s*\)\s*$")
+
+# Unidades de masa que se comparan convertidas a mg
+FACTORES_MG = {"g": 1000.0, "gm": 1000.0, "mg": 1.0, "mcg": 0.001, "µg": 0.001, "ug": 0.001}
+
+
+def parsear_composicion(composicion):
+    """
+    Separa una composición en una lista de (ingrediente, dosis, unidad):
+    "amoxicilina (500 mg) + acido clavulanico (125mg)" ->
+    [("amoxicilina", 500.0, "mg"), ("acido clavulanico", 125.0, "mg")].
+    El ingrediente es el texto antes del primer paréntesis, igual que en
+    obtener_componente_principal; si no hay dosis numérica, dosis es None.
+    """
+    if not isinstance(composicion, str):
+        return []
+    componentes = []
+    for parte in composicion.lower().split("+"):
+        nombre = parte.split("(")[0].strip()
+        m = _DOSIS.search(parte)
+        if m:
+            componentes.append((nombre, float(m.group(1)), m.group(2).strip()))
+        else:
+            componentes.append((nombre, None, ""))
+    return componentes
+
+
+class TablaComponentes:
+    """
+    Composiciones de df_info separadas una sola vez en una tabla por columnas:
+    una fila por componente (id de ingrediente, dosis e id de unidad) y, por
+    medicamento, el rango de sus componentes, el id de su componente principal
+    y el índice ingrediente -> medicamentos que lo contienen.
+    Los ingredientes se identifican por su texto normalizado (normalizar_texto).
+    """
+
+    def __init__(self, indice):
+        self.ids = {}          # ingrediente normalizado -> id
+        self.ingredientes = []
+        ids_unidad = {"": 0}
+
+        cache = {}
+        inicio, ingrediente, dosis, unidad = [0], [], [], []
+        principal, principal_texto = [], []
+        for comp in indice.composiciones:
+            partes = cache.get(comp)
+            if partes is None:
+                partes = cache[comp] = [
+                    (nombre, self._internar(nombre) if nombre else -1, d,
+                     ids_unidad.setdefault(u, len(ids_unidad)))
+                    for nombre, d, u in parsear_composicion(comp)
+                ]
+            for _, id_ing, d, id_uni in partes:
+                ingrediente.append(id_ing)
+                dosis.append(np.nan if d is None else d)
+                unidad.append(id_uni)
+            inicio.append(len(ingrediente))
+            nombre_principal = partes[0][0] if partes else ""
+            principal_texto.append(nombre_principal)
+            principal.append(partes[0][1] if partes else -1)
+        self.unidades = list(ids_unidad)
+
+        self.inicio = np.array(inicio, dtype=np.int64)
+        self.ingrediente = np.array(ingrediente, dtype=np.int32)
+        self.dosis = np.array(dosis, dtype=np.float64)
+        self.unidad = np.array(unidad, dtype=np.int16)
+        self.principal = np.array(principal, dtype=np.int32)
+        self.principal_texto = np.array(principal_texto, dtype=object)
+        self.num_componentes = np.diff(self.inicio).astype(np.int32)
+
+        filas = np.repeat(np.arange(len(principal), dtype=np.int32), self.num_componentes)
+        orden = np.argsort(self.ingrediente, kind="stable")
+        cortes = np.flatnonzero(np.diff(self.ingrediente[orden])) + 1
+        self.por_ingrediente = {
+            int(self.ingrediente[grupo[0]]): np.unique(filas[grupo])
+            for grupo in np.split(orden, cortes) if len(grupo) and self.ingrediente[grupo[0]] >= 0
+        }
+
+    def _internar(self, nombre):
+        clave = normalizar_texto(nombre)
+        id_ing = self.ids.get(clave)
+        if id_ing is None:
+            id_ing = self.ids[clave] = len(self.ingredientes)
+            self.ingredientes.append(clave)
+        return id_ing
+
+    def __len__(self):
+        return len(self.principal)
+
+    def id_ingrediente(self, nombre):
+        """Id del ingrediente (DESCONOCIDO si no está en el catálogo)"""
+        return self.ids.get(normalizar_texto(nombre), DESCONOCIDO)
+
+    def componentes(self, pos):
+        """Ids de ingrediente del medicamento en la posición indicada"""
+        return self.ingrediente[self.inicio[pos]:self.inicio[pos + 1]]
+
+    def contiene_ingrediente(self, pos, id_ing):
+        """Indica si el medicamento tiene el ingrediente entre sus componentes"""
+        return bool(id_ing >= 0 and (self.componentes(pos) == id_ing).any())
+
+    def medicamentos_con(self, id_ing):
+        """Posiciones de los medicamentos que contienen el ingrediente"""
+        return self.por_ingrediente.get(id_ing, np.array([], dtype=np.int32))
+
+    def firma_dosis(self, pos):
+        """(ingrediente, dosis, unidad) ordenados; las masas se expresan en mg"""
+        firma = []
+        for k in range(self.inicio[pos], self.inicio[pos + 1]):
+            unidad = self.unidades[self.unidad[k]]
+            dosis = self.dosis[k]
+            if unidad in FACTORES_MG and not np.isnan(dosis):
+                dosis, unidad = round(dosis * FACTORES_MG[unidad], 6), "mg"
+            firma.append((int(self.ingrediente[k]), None if np.isnan(dosis) else float(dosis), unidad))
+        return tuple(sorted(firma, key=lambda c: (c[0], c[2], -1 if c[1] is None else c[1])))
+
+    def dosis_equivalente(self, pos_a, pos_b):
+        """Mismos ingredientes con la misma dosis (500 mg equivale a 0.5 g)"""
+        return self.firma_dosis(pos_a) == self.firma_dosis(pos_b)
+
+
+def obtener_tabla_componentes(df_info):
+    """Devuelve la tabla de componentes de df_info, construyéndola solo la primera vez"""
+    indice = obtener_indice(df_info)
+    tabla = _tablas.get(indice)
+    if tabla is None:
+        tabla = _tablas[indice] = TablaComponentes(indice)
+    return tabla
@@ -1,10 +1,16 @@
 import pandas as pd
 import unicodedata
+import argparse
 import os
 import re
 
-# Cargar el dataset unificado
-df = pd.read_csv(r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\BaseConocimiento\medicamentos_info.csv")
+# Rutas por defecto, relativas a Modelo/
+ruta_modelo = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUTA_INFO = os.path.join(ruta_modelo, "BaseConocimiento", "medicamentos_info.csv")
+RUTA_SALIDA = os.path.join(ruta_modelo, "ReglasClinicas", "posibles_alergenos.csv")
+
+# Expresión regular para detectar nombres válidos (palabras con letras, guiones o números dentro del nombre)
+patron_valido = re.compile(r"^[a-záéíóúñ]+[\w\- ]*[a-záéíóúñ]$", re.IGNORECASE)
 
 # Función para normalizar texto
 def normalizar(texto):
@@ -12,32 +18,46 @@ def normalizar(texto):
     texto = unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode('utf-8')
     return texto
 
-# Lista para componentes únicos
-componentes_unicos = set()
-
-# Expresión regular para detectar nombres válidos (palabras con letras, guiones o números dentro del nombre)
-patron_valido = re.compile(r"^[a-záéíóúñ]+[\w\- ]*[a-záéíóúñ]$", re.IGNORECASE)
-
-# Procesar la columna "composicion"
-for comp in df["composicion"].dropna():
+def componentes_de(comp):
+    """Nombres de componente válidos de una composición"""
     comp = normalizar(comp)
     comp = comp.replace(",", "+").replace(";", "+").replace("/", "+")
-    partes = comp.split("+")
-    for parte in partes:
+    componentes = set()
+    for parte in comp.split("+"):
         nombre = parte.strip().split("(")[0].strip()
         if patron_valido.match(nombre) and not any(char.isdigit() for char in nombre):
-            componentes_unicos.add(nombre)
+            componentes.add(nombre)
+    return componentes
+
+def tabla_alergenos(componentes_unicos):
+    """DataFrame ordenado de posibles alérgenos"""
+    return pd.DataFrame(sorted(componentes_unicos), columns=["posibles_alergenos"])
+
+def extraer_alergenos(composiciones):
+    """Componentes únicos de la columna "composicion" como posibles alérgenos"""
+    componentes_unicos = set()
+    for comp in composiciones.dropna():
+        componentes_unicos |= componentes_de(comp)
+    return tabla_alergenos(componentes_unicos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae posibles_alergenos.csv de las composiciones")
+    parser.add_argument("--info", default=RUTA_INFO, help="medicamentos_info.csv unificado")
+    parser.add_argument("--salida", default=RUTA_SALIDA, help="CSV de salida")
+    args = parser.parse_args()
+
+    # Cargar el dataset unificado
+    df = pd.read_csv(args.info)
+    df_componentes = extraer_alergenos(df["composicion"])
 
-# Crear DataFrame limpio
-df_componentes = pd.DataFrame(sorted(componentes_unicos), columns=["posibles_alergenos"])
+    # Guardar el archivo
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    df_componentes.to_csv(args.salida, index=False)
 
-# Guardar el archivo
-nombre_archivo = "posibles_alergenos.csv"
-ruta_carpeta = r"C:\Users\rocio\Documents\CICLO X\001 INTELIGENCIA ARTIFICIAL\PROYECTO DE SISTEMAS EXPERTO\Proyecto_Medicamentos_Sustitutos\Modelo\ReglasClinicas"
-os.makedirs(ruta_carpeta, exist_ok=True)
+    print(f"✅ Se extrajeron {len(df_componentes)} nombres únicos de componentes.")
+    print(f"📁 Guardado en: {args.salida}")
 
-ruta_guardado = os.path.join(ruta_carpeta, nombre_archivo)
-df_componentes.to_csv(ruta_guardado, index=False)
 
-print(f"✅ Se extrajeron {len(df_componentes)} nombres únicos de componentes.")
-print(f"📁 Guardado en: {ruta_guardado}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from collections import deque, OrderedDict
+from threading import Lock
+
+# Detectores ya construidos, por lista de alérgenos y función de normalización
+_detectores = {}
+_lock_detectores = Lock()
+
+
+class AutomataAhoCorasick:
+    """Autómata de Aho–Corasick: encuentra todas las apariciones de varios patrones en una pasada"""
+
+    def __init__(self, patrones):
+        self.longitudes = [len(p) for p in patrones]
+        self.goto = [{}]
+        self.fallo = [0]
+        self.salida = [[]]
+
+        for idx, patron in enumerate(patrones):
+            nodo = 0
+            for ch in patron:
+                siguiente = self.goto[nodo].get(ch)
+                if siguiente is None:
+                    siguiente = len(self.goto)
+                    self.goto.append({})
+                    self.fallo.append(0)
+                    self.salida.append([])
+                    self.goto[nodo][ch] = siguiente
+                nodo = siguiente
+            self.salida[nodo].append(idx)
+
+        # Enlaces de fallo por anchura
+        cola = deque(self.goto[0].values())
+        while cola:
+            r = cola.popleft()
+            for ch, s in self.goto[r].items():
+                cola.append(s)
+                f = self.fallo[r]
+                while f and ch not in self.goto[f]:
+                    f = self.fallo[f]
+                self.fallo[s] = self.goto[f].get(ch, 0)
+                self.salida[s] = self.salida[s] + self.salida[self.fallo[s]]
+
+    def buscar(self, texto):
+        """Devuelve (inicio, fin, índice_patrón) de cada aparición, incluidas las solapadas"""
+        goto, fallo, salida, longitudes = self.goto, self.fallo, self.salida, self.longitudes
+        encontrados = []
+        nodo = 0
+        for i, ch in enumerate(texto):
+            while nodo and ch not in goto[nodo]:
+                nodo = fallo[nodo]
+            nodo = goto[nodo].get(ch, 0)
+            for idx in salida[nodo]:
+                encontrados.append((i + 1 - longitudes[idx], i + 1, idx))
+        return encontrados
+
+
+def _es_palabra(ch):
+    return ch.isalnum() or ch == "_"
+
+
+def _limite_palabra(texto, pos):
+    """Equivalente a \\b de las expresiones regulares en la posición indicada"""
+    antes = pos > 0 and _es_palabra(texto[pos - 1])
+    despues = pos < len(texto) and _es_palabra(texto[pos])
+    return antes != despues
+
+
+class DetectorAlergenos:
+    """
+    Detector de alérgenos construido una sola vez a partir de la lista de alérgenos.
+    Recorre el texto de las notas una sola vez y guarda el resultado por texto.
+    """
+
+    def __init__(self, alergenos, normalizar=None, max_cache=128):
+        self.alergenos = list(alergenos)
+        self.patrones = []
+        self._posicion = {}  # patrón -> primer índice en la lista original
+        for i, a in enumerate(self.alergenos):
+            p = normalizar(str(a)) if normalizar else str(a).lower()
+            self.patrones.append(p)
+            if p and p not in self._posicion:
+                self._posicion[p] = i
+
+        self._unicos = list(self._posicion)
+        self.automata = AutomataAhoCorasick(self._unicos)
+        self._cache = OrderedDict()
+        self._max_cache = max_cache
+        self._lock = Lock()  # el detector se comparte entre los hilos del servidor
+
+    def ocurrencias(self, texto):
+        """Apariciones (inicio, fin, índice del alérgeno) en el texto ya en minúsculas"""
+        with self._lock:
+            encontrados = self._cache.get(texto)
+            if encontrados is not None:
+                self._cache.move_to_end(texto)
+                return encontrados
+
+        # La búsqueda se hace fuera del candado; guardar dos veces el mismo texto es inocuo
+        encontrados = self.buscar(texto)
+        with self._lock:
+            self._cache[texto] = encontrados
+            self._cache.move_to_end(texto)
+            if len(self._cache) > self._max_cache:
+                self._cache.popitem(last=False)
+        return encontrados
+
+    def buscar(self, texto):
+        """Como ocurrencias, pero sin guardar el resultado (para recorrer muchos textos una vez)"""
+        return [
+            (ini, fin, self._posicion[self._unicos[idx]])
+            for ini, fin, idx in self.automata.buscar(texto)
+        ]
+
+    def contenidos(self, texto):
+        """Índices de alérgenos que aparecen como subcadena, en el orden de la lista"""
+        return sorted({i for _, _, i in self.ocurrencias(texto)})
+
+    def como_palabra(self, texto):
+        """Índices de alérgenos que aparecen como palabra completa, en el orden de la lista"""
+        return sorted({
+            i for ini, fin, i in self.ocurrencias(texto)
+            if _limite_palabra(texto, ini) and _limite_palabra(texto, fin)
+        })
+
+
+def obtener_detector(alergenos, normalizar=None):
+    """Devuelve el detector para la lista de alérgenos, construyéndolo solo la primera vez"""
+    if isinstance(alergenos, DetectorAlergenos):
+        return alergenos
+    clave = (tuple(str(a) for a in alergenos), normalizar)
+    with _lock_detectores:
+        detector = _detectores.get(clave)
+        if detector is None:
+            if len(_detectores) >= 8:
+                _detectores.clear()
+            detector = _detectores[clave] = DetectorAlergenos(alergenos, normalizar)
+        return detector
@@ -0,0 +1,67 @@
+import csv
+from pathlib import Path
+
+# Tabla de familias alergénicas (familia,componente); se pueden añadir filas sin tocar el código
+RUTA_FAMILIAS = Path(__file__).resolve().parent / "familias_alergenicas.csv"
+
+# Tablas ya construidas por contenido de las familias
+_tablas = {}
+
+
+def cargar_familias(ruta=RUTA_FAMILIAS):
+    """Lee el CSV de familias y devuelve {familia: [componentes]} en el orden del archivo"""
+    familias = {}
+    with open(ruta, encoding="utf-8", newline="") as f:
+        for fila in csv.DictReader(f):
+            familia = (fila.get("familia") or "").strip()
+            componente = (fila.get("componente") or "").strip()
+            if familia and componente:
+                familias.setdefault(familia, []).append(componente)
+    return familias
+
+
+class TablaFamilias:
+    """
+    Familias alergénicas precalculadas: cada subcadena de cada componente -> bits de
+    las familias en las que aparece. Así misma_familia conserva la regla de siempre
+    (un texto pertenece a la familia si está contenido en alguno de sus componentes)
+    con dos consultas a un diccionario, sin importar cuántas familias haya.
+    """
+
+    def __init__(self, familias):
+        self.familias = {fam: list(comps) for fam, comps in familias.items()}
+        self.nombres = list(self.familias)
+        self.por_subcadena = {}
+        for bit, comps in enumerate(self.familias.values()):
+            for comp in comps:
+                for i in range(len(comp) + 1):
+                    for j in range(i, len(comp) + 1):
+                        sub = comp[i:j]
+                        self.por_subcadena[sub] = self.por_subcadena.get(sub, 0) | (1 << bit)
+
+    def bits(self, componente):
+        """Bits de las familias que contienen al componente (0 si ninguna)"""
+        return self.por_subcadena.get(componente, 0)
+
+    def familias_de(self, componente):
+        """Nombres de las familias que contienen al componente"""
+        bits = self.bits(componente)
+        return [fam for k, fam in enumerate(self.nombres) if bits >> k & 1]
+
+    def misma_familia(self, comp1, comp2):
+        """Indica si dos componentes pertenecen a una misma familia alergénica"""
+        return bool(self.bits(comp1) & self.bits(comp2))
+
+
+def obtener_tabla_familias(familias=None):
+    """Tabla de las familias indicadas (por defecto, las del CSV), construida solo la primera vez"""
+    if familias is None:
+        clave = None
+    else:
+        clave = tuple((fam, tuple(comps)) for fam, comps in familias.items())
+    tabla = _tablas.get(clave)
+    if tabla is None:
+        if len(_tablas) >= 8:
+            _tablas.clear()
+        tabla = _tablas[clave] = TablaFamilias(cargar_familias() if familias is None else familias)
+    return tabla
@@ -1,46 +1,69 @@
 import pandas as pd
 import re
 from Modelo.ReglasClinicas.reglas_apoyo import contar_sintomas
+from Modelo.ReglasClinicas.detector_alergenos import obtener_detector
 
-def regla_alergia_por_composicion(notas, composicion, alergenos):
+# Patrones de alergia que pueden preceder al nombre del alérgeno
+PATRONES_ALERGIA = [
+    r"alergi[ao]s?\s+a\s+",
+    r"alérgic[ao]s?\s+a\s+", 
+    r"reacci[óo]n\s+(?:adversa|cut[áa]nea)?\s*(?:a|con)\s+",
+    r"urticaria\s+(?:por|con)\s+",
+    r"hipersensibilidad\s+a\s+"
+]
+_patrones_por_alergeno = {}
+
+def _precedido_por_patron(alergeno, nl):
+    """Busca 'alergia a <alérgeno>' y variantes; se compila una vez por alérgeno"""
+    regex = _patrones_por_alergeno.get(alergeno)
+    if regex is None:
+        regex = _patrones_por_alergeno[alergeno] = re.compile(
+            "|".join(f"(?:{p}){re.escape(alergeno)}" for p in PATRONES_ALERGIA))
+    return regex.search(nl) is not None
+
+def alergenos_mencionados(notas, alergenos):
+    """
+    Índices de los alérgenos mencionados en las notas, en el orden de la lista:
+    como palabra completa o precedidos por un patrón de alergia.
+    Las notas se recorren una sola vez con el autómata de alérgenos.
+    """
+    if pd.isna(notas) or not alergenos:
+        return []
+    detector = obtener_detector(alergenos)
+    nl = notas.lower()
+    palabra = set(detector.como_palabra(nl))
+    return [
+        i for i in detector.contenidos(nl)
+        if i in palabra or _precedido_por_patron(detector.patrones[i], nl)
+    ]
+
+def regla_alergia_por_composicion(notas, composicion, alergenos, contexto=None):
     """Detecta alergias basadas en composición y notas clínicas"""
     if pd.isna(notas) or pd.isna(composicion) or not alergenos:
         return None
         
-    nl = notas.lower()
     cl = composicion.lower()
-    
-    
+    detector = obtener_detector(alergenos)
+    # Con el contexto del paciente las notas ya se analizaron una sola vez por consulta
+    if contexto is not None and contexto.detector is detector:
+        mencionados = contexto.alergenos_mencionados
+    else:
+        mencionados = alergenos_mencionados(notas, detector)
 
-    # Precompilar patrones de búsqueda
-    patrones_base = [
-        r"alergi[ao]s?\s+a\s+",
-        r"alérgic[ao]s?\s+a\s+", 
-        r"reacci[óo]n\s+(?:adversa|cut[áa]nea)?\s*(?:a|con)\s+",
-        r"urticaria\s+(?:por|con)\s+",
-        r"hipersensibilidad\s+a\s+"
-    ]
-    
-    # Verificar cada alérgeno
-    for a in alergenos:
-        a_lower = a.lower()
-        
-        # Verificar si el alérgeno está en la composición
-        if a_lower not in cl:
-            continue
-            
-        # Buscar patrones de alergia
-        for patron in patrones_base:
-            if re.search(patron + re.escape(a_lower), nl):
-                return f"❌ Alergia detectada a {a}"
-        
-        # Búsqueda directa del término
-        if re.search(r'\b' + re.escape(a_lower) + r'\b', nl):
-            return f"❌ Alergia detectada a {a}"
+    # Solo los alérgenos mencionados en las notas se cruzan con la composición
+    for i in mencionados:
+        if detector.patrones[i] in cl:
+            return f"❌ Alergia detectada a {detector.alergenos[i]}"
             
     return None
 
-def regla_sintomas_vs_efectos_secundarios(notas, efectos_det, efectos):
+STOP_WORDS_SINTOMAS = {"y","el","la","de","a","en","con","por","para","del","al","un","una","los","las"}
+
+def extraer_palabras(texto):
+    """Palabras significativas de un texto (sin stop words y de más de 2 letras)"""
+    return set(w for w in re.findall(r"\w+", texto.lower()) if w not in STOP_WORDS_SINTOMAS and len(w) > 2)
+
+def regla_sintomas_vs_efectos_secundarios(notas, efectos_det, efectos, contexto=None):
     """Compara síntomas con efectos secundarios potenciales"""
     if pd.isna(notas):
         return None
@@ -54,17 +77,11 @@ def regla_sintomas_vs_efectos_secundarios(notas, efectos_det, efectos):
     if not texto_ef:
         return None
 
-    # Preprocesar textos
-    stop_words = {"y","el","la","de","a","en","con","por","para","del","al","un","una","los","las"}
-    
-    def extraer_palabras(texto):
-        return set(w for w in re.findall(r"\w+", texto.lower()) if w not in stop_words and len(w) > 2)
-    
-    palabras_notas = extraer_palabras(notas)
+    palabras_notas = contexto.palabras_notas if contexto is not None else extraer_palabras(notas)
     palabras_efectos = extraer_palabras(texto_ef)
     
     comunes = palabras_notas & palabras_efectos
 
     if comunes:
         return f"⚠️ Podría agravar síntomas: {', '.join(sorted(comunes))}"
-    return None
\ No newline at end of file
+    return None
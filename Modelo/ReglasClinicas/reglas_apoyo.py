@@ -1,5 +1,7 @@
 import pandas as pd
 import re
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.ReglasClinicas.familias_alergenicas import obtener_tabla_familias
 
 def obtener_componente_principal(comp):
     """Extrae el componente principal de una composición"""
@@ -14,15 +16,17 @@ def obtener_composicion(nombre_medicamento, df_info, intentar_sustitutos=True):
     if isinstance(nombre_medicamento, str) and "(" in nombre_medicamento and ")" in nombre_medicamento:
         return nombre_medicamento
     
+    indice = obtener_indice(df_info)
+
     # Búsqueda directa por nombre
-    fila = df_info[df_info["medicamento"].str.lower() == nombre_medicamento.lower()]
-    if not fila.empty:
-        return fila.iloc[0]["composicion"]
+    pos = indice.buscar_nombre(nombre_medicamento)
+    if pos is not None:
+        return indice.fila(pos)["composicion"]
     
     # Búsqueda por composición exacta
-    fila_comp = df_info[df_info["composicion"].str.lower() == nombre_medicamento.lower()]
-    if not fila_comp.empty:
-        return fila_comp.iloc[0]["composicion"]
+    pos = indice.buscar_composicion(nombre_medicamento)
+    if pos is not None:
+        return indice.fila(pos)["composicion"]
     
     # Si se permite buscar en sustitutos
     if intentar_sustitutos:
@@ -52,5 +56,42 @@ def evaluar_clase(c1, c2):
     return isinstance(c1, str) and isinstance(c2, str) and c1.strip().lower() == c2.strip().lower()
 
 def obtener_nombre_espanol(nombre_en, map_es_dict):
-    """Obtiene el nombre en español de un medicamento"""
-    return map_es_dict.get(nombre_en.lower(), nombre_en)
\ No newline at end of file
+    """Obtiene el nombre en español de un medicamento (map_es_dict puede ser un dict o un MapaNombres)"""
+    return getattr(map_es_dict, "map_es", map_es_dict).get(nombre_en.lower(), nombre_en)
+
+def normalizar_texto(texto):
+    """Normaliza texto para búsquedas (quita tildes, mayúsculas, etc.)"""
+    if pd.isna(texto):
+        return ""
+    
+    # Convertir a minúsculas y quitar tildes
+    texto = texto.lower()
+    reemplazos = {
+        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+        'ü': 'u', 'ñ': 'n'
+    }
+    for orig, repl in reemplazos.items():
+        texto = texto.replace(orig, repl)
+    
+    # Eliminar caracteres especiales y múltiples espacios
+    texto = re.sub(r'[^a-z0-9\s]', '', texto)
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    
+    return texto
+
+def obtener_sinonimos_diagnostico(diagnostico):
+    """Sinónimos clínicos para mejor matching"""
+    diag_clean = re.sub(r'[^a-z0-9\s]', '', diagnostico.lower())
+    sinonimos = {
+        "bronquitis": ["inflamacion bronquios", "infeccion vias respiratorias"],
+        "acne": ["acne vulgar", "comedones"],
+        "neumonia": ["infeccion pulmonar", "pulmonia"]
+    }
+    return sinonimos.get(diag_clean, [])
+
+# Familias alergénicas, cargadas de familias_alergenicas.csv (se pueden añadir más familias allí)
+FAMILIAS_ALERGENICAS = obtener_tabla_familias().familias
+
+def misma_familia(comp1, comp2, familias=None):
+    """Indica si dos componentes pertenecen a la misma familia alergénica"""
+    return obtener_tabla_familias(familias).misma_familia(comp1, comp2)
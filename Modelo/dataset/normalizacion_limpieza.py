@@ -1,6 +1,37 @@
 import pandas as pd
+import numpy as np
 import os
+import argparse
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+# Ruta base del proyecto (sube un nivel desde dataset/)
+RUTA_MODELO = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Valores que se consideran vacíos después de normalizar
+VALORES_VACIOS = ["na", "n/a", "-", ""]
+
+# A partir de cuántos valores distintos se reparten entre procesos
+UMBRAL_PARALELO = 200000
+
+# Datasets a procesar
+DATASETS = [
+    {
+        "archivo_entrada": "drug_dataset_traducido.csv",
+        "columnas_clave": ["nombre_medicamento"],
+        "archivo_salida": "drug_data.csv"
+    },
+    {
+        "archivo_entrada": "medicine_dataset_traducidoF.csv",
+        "columnas_clave": ["name"],
+        "archivo_salida": "medicine_data_limpio.csv"
+    },
+    {
+        "archivo_entrada": "clinical_data_traducido.csv",
+        "columnas_clave": ["medicamentos"],
+        "archivo_salida": "clinical_data.csv"
+    }
+]
 
 # Función para eliminar tildes y normalizar texto
 def normalizar_texto(texto):
@@ -10,36 +41,105 @@ def normalizar_texto(texto):
     texto = unicodedata.normalize('NFD', texto).encode('ascii', 'ignore').decode('utf-8')
     return texto
 
-# Función principal para limpiar y normalizar un dataset
-def limpiar_dataset(nombre_archivo_entrada, columnas_clave, nombre_archivo_salida):
-    # Ruta base del proyecto (sube un nivel desde dataset/)
-    ruta_base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+def tabla_traduccion(textos):
+    """
+    Tabla para str.translate: cada carácter no ASCII de los textos -> su
+    descomposición NFD sin lo que no es ASCII (tildes fuera, 'ñ' -> 'n', el resto se elimina).
+    Aplicarla carácter a carácter equivale a normalize('NFD') + encode('ascii', 'ignore'),
+    porque las marcas que NFD reordena se eliminan de todos modos.
+    """
+    caracteres = {c for c in set("".join(textos)) if ord(c) > 127}
+    return {
+        ord(c): unicodedata.normalize('NFD', c).encode('ascii', 'ignore').decode('utf-8')
+        for c in caracteres
+    }
+
+def normalizar_textos(textos):
+    """Versión vectorizada de normalizar_texto para un array de textos (sin nulos)"""
+    serie = pd.Series(textos, dtype=object).str.lower().str.strip()
+    # Solo los textos con caracteres no ASCII necesitan la tabla
+    no_ascii = ~np.fromiter(map(str.isascii, serie), dtype=bool, count=len(serie))
+    if no_ascii.any():
+        serie[no_ascii] = serie[no_ascii].str.translate(tabla_traduccion(serie[no_ascii]))
+    return serie.to_numpy(dtype=object)
+
+def normalizar_unicos(unicos, procesos=None):
+    """Normaliza los valores distintos, repartidos entre procesos si son muchos"""
+    if not procesos or procesos < 2 or len(unicos) < UMBRAL_PARALELO:
+        return normalizar_textos(unicos)
+    partes = np.array_split(np.asarray(unicos, dtype=object), procesos)
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return np.concatenate(list(pool.map(normalizar_textos, partes)))
 
-    # Rutas de entrada
+def rutas_dataset(nombre_archivo_entrada, nombre_archivo_salida, ruta_base=RUTA_MODELO):
+    """Rutas de entrada (dataset_traduccion/) y de salida del dataset"""
     ruta_entrada = os.path.join(ruta_base, "dataset_traduccion", nombre_archivo_entrada)
 
     # Ruta de salida dependiendo del archivo
     if "clinical_data.csv" in nombre_archivo_salida:
         ruta_salida = os.path.join(ruta_base, "01Hechos", "clinical_data.csv")
     else:
-        ruta_salida = os.path.join(os.path.dirname(__file__), nombre_archivo_salida)
+        ruta_salida = os.path.join(ruta_base, "dataset", nombre_archivo_salida)
+    return ruta_entrada, ruta_salida
+
+def columnas_a_normalizar(df, nombre_archivo_salida):
+    """
+    Columnas de texto a normalizar, evitando 'notas_clinicas' si es clinical_data
+    (se mantienen las tildes en las notas clínicas)
+    """
+    return [
+        col for col in df.select_dtypes(include=['object']).columns
+        if not ("clinical_data.csv" in nombre_archivo_salida and col == "notas_clinicas")
+    ]
+
+def normalizar_dataframe(df, columnas, procesos=None):
+    """
+    Normaliza las columnas indicadas y reemplaza los valores problemáticos por NaN.
+    Cada valor distinto (entre todas las columnas) se normaliza una sola vez;
+    el resultado es el mismo que aplicar normalizar_texto celda a celda.
+    """
+    df = df.copy()
+    columnas = list(columnas)
+    if columnas:
+        valores = pd.Series(np.concatenate([df[col].to_numpy(dtype=object) for col in columnas]), dtype=object)
+        presentes = valores.notna()
+        valores[presentes] = valores[presentes].astype(str)
+        codigos, unicos = pd.factorize(valores)
+
+        normalizados = normalizar_unicos(unicos, procesos)
+        normalizados[pd.Series(normalizados, dtype=object).isin(VALORES_VACIOS).to_numpy()] = pd.NA
+
+        n = len(df)
+        for i, col in enumerate(columnas):
+            cod = codigos[i * n:(i + 1) * n]
+            # Los nulos se conservan tal cual, como en normalizar_texto
+            df[col] = np.where(cod >= 0, normalizados[np.maximum(cod, 0)] if len(normalizados) else None,
+                               df[col].to_numpy(dtype=object))
+
+    resto = [col for col in df.columns if col not in columnas]
+    if resto:
+        df[resto] = df[resto].replace(VALORES_VACIOS, pd.NA)
+    return df
+
+def eliminar_duplicados(df, columnas_clave):
+    """Elimina duplicados solo si NO es clinical_data"""
+    if "medicamentos" not in columnas_clave:
+        df = df.drop_duplicates(subset=columnas_clave, keep='first')
+    return df
+
+# Función principal para limpiar y normalizar un dataset
+def limpiar_dataset(nombre_archivo_entrada, columnas_clave, nombre_archivo_salida, ruta_base=RUTA_MODELO, procesos=None):
+    ruta_entrada, ruta_salida = rutas_dataset(nombre_archivo_entrada, nombre_archivo_salida, ruta_base)
 
     # Leer dataset
     df = pd.read_csv(ruta_entrada, low_memory=False)
 
-    # 1. Normalizar todas las columnas de tipo texto,
-    # pero evitar normalizar 'notas_clinicas' si es clinical_data
-    for col in df.select_dtypes(include=['object']).columns:
-        if "clinical_data.csv" in nombre_archivo_salida and col == "notas_clinicas":
-            continue  # Mantener tildes en notas clínicas
-        df[col] = df[col].apply(normalizar_texto)
-
+    # 1. Normalizar todas las columnas de tipo texto
     # 2. Reemplazar valores problemáticos por NaN
-    df.replace(["na", "n/a", "-", ""], pd.NA, inplace=True)
+    df = normalizar_dataframe(df, columnas_a_normalizar(df, nombre_archivo_salida), procesos)
 
     # 3. Eliminar duplicados solo si NO es clinical_data
-    if "medicamentos" not in columnas_clave:
-        df.drop_duplicates(subset=columnas_clave, keep='first', inplace=True)
+    df = eliminar_duplicados(df, columnas_clave)
 
     # 4. Guardar archivo limpio
     os.makedirs(os.path.dirname(ruta_salida), exist_ok=True)
@@ -47,31 +147,22 @@ def limpiar_dataset(nombre_archivo_entrada, columnas_clave, nombre_archivo_salid
     return f"✅ Dataset limpio guardado en: {ruta_salida}", df.shape
 
 
-# Datasets a procesar
-datasets = [
-    {
-        "archivo_entrada": "drug_dataset_traducido.csv",
-        "columnas_clave": ["nombre_medicamento"],
-        "archivo_salida": "drug_data.csv"
-    },
-    {
-        "archivo_entrada": "medicine_dataset_traducidoF.csv",
-        "columnas_clave": ["name"],
-        "archivo_salida": "medicine_data_limpio.csv"
-    },
-    {
-        "archivo_entrada": "clinical_data_traducido.csv",
-        "columnas_clave": ["medicamentos"],
-        "archivo_salida": "clinical_data.csv"
-    }
-]
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza y limpia los datasets traducidos")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos para normalizar los valores distintos (solo con muchos valores)")
+    args = parser.parse_args()
+
+    # Ejecutar limpieza para cada archivo
+    resultados = [
+        limpiar_dataset(d["archivo_entrada"], d["columnas_clave"], d["archivo_salida"], procesos=args.procesos)
+        for d in DATASETS
+    ]
+
+    # Mostrar resumen final
+    df_resultados = pd.DataFrame(resultados, columns=["Resultado", "Forma del dataset"])
+    print(df_resultados)
 
-# Ejecutar limpieza para cada archivo
-resultados = [
-    limpiar_dataset(d["archivo_entrada"], d["columnas_clave"], d["archivo_salida"])
-    for d in datasets
-]
 
-# Mostrar resumen final
-df_resultados = pd.DataFrame(resultados, columns=["Resultado", "Forma del dataset"])
-print(df_resultados)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Almacén de términos compartido por todas las columnas y scripts de traducción
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traducciones.sqlite")
+
+# Valor que se devuelve (sin guardarlo en la caché) cuando una traducción falla
+ERROR_TRADUCCION = "[Error]"
+
+# Marca numerada que precede a cada texto de un lote enviado en una sola petición
+MARCA_LOTE = "[[{}]]"
+PATRON_MARCA = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+
+
+class TraductorDiccionario:
+    """
+    Backend sin conexión: traduce con un diccionario en memoria (para pruebas o
+    glosarios locales). Los textos desconocidos se devuelven sin traducir.
+    """
+
+    def __init__(self, diccionario=None):
+        self.diccionario = dict(diccionario or {})
+        self.lotes = 0
+        self.textos = 0
+
+    def traducir_lote(self, textos):
+        self.lotes += 1
+        self.textos += len(textos)
+        return [self.diccionario.get(t, t) for t in textos]
+
+
+def unir_lote(textos):
+    """Texto de una petición: cada texto en su línea, precedido por su marca numerada"""
+    return "\n".join(f"{MARCA_LOTE.format(i)} {t}" for i, t in enumerate(textos))
+
+
+def separar_lote(respuesta, n):
+    """
+    Traducciones de una respuesta a unir_lote, o None si las marcas 0..n-1 no
+    vuelven todas, una vez y en orden (textos unidos, separados o reordenados)
+    """
+    partes = PATRON_MARCA.split(respuesta)
+    # split con un grupo: [antes, num0, texto0, num1, texto1, ...]
+    if partes[0].strip() or [int(m) for m in partes[1::2]] != list(range(n)):
+        return None
+    traducciones = [t.strip() for t in partes[2::2]]
+    return traducciones if all(traducciones) else None
+
+
+def admite_lote(texto):
+    """Un texto con saltos de línea o con algo parecido a una marca se traduce solo"""
+    return "\n" not in texto and not PATRON_MARCA.search(texto)
+
+
+class TraductorGoogle:
+    """
+    Backend de Google Translate (deep_translator, que solo se importa al usarlo).
+    Un lote se envía como una sola petición con cada texto precedido por su
+    marca numerada; si algún texto no admite lote o las marcas no vuelven
+    intactas y en orden, se traduce texto por texto.
+    """
+
+    MAX_CARACTERES = 4500
+
+    def __init__(self, origen="en", destino="es", pausa=1.0):
+        self.origen = origen
+        self.destino = destino
+        self.pausa = pausa
+        self._traductor = None
+
+    @property
+    def traductor(self):
+        if self._traductor is None:
+            from deep_translator import GoogleTranslator
+            self._traductor = GoogleTranslator(source=self.origen, target=self.destino)
+        return self._traductor
+
+    def traducir_lote(self, textos):
+        try:
+            if len(textos) > 1 and all(admite_lote(t) for t in textos):
+                partes = separar_lote(self.traductor.translate(unir_lote(textos)), len(textos))
+                if partes is not None:
+                    return partes
+            return [self.traductor.translate(t) for t in textos]
+        finally:
+            time.sleep(self.pausa)  # evitar bloqueos por exceso de peticiones
+
+
+class CacheTraducciones:
+    """
+    Caché durable en SQLite: (origen, destino, texto) -> traducción.
+    Cada lote se guarda en una transacción, sin reescribir lo ya guardado.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, origen="en", destino="es"):
+        self.ruta = ruta
+        self.origen = origen
+        self.destino = destino
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute(
+            "CREATE TABLE IF NOT EXISTS traducciones ("
+            "origen TEXT NOT NULL, destino TEXT NOT NULL, texto TEXT NOT NULL, traduccion TEXT NOT NULL, "
+            "PRIMARY KEY (origen, destino, texto))"
+        )
+        self.conexion.commit()
+
+    def obtener(self, textos, tam_consulta=500):
+        """Traducciones guardadas de los textos indicados"""
+        textos = list(textos)
+        encontradas = {}
+        for i in range(0, len(textos), tam_consulta):
+            parte = textos[i:i + tam_consulta]
+            marcas = ",".join("?" * len(parte))
+            filas = self.conexion.execute(
+                f"SELECT texto, traduccion FROM traducciones WHERE origen = ? AND destino = ? AND texto IN ({marcas})",
+                (self.origen, self.destino, *parte)
+            )
+            encontradas.update(filas)
+        return encontradas
+
+    def guardar(self, traducciones):
+        """Guarda pares texto -> traducción"""
+        with self.conexion:
+            self.conexion.executemany(
+                "INSERT OR REPLACE INTO traducciones (origen, destino, texto, traduccion) VALUES (?, ?, ?, ?)",
+                [(self.origen, self.destino, t, tr) for t, tr in traducciones.items()]
+            )
+
+    def importar_json(self, ruta):
+        """Importa una caché JSON antigua (traducciones_<columna>.json), sin los errores"""
+        with open(ruta, encoding="utf-8") as f:
+            traducciones = json.load(f)
+        validas = {t: tr for t, tr in traducciones.items() if isinstance(tr, str) and tr != ERROR_TRADUCCION}
+        self.guardar(validas)
+        return len(validas)
+
+    def importar_carpeta(self, carpeta):
+        """Importa todas las cachés JSON antiguas de la carpeta (traducciones_*.json)"""
+        total = 0
+        for nombre in sorted(os.listdir(carpeta)):
+            if nombre.startswith("traducciones_") and nombre.endswith(".json"):
+                total += self.importar_json(os.path.join(carpeta, nombre))
+        return total
+
+    def __len__(self):
+        return self.conexion.execute(
+            "SELECT COUNT(*) FROM traducciones WHERE origen = ? AND destino = ?", (self.origen, self.destino)
+        ).fetchone()[0]
+
+    def cerrar(self):
+        self.conexion.close()
+
+
+class Traductor:
+    """
+    Traduce textos consultando primero la caché; los que faltan se agrupan en
+    lotes (por número de textos y de caracteres) que se envían al backend con
+    concurrencia acotada. Cada lote traducido se guarda en la caché al llegar,
+    así que una ejecución interrumpida no pierde lo ya traducido.
+    """
+
+    def __init__(self, backend=None, cache=None, tam_lote=50, concurrencia=2, max_caracteres=None):
+        self.backend = backend if backend is not None else TraductorGoogle()
+        self.cache = cache if cache is not None else CacheTraducciones()
+        self.tam_lote = tam_lote
+        self.concurrencia = concurrencia
+        self.max_caracteres = max_caracteres or getattr(self.backend, "MAX_CARACTERES", None)
+        self.estadisticas = {"celdas": 0, "distintos_por_columna": 0, "solicitados": 0, "en_cache": 0,
+                             "traducidos": 0, "errores": 0, "lotes": 0}
+
+    def _lotes(self, textos):
+        lote, caracteres = [], 0
+        for texto in textos:
+            if lote and (len(lote) >= self.tam_lote or
+                         (self.max_caracteres and caracteres + len(texto) > self.max_caracteres)):
+                yield lote
+                lote, caracteres = [], 0
+            lote.append(texto)
+            caracteres += len(texto) + len(MARCA_LOTE.format(len(lote))) + 2
+        if lote:
+            yield lote
+
+    def _traducir_lote(self, lote):
+        """Traduce un lote; si falla, reintenta texto por texto para aislar el error"""
+        try:
+            return dict(zip(lote, self.backend.traducir_lote(lote)))
+        except Exception as e:
+            if len(lote) == 1:
+                print(f"⚠️ Sin traducir: {lote[0]!r} ({e})")
+                return {lote[0]: ERROR_TRADUCCION}
+        nuevas = {}
+        for texto in lote:
+            nuevas.update(self._traducir_lote([texto]))
+        return nuevas
+
+    def traducir(self, textos, progreso=True):
+        """Devuelve {texto: traducción} para los textos distintos indicados"""
+        unicos = list(dict.fromkeys(t for t in textos if isinstance(t, str) and t.strip()))
+        traducciones = self.cache.obtener(unicos)
+        pendientes = [t for t in unicos if t not in traducciones]
+        self.estadisticas["solicitados"] += len(unicos)
+        self.estadisticas["en_cache"] += len(unicos) - len(pendientes)
+
+        if pendientes:
+            lotes = list(self._lotes(pendientes))
+            hechos = 0
+            with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+                futuros = [pool.submit(self._traducir_lote, lote) for lote in lotes]
+                for futuro in as_completed(futuros):
+                    nuevas = futuro.result()
+                    validas = {t: tr for t, tr in nuevas.items() if tr != ERROR_TRADUCCION}
+                    # Los errores no se guardan: se reintentan en la próxima ejecución
+                    self.cache.guardar(validas)
+                    self.estadisticas["lotes"] += 1
+                    self.estadisticas["traducidos"] += len(validas)
+                    self.estadisticas["errores"] += len(nuevas) - len(validas)
+                    traducciones.update(nuevas)
+                    hechos += len(nuevas)
+                    if progreso:
+                        print(f"🔄 {hechos}/{len(pendientes)} textos nuevos traducidos")
+        return traducciones
+
+    def traducir_columna(self, df, columna, nueva=None):
+        """Añade (o reemplaza) la columna traducida; por defecto '<columna>_es'"""
+        return self.traducir_columnas(df, {columna: nueva or f"{columna}_es"})
+
+    def traducir_columnas(self, df, columnas, listas=(), sep=","):
+        """
+        Traduce varias columnas con una sola llamada a traducir: cada texto
+        distinto se traduce una vez aunque aparezca en varias columnas.
+        `columnas` es una lista (se añade '<columna>_es') o {original: nueva};
+        las columnas en `listas` contienen términos separados por `sep` que se
+        traducen uno a uno y se vuelven a unir con ", ".
+        """
+        if not isinstance(columnas, dict):
+            columnas = {col: f"{col}_es" for col in columnas}
+        terminos = {col: self._terminos(df[col], col in listas, sep) for col in columnas}
+        todos = pd.concat(list(terminos.values()), ignore_index=True) if terminos else pd.Series(dtype=object)
+        self.estadisticas["celdas"] += len(todos)
+        self.estadisticas["distintos_por_columna"] += sum(t.nunique() for t in terminos.values())
+
+        traducciones = self.traducir(pd.unique(todos))
+        for col, nueva in columnas.items():
+            if col in listas:
+                df[nueva] = df[col].map(lambda texto: self._traducir_lista(texto, traducciones, sep))
+            else:
+                # Los valores que no son texto (o vacíos) se conservan sin traducir
+                df[nueva] = df[col].map(traducciones).fillna(df[col])
+        return df
+
+    @staticmethod
+    def _terminos(serie, es_lista, sep):
+        valores = serie.dropna()
+        if es_lista:
+            valores = valores.astype(str).str.split(sep).explode().str.strip()
+        return valores
+
+    @staticmethod
+    def _traducir_lista(texto, traducciones, sep):
+        if not isinstance(texto, str):
+            return texto
+        return ", ".join(traducciones.get(t.strip(), t.strip()) for t in texto.split(sep))
+
+    def resumen(self):
+        e = self.estadisticas
+        nuevos = e["traducidos"] + e["errores"]
+        factor = e["celdas"] / nuevos if nuevos else float("inf")
+        return (f"📊 Traducción: {e['celdas']} celdas, {e['distintos_por_columna']} distintos por columna, "
+                f"{e['solicitados']} distintos en total, {e['en_cache']} desde la caché, "
+                f"{e['traducidos']} traducidos en {e['lotes']} lotes, {e['errores']} con error "
+                f"(factor de ahorro {factor:.1f}x frente a traducir celda a celda)")
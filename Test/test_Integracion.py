@@ -295,6 +295,25 @@ def test_gui_handles_processing_error(gui_app):
         # La GUI debe seguir funcionando
         assert gui_app.root.winfo_exists()
 
+def test_consulta_reemplazada_no_se_muestra(gui_app):
+    """Test que verifica que el resultado de una consulta reemplazada por otra más nueva se descarta"""
+    gui_app.entry_sintomas.insert("1.0", "dolor")
+    gui_app.entry_historia.insert("1.0", "historia")
+    gui_app.entry_diagnostico.insert(0, "infeccion")
+    gui_app.entry_medicamento.insert(0, "medA")
+
+    formulario = gui_app.leer_formulario()
+    generacion_antigua = gui_app.generacion
+    gui_app.generacion += 1  # llega una consulta más reciente
+
+    gui_app.procesar_medicamento_logica(formulario, generacion_antigua)
+    assert gui_app.resultado_actual is None
+    assert gui_app.tiempos == []
+
+    gui_app.procesar_medicamento_logica(formulario, gui_app.generacion)
+    assert gui_app.resultado_actual is not None
+    assert len(gui_app.tiempos) == 1
+
 # Test de integración con datos reales (opcional)
 @pytest.mark.integration
 def test_integracion_con_datos_reales():
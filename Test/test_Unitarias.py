@@ -225,3 +225,720 @@ def test_datos_consistency(datos_reales):
     # Verificar tipos de datos
     assert df_info['medicamento'].dtype == 'object', "Columna medicamento debe ser tipo object/string"
     
+
+def test_indice_medicamentos_busquedas():
+    """Test del índice en memoria: nombre, composición, clase y reutilización"""
+    from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+
+    df_info = pd.DataFrame([
+        {"medicamento": "Augmentin 625 Duo Tablet", "composicion": "amoxicilina (500 mg) + acido clavulanico (125 mg)", "clase terapeutica": "anti infectives"},
+        {"medicamento": "Azithral 500 Tablet", "composicion": "azitromicina (500 mg)", "clase terapeutica": "anti infectives"},
+        {"medicamento": "Crocin 500 Tablet", "composicion": "paracetamol (500 mg)", "clase terapeutica": "pain analgesics"},
+    ])
+
+    indice = obtener_indice(df_info)
+    assert obtener_indice(df_info) is indice, "El índice debe construirse una sola vez"
+
+    assert indice.buscar_nombre("azithral 500 tablet") == 1
+    assert indice.buscar_nombre_o_composicion("PARACETAMOL (500 mg)") == 2
+    assert indice.buscar_nombre_o_composicion("clavulanico") == 0
+    assert indice.buscar_nombre_o_composicion("inexistente") is None
+    assert list(indice.filas_clase("Anti Infectives")["medicamento"]) == ["Augmentin 625 Duo Tablet", "Azithral 500 Tablet"]
+
+def test_preparar_datos_una_sola_vez():
+    """Test de la etapa de preparación: columnas limpias, marca y sin repetición"""
+    from Modelo.MotorInferencia.preparacion_datos import preparar_datos, esta_preparado
+
+    datos = {
+        "df_info": pd.DataFrame({"medicamento": [" medA ", None], "review_excelente": [80, None]}),
+        "df_sust": pd.DataFrame({"medicamento_en": ["medA", None]}),
+        "lista_alergenos": [" penicilina ", None],
+    }
+    preparar_datos(datos)
+
+    assert esta_preparado(datos["df_info"]) and esta_preparado(datos["df_sust"])
+    assert datos["df_info"]["medicamento"].tolist() == ["medA", ""]
+    assert datos["df_info"]["medicamento_norm"].tolist() == ["meda", ""]
+    assert datos["lista_alergenos"] == ["penicilina", ""]
+    assert "indice" in datos
+
+    df_info = datos["df_info"]
+    preparar_datos(datos)
+    assert datos["df_info"] is df_info, "Una segunda llamada no debe volver a limpiar"
+
+def test_snapshot_base_conocimiento(tmp_path, monkeypatch):
+    """Test del snapshot binario: se reutiliza si las fuentes no cambian y se invalida si cambian"""
+    from Vista.rutas import cargar_datos
+    import Vista.rutas as rutas_mod
+
+    rutas = {
+        'info': tmp_path / "medicamentos_info.csv",
+        'sustitutos': tmp_path / "sustitutos_medicamentos.csv",
+        'alergenos': tmp_path / "posibles_alergenos.csv",
+        'clinical': tmp_path / "clinical_data.csv",
+    }
+    pd.DataFrame({"medicamento": ["medA"], "composicion": ["comp a (5 mg)"]}).to_csv(rutas['info'], index=False)
+    pd.DataFrame({"medicamento_en": ["medA"], "medicamento_principal": ["medA"]}).to_csv(rutas['sustitutos'], index=False)
+    pd.DataFrame({"posibles_alergenos": ["penicilina"]}).to_csv(rutas['alergenos'], index=False)
+    pd.DataFrame({"notas_clinicas": ["nota"], "diagnosticos": ["acne"], "medicamentos": ["medA"]}).to_csv(rutas['clinical'], index=False)
+
+    datos = cargar_datos(rutas)
+    assert (tmp_path / "base_conocimiento.snapshot.pkl").exists()
+
+    # Con el snapshot vigente no se debe volver a leer ningún CSV
+    def sin_csv(*args, **kwargs):
+        raise AssertionError("Se leyó un CSV con el snapshot vigente")
+    monkeypatch.setattr(rutas_mod.pd, "read_csv", sin_csv)
+    desde_snapshot = cargar_datos(rutas)
+    assert desde_snapshot['version'] == datos['version']
+    assert desde_snapshot['df_info']["medicamento"].tolist() == ["medA"]
+    monkeypatch.undo()
+
+    # Si cambia una fuente, el snapshot queda invalidado
+    pd.DataFrame({"posibles_alergenos": ["penicilina", "sulfas"]}).to_csv(rutas['alergenos'], index=False)
+    nuevos = cargar_datos(rutas)
+    assert nuevos['lista_alergenos'] == ["penicilina", "sulfas"]
+    assert nuevos['version'] != datos['version']
+
+def test_procesar_lote_clinico(tmp_path, monkeypatch):
+    """Test del modo por lotes: separa medicamentos por registro y escribe JSONL"""
+    import json
+    import Controlador.main_lotes as lotes
+
+    def procesar_falso(med_input, notas, diagnostico, datos, razon=None):
+        if med_input == "desconocido":
+            return {"status": "error", "message": "No se encontró información del medicamento ingresado"}
+        return {"medicamento": med_input, "sustitutos": [("medB", 7, "ok")], "validos": [("medB", 7, "ok")],
+                "alternativas": []}
+    monkeypatch.setattr(lotes, "procesar_medicamento", procesar_falso)
+
+    filas = lotes.procesar_lote([(0, "notas", "ventolina, amoxicilina", "asma"), (1, "notas", "desconocido", "acne")], "alergia")
+    assert [f["medicamento_input"] for f in filas] == ["ventolina", "amoxicilina", "desconocido"]
+    assert [f["status"] for f in filas] == ["ok", "ok", "no_encontrado"]
+    assert all(f["latencia_ms"] >= 0 for f in filas)
+
+    salida = tmp_path / "resultados.jsonl"
+    escritor = lotes.EscritorResultados(salida)
+    escritor.escribir(filas)
+    escritor.cerrar()
+    lineas = [json.loads(l) for l in salida.read_text(encoding="utf-8").splitlines()]
+    assert lineas[0]["recomendacion"] == "medB"
+
+def test_detector_alergenos():
+    """Test del autómata de alérgenos: solapamientos, palabra completa y regla de alergia"""
+    from Modelo.ReglasClinicas.detector_alergenos import obtener_detector
+    from Modelo.ReglasClinicas.reglas import regla_alergia_por_composicion
+
+    alergenos = ["Penicilina", "amoxicilina", "cilina", "sulfa"]
+    detector = obtener_detector(alergenos)
+    assert obtener_detector(alergenos) is detector, "El autómata debe construirse una sola vez"
+
+    notas = "paciente con alergia a amoxicilina y sulfametoxazol"
+    assert detector.contenidos(notas) == [1, 2, 3]
+    assert detector.como_palabra(notas) == [1]
+
+    assert regla_alergia_por_composicion(notas, "Amoxicilina (500 mg)", alergenos) == "❌ Alergia detectada a amoxicilina"
+    assert regla_alergia_por_composicion("alergia a sulfa", "sulfametoxazol (800 mg)", alergenos) == "❌ Alergia detectada a sulfa"
+    # "sulfa" solo aparece dentro de otra palabra y sin patrón de alergia
+    assert regla_alergia_por_composicion("toma sulfametoxazol", "sulfametoxazol (800 mg)", alergenos) is None
+    assert regla_alergia_por_composicion(None, "amoxicilina", alergenos) is None
+
+def test_contexto_paciente(datos_reales):
+    """Test del contexto del paciente: análisis único de notas y mismo resultado que sin contexto"""
+    from Modelo.MotorInferencia.Motor_inferencia import ContextoPaciente
+
+    notas = "Paciente con alergia a amoxicilina, fiebre y tos"
+    alergenos = ["amoxicilina", "sulfa"]
+    contexto = ContextoPaciente(notas, "Neumonía", alergenos)
+    assert contexto.diag_norm == "neumonia"
+    assert contexto.sinonimos == ["infeccion pulmonar", "pulmonia"]
+    assert contexto.alergenos_mencionados == [0]
+    assert contexto.alergenos_palabra_norm == ["amoxicilina"]
+    assert "fiebre" in contexto.palabras_notas
+
+    df_info = datos_reales['df_info']
+    for med in df_info["medicamento"].head(5):
+        sin_ctx = score_sustituto(med, med, notas, "Neumonía", "anti infectives", alergenos, df_info, "alergia")
+        con_ctx = score_sustituto(med, med, notas, "Neumonía", "anti infectives", alergenos, df_info, "alergia", contexto)
+        assert sin_ctx == con_ctx
+
+def test_puntaje_vectorizado_equivale_a_score_sustituto(datos_reales):
+    """Test del puntaje vectorizado: mismo score y justificación que score_sustituto"""
+    from Modelo.MotorInferencia.Motor_inferencia import ContextoPaciente
+    from Modelo.MotorInferencia.puntaje_vectorizado import puntuar_candidatos, valor_score
+    from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+
+    df_info = datos_reales['df_info']
+    alergenos = datos_reales['lista_alergenos']
+    indice = obtener_indice(df_info)
+    notas = "Paciente con alergia a amoxicilina, dolor y quemadura solar"
+    clase = df_info["clase terapeutica"].iloc[0]
+    posiciones = [p for p in range(0, len(df_info), max(1, len(df_info) // 200))
+                  if indice.buscar_nombre_o_composicion(df_info["medicamento"].iloc[p]) == p]
+
+    for diagnostico in ["acne", ""]:
+        for razon in [None, "alergia", "desabastecimiento"]:
+            contexto = ContextoPaciente(notas, diagnostico, alergenos)
+            puntajes = puntuar_candidatos(df_info, clase, contexto, razon, posiciones=posiciones)
+            for p, fila in zip(posiciones, puntajes.itertuples(index=False)):
+                med = df_info["medicamento"].iloc[p]
+                esperado = score_sustituto(med, med, notas, diagnostico, clase, alergenos, df_info, razon)
+                assert (valor_score(fila.score), fila.justificacion) == esperado, med
+
+def test_indice_usos_diagnostico():
+    """Test del índice invertido de usos: frase completa, sinónimos y orden por fuerza"""
+    from Modelo.MotorInferencia.indice_usos import IndiceUsos
+
+    df_info = pd.DataFrame({
+        "usos": ["Tratamiento del acné", "acne vulgar", "infección pulmonar", "bronquitis aguda"],
+        "usos_clinicos_ext": ["", "Acné y comedones", "", "acnes"],
+    })
+    indice = IndiceUsos(df_info)
+
+    assert indice.buscar_frase("acne", "usos") == {0, 1}
+    assert indice.buscar_frase("infeccion pulmonar", "usos") == {2}
+    assert indice.buscar_frase("pulmonar infeccion", "usos") == set()
+    assert indice.buscar_diagnostico("acne") == [(1, 4), (0, 2)]
+    assert indice.buscar_diagnostico("neumonia", ["infeccion pulmonar", "pulmonia"]) == [(2, 1)]
+
+def test_resolvedor_nombres_aproximado():
+    """Test del resolvedor aproximado: errores de tipeo en inglés y en español"""
+    from Modelo.MotorInferencia.resolvedor_nombres import obtener_resolvedor
+
+    df_info = pd.DataFrame({"medicamento": ["Augmentin 625 Duo Tablet", "Azithral 500 Tablet", "Crocin 500 Tablet"]})
+    df_sust = pd.DataFrame({"medicamento_en": ["Crocin 500 Tablet"], "medicamento_principal": ["Paracetamol Crocin 500 Tableta"]})
+    resolvedor = obtener_resolvedor(df_info, df_sust)
+    assert obtener_resolvedor(df_info, df_sust) is resolvedor, "El resolvedor debe construirse una sola vez"
+
+    assert resolvedor.resolver("azitral 500 tablet") == "azithral 500 tablet"
+    assert resolvedor.resolver("paracetamol crocn 500 tableta") == "crocin 500 tablet"
+    assert resolvedor.resolver("xyz") is None
+    nombre, nombre_en, similitud = resolvedor.candidatos("augmentin 625 duo tablte", k=2)[0]
+    assert nombre_en == "augmentin 625 duo tablet" and 0.6 <= similitud < 1
+
+def test_mapa_nombres_bilingue():
+    """Test del mapa bilingüe: nombres en ambos idiomas, alias normalizados y nombre comercial"""
+    from Modelo.MotorInferencia.mapa_nombres import obtener_mapa_nombres
+    from Modelo.ReglasClinicas.reglas_apoyo import obtener_nombre_espanol
+
+    df_sust = pd.DataFrame({
+        "medicamento_en": ["Crocin Advance 500 Tablet", "Crocin 500 Tablet", "Azée 500 Tablet"],
+        "medicamento_principal": ["Crocin Advance Tableta", " Paracetamol Crocin 500 Tableta ", "Azitromicina 500 Tableta"],
+    })
+    mapa = obtener_mapa_nombres(df_sust)
+    assert obtener_mapa_nombres(df_sust) is mapa, "El mapa debe construirse una sola vez"
+
+    assert mapa.resolver("PARACETAMOL CROCIN 500 TABLETA") == "crocin 500 tablet"
+    assert mapa.resolver("aze 500 tablet") == "azée 500 tablet"
+    assert mapa.map_en["aze 500 tablet"] == "azée 500 tablet"
+    assert obtener_nombre_espanol("Crocin 500 Tablet", mapa) == "paracetamol crocin 500 tableta"
+    assert obtener_nombre_espanol("Otro", mapa.map_es) == "Otro"
+    assert mapa.nombre_comercial_es("Crocin 500 Tablet") == "Paracetamol Crocin 500 Tableta"
+    assert mapa.nombre_comercial_es("Azée") == "Azitromicina 500 Tableta"
+    assert mapa.nombre_comercial_es("Dolo 650") == "Dolo 650"
+
+def test_indice_composiciones_exactas():
+    """Test del índice de composiciones: búsqueda exacta sin modificar df_info y serializable"""
+    import pickle
+    from Modelo.MotorInferencia.indice_composiciones import IndiceComposiciones
+
+    df_info = pd.DataFrame({
+        "medicamento": ["A", "B", "C"],
+        "composicion": ["Amoxycillin (500mg) + Clavulanic Acid (125mg)", "Amoxycillin (500 mg)", "Amoxycillin (500mg)"],
+    })
+    columnas = list(df_info.columns)
+    indice = IndiceComposiciones(df_info)
+
+    assert list(df_info.columns) == columnas, "df_info no debe modificarse"
+    assert indice.buscar_exacta("amoxycillin 500mg") == [1, 2]
+    assert indice.buscar_exacta("amoxycillin 500mg clavulanic acid 125mg") == [0]
+    assert indice.num_componentes == (2, 1, 1)
+    with pytest.raises(TypeError):
+        indice.exactas["x"] = (0,)
+    copia = pickle.loads(pickle.dumps(indice))
+    assert copia.buscar_exacta("amoxycillin 500mg") == [1, 2]
+
+def test_palabras_clave_con_indice(datos_reales):
+    """Test de la búsqueda por palabras clave con el índice invertido de nombre y composición"""
+    import re
+    from Modelo.MotorInferencia.indice_palabras import obtener_indice_palabras
+
+    df_info = datos_reales['df_info']
+    indice = obtener_indice_palabras(df_info)
+    for kws in (["amoxycillin", "clavulanic", "acid"], ["500mg"], ["tablet"], ["inexistentexyz"]):
+        mask = pd.Series(True, index=df_info.index)
+        for k in kws:
+            pat = rf"\b{re.escape(k)}\b"
+            mask &= (df_info["medicamento"].str.lower().str.contains(pat, na=False) |
+                     df_info["composicion"].str.lower().str.contains(pat, na=False))
+        assert indice.buscar(kws) == [i for i, m in enumerate(mask) if m], kws
+
+def test_tabla_componentes():
+    """Test del parser de composiciones y de la tabla de componentes por ingrediente"""
+    from Modelo.MotorInferencia.tabla_componentes import parsear_composicion, obtener_tabla_componentes, DESCONOCIDO
+
+    assert parsear_composicion("Amoxicilina (500 mg) + Ácido Clavulánico (125mg)") == [
+        ("amoxicilina", 500.0, "mg"), ("ácido clavulánico", 125.0, "mg")]
+    assert parsear_composicion("vitamina b6 (piridoxina) (10 mg) + mentol (na)") == [
+        ("vitamina b6", 10.0, "mg"), ("mentol", None, "")]
+
+    df_info = pd.DataFrame({
+        "medicamento": ["A", "B", "C", "D"],
+        "composicion": ["Amoxicilina (500 mg) + Acido clavulanico (125 mg)", "amoxicilina (0.5 g)", "Paracetamol (500mg)", None],
+    })
+    tabla = obtener_tabla_componentes(df_info)
+    amox = tabla.id_ingrediente("Amoxicilina")
+    assert tabla.principal[0] == tabla.principal[1] == amox
+    assert tabla.principal[3] == -1 and tabla.id_ingrediente("ibuprofeno") == DESCONOCIDO
+    assert tabla.medicamentos_con(amox).tolist() == [0, 1]
+    assert tabla.contiene_ingrediente(0, tabla.id_ingrediente("ácido clavulánico"))
+    assert tabla.num_componentes.tolist() == [2, 1, 1, 1]
+    assert tabla.dosis_equivalente(1, 1) and not tabla.dosis_equivalente(0, 1)
+    assert tabla.firma_dosis(1) == ((amox, 500.0, "mg"),)
+
+def test_matriz_alergenos_bitset():
+    """Test del bitset de alérgenos por medicamento: mismo resultado que buscar cada alérgeno en la composición"""
+    from Modelo.ReglasClinicas.detector_alergenos import DetectorAlergenos
+    from Modelo.MotorInferencia.matriz_alergenos import MatrizAlergenos
+
+    alergenos = ["penicilina", "amoxicilina", "sulfa", "ibuprofeno"] + [f"alergeno{i}" for i in range(10)]
+    detector = DetectorAlergenos(alergenos)
+    df_info = pd.DataFrame({"composicion": [
+        "Amoxicilina (500 mg) + Acido clavulanico (125 mg)", "Sulfametoxazol (800 mg)", None, "Ibuprofeno (400 mg)", "alergeno9 (1 mg)"]})
+    matriz = MatrizAlergenos(df_info, detector)
+
+    for i, a in enumerate(alergenos):
+        esperado = df_info["composicion"].str.lower().str.contains(a, regex=False, na=False).to_numpy()
+        assert (matriz.contiene(i) == esperado).all(), a
+    assert matriz.con_alergenos([0, 2]).tolist() == [False, True, False, False, False]
+    assert matriz.con_alergenos([1, 13], posiciones=[0, 3, 4]).tolist() == [True, False, True]
+    assert not matriz.con_alergenos([]).any()
+
+def test_familias_alergenicas_desde_csv(tmp_path):
+    """Test de las familias alergénicas cargadas como datos: misma regla de subcadena que antes"""
+    from Modelo.ReglasClinicas.familias_alergenicas import cargar_familias, obtener_tabla_familias
+    from Modelo.ReglasClinicas.reglas_apoyo import misma_familia, FAMILIAS_ALERGENICAS
+
+    assert FAMILIAS_ALERGENICAS["penicilina"][0] == "amoxicilina"
+    assert misma_familia("amoxicilina", "ampicilina")
+    assert misma_familia("cilina", "penicilina")
+    assert not misma_familia("amoxicilina", "cefalexina")
+    assert not misma_familia("amoxicilina", "amoxicilina (500 mg)")
+
+    ruta = tmp_path / "familias.csv"
+    ruta.write_text("familia,componente\nquinolonas,ciprofloxacino\nquinolonas,levofloxacino\n", encoding="utf-8")
+    familias = cargar_familias(ruta)
+    assert familias == {"quinolonas": ["ciprofloxacino", "levofloxacino"]}
+    assert misma_familia("ciprofloxacino", "levofloxacino", familias)
+    assert obtener_tabla_familias(familias).familias_de("floxacino") == ["quinolonas"]
+
+def test_cache_consultas(datos_reales):
+    """Test de la caché de consultas: aciertos, misma respuesta, caducidad e invalidación por versión"""
+    from Controlador.main import procesar_medicamento
+    from Modelo.MotorInferencia.cache_consultas import CacheConsultas
+
+    reloj = [0.0]
+    cache = CacheConsultas(max_entradas=4, ttl=60, reloj=lambda: reloj[0])
+    args = ("Augmentin 625 Duo Tablet", "Paciente con tos. Alergia a penicilina", "neumonía")
+
+    sin_cache = procesar_medicamento(*args, datos_reales, "alergia", cache=None)
+    primera = procesar_medicamento(*args, datos_reales, "alergia", cache=cache)
+    segunda = procesar_medicamento(" augmentin 625 duo tablet", "Tos seca. Alergia a penicilina", "neumonía",
+                                   datos_reales, "alergia", cache=cache)
+    assert primera == segunda == sin_cache
+    assert (cache.aciertos, cache.fallos) == (1, 1)
+
+    segunda["sustitutos"].clear()
+    assert procesar_medicamento(*args, datos_reales, "alergia", cache=cache) == sin_cache
+
+    reloj[0] = 120
+    procesar_medicamento(*args, datos_reales, "alergia", cache=cache)
+    assert cache.caducadas == 1
+
+    assert cache.obtener(("otra consulta",), ("otra version", 0)) is None
+    assert cache.invalidaciones == 1 and cache.estadisticas()["entradas"] == 0
+
+def test_memoria_resoluciones(datos_reales, tmp_path):
+    """Test de la memoria de resoluciones: aciertos, entradas no encontradas, etapas y persistencia"""
+    from Modelo.MotorInferencia.memoria_resoluciones import MemoriaResoluciones
+    from Modelo.MotorInferencia.Motor_inferencia import ETAPAS_RESOLUCION
+
+    df_info, df_sust = datos_reales['df_info'], datos_reales['df_sust']
+    memoria = MemoriaResoluciones(df_info, df_sust)
+    nombre = df_info["medicamento"].iloc[0]
+
+    primera = memoria.resolver(nombre, ETAPAS_RESOLUCION)
+    assert primera is not None and memoria.resolver(f"  {nombre.upper()} ", ETAPAS_RESOLUCION) == primera
+    assert memoria.resolver("zzqx inexistente", ETAPAS_RESOLUCION) is None
+    assert memoria.resolver("ZZQX inexistente", ETAPAS_RESOLUCION) is None
+    stats = memoria.estadisticas()
+    assert (stats["aciertos"], stats["fallos"]) == (2, 2)
+    assert stats["etapas"]["no_encontrado"]["consultas"] == 2
+    assert sum(e["resueltos"] for e in stats["etapas"].values()) == 1
+
+    ruta = tmp_path / "resoluciones.json"
+    memoria.guardar(ruta)
+    nueva = MemoriaResoluciones(df_info, df_sust)
+    assert nueva.cargar(ruta) == 2
+    assert nueva.resolver(nombre, []) == primera
+    assert nueva.resolver("zzqx inexistente", []) is None
+
+    # La memoria registrada sigue siendo la misma aunque se creen muchas otras
+    from Modelo.MotorInferencia.memoria_resoluciones import obtener_memoria_resoluciones
+    registrada = obtener_memoria_resoluciones(df_info, df_sust)
+    otras = [obtener_memoria_resoluciones(df_info.head(i), df_sust) for i in range(1, 12)]
+    assert obtener_memoria_resoluciones(df_info, df_sust) is registrada
+    assert registrada not in otras
+    assert obtener_memoria_resoluciones(df_info, df_sust.copy()) is not registrada
+
+def test_servidor_inferencia(datos_reales, monkeypatch):
+    """Test del servicio HTTP: /health, /resolve y /substitute con la misma respuesta que procesar_medicamento"""
+    import asyncio
+    import json
+    import urllib.request
+    import urllib.error
+    from concurrent.futures import ThreadPoolExecutor
+    from Controlador import servidor
+    from Controlador.main import procesar_medicamento
+
+    monkeypatch.setattr(servidor, "_DATOS", datos_reales)
+    consulta = {"medicamento": "Augmentin 625 Duo Tablet", "notas": "Alergia a penicilina",
+                "diagnostico": "neumonía", "razon": "alergia"}
+    esperado = json.loads(servidor.a_json(procesar_medicamento(
+        consulta["medicamento"], consulta["notas"], consulta["diagnostico"], datos_reales, "alergia", cache=None)))
+
+    def pedir(puerto, ruta, cuerpo=None):
+        datos = None if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}{ruta}", data=datos, timeout=30) as r:
+                return r.status, json.loads(r.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    async def escenario():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            servicio = await servidor.ServidorInferencia(datos_reales, executor).iniciar("127.0.0.1", 0)
+            puerto = servicio.sockets[0].getsockname()[1]
+            loop = asyncio.get_running_loop()
+            async with servicio:
+                return [await loop.run_in_executor(None, pedir, puerto, *args) for args in (
+                    ("/health",),
+                    ("/resolve?medicamento=Augmentin%20625%20Duo%20Tablet",),
+                    ("/substitute", consulta),
+                    ("/substitute", {"medicamento": "Augmentin"}),
+                    ("/no-existe",),
+                )]
+
+    salud, resuelto, sustitucion, incompleta, desconocida = asyncio.run(escenario())
+    assert salud[0] == 200 and salud[1]["medicamentos"] == len(datos_reales["df_info"])
+    assert salud[1]["trabajadores"] == "hilos" and "cache" in salud[1]
+    assert resuelto[0] == 200 and resuelto[1]["medicamento_en"].lower() == "augmentin 625 duo tablet"
+    assert sustitucion == (200, esperado)
+    assert incompleta[0] == 400 and desconocida[0] == 404
+
+def test_servidor_con_procesos(datos_reales, tmp_path):
+    """Test del servicio con un pool de procesos: /health sin la caché del servidor y resoluciones de los trabajadores"""
+    import asyncio
+    import json
+    import urllib.request
+    from Controlador import servidor
+    from Modelo.MotorInferencia.memoria_resoluciones import MemoriaResoluciones, guardar_con_parciales
+
+    ruta = tmp_path / "resoluciones_medicamentos.json"
+    consulta = {"medicamento": "Augmentin 625 Duo Tablet", "notas": "", "diagnostico": "neumonía"}
+
+    def pedir(puerto, ruta_http, cuerpo=None):
+        datos = None if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}{ruta_http}", data=datos, timeout=60) as r:
+            return r.status, json.loads(r.read())
+
+    async def escenario():
+        with servidor.crear_executor(procesos=1, usar_snapshot=False, ruta_memoria=ruta) as executor:
+            servicio = await servidor.ServidorInferencia(datos_reales, executor).iniciar("127.0.0.1", 0)
+            puerto = servicio.sockets[0].getsockname()[1]
+            loop = asyncio.get_running_loop()
+            async with servicio:
+                return [await loop.run_in_executor(None, pedir, puerto, *args)
+                        for args in (("/health",), ("/substitute", consulta))]
+
+    salud, sustitucion = asyncio.run(escenario())
+    assert salud[0] == 200 and salud[1]["trabajadores"] == "procesos" and "cache" not in salud[1]
+    assert sustitucion[0] == 200
+
+    # El trabajador dejó sus resoluciones en un archivo parcial que se une al guardar
+    parciales = list(tmp_path.glob("resoluciones_medicamentos.*.json"))
+    assert len(parciales) == 1
+    memoria = MemoriaResoluciones(datos_reales['df_info'], datos_reales['df_sust'])
+    guardar_con_parciales(memoria, ruta)
+    assert not list(tmp_path.glob("resoluciones_medicamentos.*.json"))
+    assert memoria.resolver("Augmentin 625 Duo Tablet", []) is not None
+    assert MemoriaResoluciones(datos_reales['df_info'], datos_reales['df_sust']).cargar(ruta) >= 1
+
+def test_union_med_por_partes(tmp_path):
+    """Test de la construcción de medicamentos_info.csv: unión por partes y columnas agrupadas"""
+    from Modelo.BaseConocimiento.union_med import construir_medicamentos_info
+
+    (tmp_path / "drug.csv").write_text(
+        "nombre_medicamento,composicion,usos,efectos_secundarios,review_excelente\n"
+        "b tab,ibuprofeno (400 mg),dolor,nauseas,30\n"
+        "a tab,paracetamol (500 mg),fiebre,ninguno,40\n"
+        "c tab,,tos,ninguno,10\n", encoding="utf-8")
+    (tmp_path / "medicine.csv").write_text(
+        "name,substitute0,sideEffect0_es,sideEffect1_es,use0_es,use1_es,Chemical Class_es,Therapeutic Class_es\n"
+        "a tab,x,nausea,,fever,pain,anilides,pain\n"
+        "z tab,y,rash,,,,,\n"
+        "c tab,y,rash,,,,,\n"
+        "b tab,y,,vomiting,,pain,,pain\n", encoding="utf-8")
+
+    df = construir_medicamentos_info(tmp_path / "drug.csv", tmp_path / "medicine.csv",
+                                     tmp_path / "info.csv", filas_lectura=2)
+    assert df["medicamento"].tolist() == ["a tab", "b tab"]
+    assert df["efectos_secundarios_detallados"].tolist() == ["nausea", "vomiting"]
+    assert df["usos_clinicos_ext"].tolist() == ["fever, pain", "pain"]
+    assert df["clase terapeutica"].tolist() == ["pain", "pain"]
+    assert pd.read_csv(tmp_path / "info.csv")["review_excelente"].tolist() == [40, 30]
+
+def test_construccion_incremental(tmp_path):
+    """Test de la construcción incremental: mismas salidas que desde cero y solo se procesan filas cambiadas"""
+    from Modelo.BaseConocimiento.construccion_incremental import ConstruccionIncremental
+
+    origen = tmp_path / "dataset_traduccion"
+    origen.mkdir()
+    (origen / "drug_dataset_traducido.csv").write_text(
+        "nombre_medicamento,composicion,usos,efectos_secundarios,review_excelente\n"
+        "B Tab,Ibuprofeno (400 mg),Dolor,Náuseas,30\n"
+        "A Tab,Paracetamol (500 mg),Fiebre,Ninguno,40\n", encoding="utf-8")
+    columnas = ["name", "name_es"] + [f"substitute{i}" for i in range(5)] + [f"substitute{i}_es" for i in range(5)]
+    filas = [["a tab", "a tableta"] + ["x"] * 10, ["b tab", "b tableta"] + ["y"] * 10]
+    medicine = pd.DataFrame(filas, columns=columnas)
+    medicine["sideEffect0_es"] = ["Mareo", "Vómito"]
+    medicine["use0_es"] = ["Fiebre", "Dolor"]
+    medicine["Chemical Class_es"] = ["Anilidas", None]
+    medicine["Therapeutic Class_es"] = ["Dolor", "Dolor"]
+    medicine.to_csv(origen / "medicine_dataset_traducidoF.csv", index=False)
+    (origen / "clinical_data_traducido.csv").write_text(
+        "notas_clinicas,diagnosticos,medicamentos\nDolor intenso,Migraña,A Tab\n", encoding="utf-8")
+
+    resumen = dict(ConstruccionIncremental(tmp_path).ejecutar(actualizar_snapshot=False))
+    assert resumen["union_med"].startswith("2 filas procesadas")
+    info = pd.read_csv(tmp_path / "BaseConocimiento" / "medicamentos_info.csv")
+    assert info["medicamento"].tolist() == ["a tab", "b tab"]
+    assert info["efectos_secundarios_detallados"].tolist() == ["mareo", "vomito"]
+
+    assert dict(ConstruccionIncremental(tmp_path).ejecutar(actualizar_snapshot=False))["union_med"] == "sin cambios"
+
+    medicine.loc[1, "sideEffect0_es"] = "Cefalea"
+    medicine.to_csv(origen / "medicine_dataset_traducidoF.csv", index=False)
+    resumen = dict(ConstruccionIncremental(tmp_path).ejecutar(actualizar_snapshot=False))
+    assert resumen["normalizacion_medicine_data_limpio"].startswith("1 filas procesadas, 1 reutilizadas, 1 eliminadas")
+    assert resumen["normalizacion_drug_data"] == "sin cambios"
+    incremental = (tmp_path / "BaseConocimiento" / "medicamentos_info.csv").read_bytes()
+
+    ConstruccionIncremental(tmp_path, completa=True).ejecutar(actualizar_snapshot=False)
+    assert (tmp_path / "BaseConocimiento" / "medicamentos_info.csv").read_bytes() == incremental
+    assert b"cefalea" in incremental
+    assert pd.read_csv(tmp_path / "ReglasClinicas" / "posibles_alergenos.csv")["posibles_alergenos"].tolist() == [
+        "ibuprofeno", "paracetamol"]
+
+def test_normalizacion_vectorizada():
+    """Test de la normalización vectorizada: mismo resultado que normalizar_texto celda a celda"""
+    from Modelo.dataset.normalizacion_limpieza import normalizar_texto, normalizar_dataframe
+
+    valores = ["Ácido Clavulánico", "  NIÑO ", "Straße", "N/A", "-", " ", "naïve œuf", "İbuprofeno",
+               "漢字 ok", None, float("nan"), "Ácido Clavulánico"]
+    df = pd.DataFrame({"texto": valores, "otro": list(reversed(valores)), "numero": range(len(valores))})
+
+    esperado = df.copy()
+    for col in ("texto", "otro"):
+        esperado[col] = esperado[col].apply(normalizar_texto)
+    esperado = esperado.replace(["na", "n/a", "-", ""], pd.NA)
+
+    resultado = normalizar_dataframe(df, ["texto", "otro"])
+    assert resultado.to_csv(index=False) == esperado.to_csv(index=False)
+    assert resultado["texto"].tolist()[:3] == ["acido clavulanico", "nino", "strae"]
+
+def test_traductor_por_lotes_con_cache(tmp_path):
+    """Test del traductor por lotes: la caché SQLite evita volver a traducir lo ya visto"""
+    from Modelo.dataset_traduccion.traductor import Traductor, TraductorDiccionario, CacheTraducciones
+
+    class BackendConFallo(TraductorDiccionario):
+        def traducir_lote(self, textos):
+            if "fallo" in textos:
+                raise RuntimeError("sin conexión")
+            return super().traducir_lote(textos)
+
+    backend = BackendConFallo({"Headache": "Dolor de cabeza", "Nausea": "Náuseas", "Fever": "Fiebre"})
+    ruta = tmp_path / "traducciones.sqlite"
+    traductor = Traductor(backend, CacheTraducciones(str(ruta)), tam_lote=2, concurrencia=2)
+
+    df = pd.DataFrame({"sideEffect0": ["Headache", "Nausea", None, "Headache", "fallo"]})
+    traductor.traducir_columna(df, "sideEffect0")
+    assert df["sideEffect0_es"].tolist()[:4] == ["Dolor de cabeza", "Náuseas", None, "Dolor de cabeza"]
+    assert df["sideEffect0_es"].iloc[4] == "[Error]"
+    assert traductor.estadisticas["errores"] == 1 and traductor.estadisticas["traducidos"] == 2
+    assert len(traductor.cache) == 2
+    traductor.cache.cerrar()
+
+    # Nueva ejecución: solo se envían los textos no vistos y el que falló
+    backend = BackendConFallo(backend.diccionario)
+    traductor = Traductor(backend, CacheTraducciones(str(ruta)), tam_lote=50)
+    traducciones = traductor.traducir(["Nausea", "Headache", "Fever", "Fever", "fallo"])
+    assert traducciones["Fever"] == "Fiebre" and traducciones["Nausea"] == "Náuseas"
+    assert traductor.estadisticas["en_cache"] == 2
+    assert backend.textos == 1 and traductor.estadisticas["errores"] == 1
+    assert len(traductor.cache) == 3
+    traductor.cache.cerrar()
+
+def test_almacen_terminos_entre_columnas(tmp_path):
+    """Test del almacén global: cada texto distinto se traduce una vez entre columnas y scripts"""
+    from Modelo.dataset_traduccion.traductor import Traductor, TraductorDiccionario, CacheTraducciones
+
+    backend = TraductorDiccionario({"Headache": "Dolor de cabeza", "Nausea": "Náuseas",
+                                    "Migraine": "Migraña", "Ibuprofen": "Ibuprofeno"})
+    traductor = Traductor(backend, CacheTraducciones(str(tmp_path / "traducciones.sqlite")))
+
+    medicine = pd.DataFrame({"sideEffect0": ["Headache", "Nausea", "Headache"],
+                             "sideEffect1": ["Nausea", None, "Headache"],
+                             "use0": ["Headache", "Migraine", None]})
+    traductor.traducir_columnas(medicine, ["sideEffect0", "sideEffect1", "use0"])
+    assert medicine["sideEffect1_es"].tolist()[::2] == ["Náuseas", "Dolor de cabeza"]
+    assert backend.lotes == 1 and backend.textos == 3
+    e = traductor.estadisticas
+    assert (e["celdas"], e["distintos_por_columna"], e["solicitados"], e["traducidos"]) == (7, 6, 3, 3)
+
+    # Otro script (clínico) con listas separadas por comas: solo se traduce lo no visto
+    clinico = pd.DataFrame({"diagnoses": ["Migraine, Nausea", None], "medications": ["Ibuprofen", "Ibuprofen,Headache"]})
+    traductor.traducir_columnas(clinico, {"diagnoses": "diagnosticos", "medications": "medicamentos"},
+                                listas=("diagnoses", "medications"))
+    assert clinico["diagnosticos"].tolist()[0] == "Migraña, Náuseas"
+    assert clinico["medicamentos"].tolist() == ["Ibuprofeno", "Ibuprofeno, Dolor de cabeza"]
+    assert backend.textos == 4 and traductor.estadisticas["en_cache"] == 3
+    assert "factor de ahorro 3.0x" in traductor.resumen()
+    traductor.cache.cerrar()
+
+def test_indices_no_retienen_dataframes():
+    """Test de los registros de índices y mapas: al borrar el DataFrame se liberan con sus derivados"""
+    import gc
+    import weakref
+    from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+    from Modelo.MotorInferencia.tabla_componentes import obtener_tabla_componentes
+    from Modelo.MotorInferencia.indice_usos import obtener_indice_usos
+    from Modelo.MotorInferencia.mapa_nombres import obtener_mapa_nombres
+
+    referencias = []
+    for i in range(3):
+        df_info = pd.DataFrame({"medicamento": [f"med {i}"], "composicion": ["paracetamol (500 mg)"],
+                                "usos": ["dolor"], "clase terapeutica": ["pain analgesics"]})
+        indice = obtener_indice(df_info)
+        assert obtener_indice(df_info) is indice
+        obtener_tabla_componentes(df_info)
+        obtener_indice_usos(df_info)
+        assert obtener_indice(df_info.copy()) is not indice, "Una copia no comparte el índice"
+        df_sust = pd.DataFrame({"medicamento_en": [f"med {i}"], "medicamento_principal": [f"medicamento {i}"]})
+        mapa = obtener_mapa_nombres(df_sust)
+        assert obtener_mapa_nombres(df_sust) is mapa
+        referencias += [weakref.ref(df_info), weakref.ref(indice), weakref.ref(df_sust), weakref.ref(mapa)]
+        del df_info, indice, df_sust, mapa
+
+    gc.collect()
+    assert all(ref() is None for ref in referencias)
+
+def test_detector_alergenos_concurrente():
+    """Test de la caché del detector compartida entre hilos: sin errores y con el tamaño acotado"""
+    from concurrent.futures import ThreadPoolExecutor
+    from Modelo.ReglasClinicas.detector_alergenos import DetectorAlergenos
+
+    detector = DetectorAlergenos(["penicilina", "sulfa"], max_cache=4)
+    textos = [f"alergia a penicilina {i % 7}" for i in range(4000)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        resultados = list(pool.map(detector.contenidos, textos))
+
+    assert all(r == [0] for r in resultados)
+    assert len(detector._cache) <= 4
+
+    # Registro global: muchas listas distintas pedidas a la vez desde varios hilos
+    from Modelo.ReglasClinicas.detector_alergenos import obtener_detector
+    listas = [["penicilina", f"alergeno {i % 12}"] for i in range(600)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        detectores = list(pool.map(obtener_detector, listas))
+    assert all(d.alergenos == lista for d, lista in zip(detectores, listas))
+
+def test_composiciones_sin_dato_al_final():
+    """Test de las filas sin composición: 0 componentes y nunca antes que un producto real"""
+    from Modelo.MotorInferencia.indice_composiciones import IndiceComposiciones
+    from Modelo.MotorInferencia.Motor_inferencia import etapa_palabras_clave
+
+    df_info = pd.DataFrame({
+        "medicamento": ["Crocin Cold", "Crocin Pain", "Crocin 500 Tablet", "Crocin Duo"],
+        "composicion": [None, " ", "paracetamol (500mg)", "paracetamol (500mg) + cafeina (50mg)"],
+    })
+    indice = IndiceComposiciones(df_info)
+    assert indice.num_componentes == (0, 0, 1, 2)
+
+    pos, med_act_en, _ = etapa_palabras_clave("crocin", df_info, None)
+    assert (pos, med_act_en) == (2, "Crocin 500 Tablet")
+
+def test_resolvedor_una_construccion_entre_hilos(monkeypatch):
+    """Test del resolvedor: varios hilos a la vez lo construyen una sola vez y sigue al DataFrame"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from Modelo.MotorInferencia import resolvedor_nombres
+
+    construcciones = []
+    original = resolvedor_nombres.nombres_catalogo
+
+    def catalogo_lento(df_info, df_sust=None):
+        construcciones.append(1)
+        time.sleep(0.05)
+        return original(df_info, df_sust)
+
+    monkeypatch.setattr(resolvedor_nombres, "nombres_catalogo", catalogo_lento)
+    df_info = pd.DataFrame({"medicamento": ["Azithral 500 Tablet", "Crocin 500 Tablet"]})
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        resolvedores = list(pool.map(lambda _: resolvedor_nombres.obtener_resolvedor(df_info), range(8)))
+
+    assert len(construcciones) == 1 and all(r is resolvedores[0] for r in resolvedores)
+    df_sust = pd.DataFrame({"medicamento_en": ["Crocin 500 Tablet"], "medicamento_principal": ["Crocin Tableta"]})
+    assert resolvedor_nombres.obtener_resolvedor(df_info, df_sust) is not resolvedores[0]
+    assert resolvedor_nombres.obtener_resolvedor(df_info.copy()) is not resolvedores[0]
+
+def test_traductor_lote_con_marcas():
+    """Test de los lotes con marcas numeradas: si no vuelven intactas se traduce texto por texto"""
+    from Modelo.dataset_traduccion.traductor import TraductorGoogle, unir_lote, separar_lote
+
+    diccionario = {"Headache": "Dolor de cabeza", "Nausea": "Náuseas", "Fever": "Fiebre", "see [[1]] note": "ver nota [[1]]"}
+
+    class GoogleSimulado:
+        """Traduce línea a línea; con unir=True junta los dos primeros textos en uno (pierde una marca)"""
+        def __init__(self, unir=False):
+            self.unir = unir
+            self.peticiones = []
+
+        def translate(self, texto):
+            self.peticiones.append(texto)
+            lineas = []
+            for linea in texto.split("\n"):
+                marca, _, resto = linea.rpartition("]] ") if linea.startswith("[[") else ("", "", linea)
+                lineas.append(f"{marca}]] {diccionario.get(resto, resto)}" if marca else diccionario.get(resto, resto))
+            if self.unir and len(lineas) > 2:
+                lineas[0:2] = [lineas[0] + " y " + lineas[1].split("]] ", 1)[1]]
+                lineas.append("[[9]] extra")
+            return "\n".join(lineas)
+
+    assert separar_lote(GoogleSimulado().translate(unir_lote(["Headache", "Nausea"])), 2) == ["Dolor de cabeza", "Náuseas"]
+    assert separar_lote("[[0]] a\n[[2]] b\n[[1]] c", 3) is None
+
+    google = TraductorGoogle(pausa=0)
+    google._traductor = GoogleSimulado()
+    assert google.traducir_lote(["Headache", "Nausea", "Fever"]) == ["Dolor de cabeza", "Náuseas", "Fiebre"]
+    assert len(google._traductor.peticiones) == 1
+
+    # Un texto que contiene una marca: el lote se traduce texto por texto
+    google._traductor = GoogleSimulado()
+    assert google.traducir_lote(["Headache", "see [[1]] note"]) == ["Dolor de cabeza", "ver nota [[1]]"]
+    assert google._traductor.peticiones == ["Headache", "see [[1]] note"]
+
+    # El traductor une dos textos y añade otra marca: el número de partes coincide, pero se detecta
+    google._traductor = GoogleSimulado(unir=True)
+    assert google.traducir_lote(["Headache", "Nausea", "Fever"]) == ["Dolor de cabeza", "Náuseas", "Fiebre"]
+    assert len(google._traductor.peticiones) == 4
@@ -3,7 +3,7 @@ import pandas as pd
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 from os.path import dirname, abspath
 
 # Configuración de rutas 
@@ -16,8 +16,13 @@ from Modelo.MotorInferencia.Motor_inferencia import (
     score_sustituto, 
     obtener_efectos,
     procesar_medicamento_actual,
-    buscar_alternativas
+    buscar_alternativas,
+    obtener_contexto
 )
+from Modelo.MotorInferencia.indice_medicamentos import obtener_indice
+from Modelo.MotorInferencia.preparacion_datos import preparar_datos
+from Modelo.MotorInferencia.cache_consultas import CacheConsultas
+from Modelo.MotorInferencia.memoria_resoluciones import cargar_resoluciones, ruta_resoluciones, resumen_etapas
 
 
 class SistemaMedicamentosGUI:
@@ -31,6 +36,15 @@ class SistemaMedicamentosGUI:
         self.datos = None
         self.resultado_actual = None
         self.tiempos = []
+        self.cache_consultas = CacheConsultas()
+        self.rutas = None
+        self.memoria_resoluciones = None
+
+        # Un único trabajador para el procesamiento: cada consulta nueva recibe una
+        # generación mayor y los resultados de generaciones anteriores se descartan
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="procesamiento")
+        self.generacion = 0
+        self.futuro = None
         
         # Configurar estilos
         self.configurar_estilos()
@@ -238,8 +252,9 @@ class SistemaMedicamentosGUI:
             self.progress.start()
             
             # Cargar datos
-            self.datos = cargar_datos(configurar_rutas())
-            self.datos['lista_alergenos'] = [self.limpiar_y_convertir(a) for a in self.datos['lista_alergenos']]
+            self.rutas = configurar_rutas()
+            self.datos = cargar_datos(self.rutas)
+            self.memoria_resoluciones = cargar_resoluciones(self.datos, self.rutas)
             
             self.progress.stop()
             self.status_label.config(text="Sistema listo - Datos cargados correctamente")
@@ -283,44 +298,64 @@ class SistemaMedicamentosGUI:
         return True
     
     def procesar_medicamento_thread(self):
-        """Ejecuta el procesamiento en un hilo separado"""
-        # Deshabilitar botón durante procesamiento
-        self.btn_procesar.config(state='disabled')
+        """Envía la consulta al trabajador de procesamiento, reemplazando la que estuviera en curso"""
         self.progress.start()
         self.status_label.config(text="Procesando medicamento...")
-        
-        # Ejecutar en hilo separado
-        thread = Thread(target=self.procesar_medicamento_logica)
-        thread.daemon = True
-        thread.start()
-    
-    def procesar_medicamento_logica(self):
-        """Lógica principal de procesamiento"""
+
+        # El formulario se lee en el hilo de la interfaz; el trabajador solo recibe valores
+        self.generacion += 1
+        if self.futuro is not None:
+            self.futuro.cancel()  # si aún no empezó, no llega a ejecutarse
+        self.futuro = self.executor.submit(self.procesar_medicamento_logica,
+                                           self.leer_formulario(), self.generacion)
+
+    def leer_formulario(self):
+        """Valores del formulario: (medicamento, notas, diagnóstico, razón)"""
+        sintomas = self.entry_sintomas.get("1.0", tk.END).strip()
+        historia = self.entry_historia.get("1.0", tk.END).strip()
+        alergias = self.entry_alergias.get().strip() or "ninguna"
+        diagnostico = self.entry_diagnostico.get().strip()
+        medicamento = self.entry_medicamento.get().strip()
+        razon = self.var_motivo.get()
+
+        notas = f"Síntomas: {sintomas}\nHistoria: {historia}\nAlergias: {alergias}"
+        return medicamento, notas, diagnostico, razon
+
+    def procesar_medicamento_logica(self, formulario=None, generacion=None):
+        """
+        Lógica principal de procesamiento. Se ejecuta en el trabajador o, sin
+        argumentos, directamente con el formulario actual.
+        """
+        if generacion is None:
+            generacion = self.generacion
+        if formulario is None:
+            formulario = self.leer_formulario()
+        if generacion != self.generacion:
+            return  # ya hay una consulta más reciente
         try:
             t0 = time.perf_counter()
-            
-            # Obtener datos del formulario
-            sintomas = self.entry_sintomas.get("1.0", tk.END).strip()
-            historia = self.entry_historia.get("1.0", tk.END).strip()
-            alergias = self.entry_alergias.get().strip() or "ninguna"
-            diagnostico = self.entry_diagnostico.get().strip()
-            medicamento = self.entry_medicamento.get().strip()
-            razon = self.var_motivo.get()
-            
-            notas = f"Síntomas: {sintomas}\nHistoria: {historia}\nAlergias: {alergias}"
-            
+            medicamento, notas, diagnostico, razon = formulario
+
             # Procesar medicamento (usando tu función original)
             resultado = self.procesar_medicamento(medicamento, notas, diagnostico, self.datos, razon)
-            
-            t1 = time.perf_counter()
-            elapsed = t1 - t0
-            self.tiempos.append(elapsed)
-            
+
+            elapsed = time.perf_counter() - t0
+
             # Actualizar interfaz en el hilo principal
-            self.root.after(0, self.mostrar_resultados, resultado, elapsed)
-            
+            self.root.after(0, self.finalizar_procesamiento, generacion, resultado, elapsed)
+
         except Exception as e:
-            self.root.after(0, self.mostrar_error, str(e))
+            self.root.after(0, self.finalizar_procesamiento, generacion, None, None, str(e))
+
+    def finalizar_procesamiento(self, generacion, resultado, elapsed, error=None):
+        """Muestra el resultado de la consulta solo si sigue siendo la más reciente"""
+        if generacion != self.generacion:
+            return
+        if error is not None:
+            self.mostrar_error(error)
+            return
+        self.tiempos.append(elapsed)
+        self.mostrar_resultados(resultado, elapsed)
     
     def mostrar_resultados(self, resultado, tiempo_procesamiento):
         """Muestra los resultados en la interfaz"""
@@ -481,6 +516,13 @@ Componente Principal: {resultado['componente']}
         if len(self.tiempos) >= 2:
             promedio = sum(self.tiempos) / len(self.tiempos)
             stats_text += f"\n🔢 Tiempo promedio ({len(self.tiempos)} consultas): {promedio:.3f} segundos"
+
+        cache = self.cache_consultas.estadisticas()
+        if cache["aciertos"]:
+            stats_text += (f"\n🗃️ Caché de consultas: {cache['aciertos']} aciertos, "
+                           f"{cache['fallos']} fallos ({cache['tasa_aciertos']:.0%})")
+        if self.memoria_resoluciones is not None:
+            stats_text += f"\n🔎 Resolución por etapa: {resumen_etapas(self.memoria_resoluciones.estadisticas())}"
         
         ttk.Label(frame_stats, text=stats_text, font=('Arial', 10)).pack(anchor=tk.W)
     
@@ -591,9 +633,11 @@ Componente Principal: {resultado['componente']}
         self.entry_diagnostico.delete(0, tk.END)
         self.entry_medicamento.delete(0, tk.END)
         
-        # Resetear variables
+        # Resetear variables; el resultado de una consulta en curso ya no se mostrará
         self.var_motivo.set("alergia")
         self.resultado_actual = None
+        self.generacion += 1
+        self.progress.stop()
         
         # Limpiar resultados
         for widget in self.scrollable_resultados.winfo_children():
@@ -615,35 +659,23 @@ Componente Principal: {resultado['componente']}
     def salir(self):
         """Cierra la aplicación"""
         if messagebox.askokcancel("Salir", "¿Está seguro que desea salir del sistema?"):
+            if self.memoria_resoluciones is not None:
+                self.memoria_resoluciones.guardar(ruta_resoluciones(self.rutas))
+            self.executor.shutdown(wait=False, cancel_futures=True)
             self.root.quit()
     
-    # Métodos auxiliares (mantén tus funciones originales)
-    def limpiar_y_convertir(self, valor):
-        """Convierte valores a string y limpia NaN/None, manteniendo números como números"""
-        if pd.isna(valor):
-            return ""
-        try:
-            return float(valor) if str(valor).replace('.', '', 1).isdigit() else str(valor).strip()
-        except:
-            return str(valor).strip()
-    
-    def limpiar_dataframe(self, df):
-        """Limpia un dataframe manteniendo los tipos numéricos donde sea posible"""
-        for col in df.columns:
-            if df[col].dtype == object:  # Solo para columnas de texto
-                df[col] = df[col].apply(lambda x: self.limpiar_y_convertir(x))
-        return df
-
     def procesar_medicamento(self, med_input, notas, diagnostico, datos, razon=None):
         """
-        Procesa el medicamento considerando la razón (alergia/desabastecimiento)
+        Procesa el medicamento considerando la razón (alergia/desabastecimiento).
+        Las consultas repetidas se responden desde la caché de esta ventana.
         """
-        # Limpieza previa de datos manteniendo tipos numéricos
-        if 'df_info' in datos and hasattr(datos['df_info'], 'copy'):
-            datos['df_info'] = self.limpiar_dataframe(datos['df_info'])
-        if 'df_sust' in datos and hasattr(datos['df_sust'], 'copy'):
-            datos['df_sust'] = self.limpiar_dataframe(datos['df_sust'])
-        
+        # Los datos se preparan una sola vez al cargarlos; aquí solo se verifica la marca
+        preparar_datos(datos)
+        return self.cache_consultas.consultar(med_input, notas, diagnostico, datos, razon,
+                                              self.calcular_respuesta)
+
+    def calcular_respuesta(self, med_input, notas, diagnostico, datos, razon=None, contexto=None):
+        """Resuelve la consulta completa sin caché (datos ya preparados)"""
         # Obtener información del medicamento actual
         resultados = procesar_medicamento_actual(med_input, datos['df_sust'], datos['df_info'])
         
@@ -656,6 +688,9 @@ Componente Principal: {resultado['componente']}
         
         med_act_en, med_act_es, clase_act, review_act, composicion_act, comp_principal = resultados
         
+        # Notas, diagnóstico y alérgenos se analizan una sola vez para todos los candidatos
+        contexto = obtener_contexto(notas, diagnostico, datos['lista_alergenos'], contexto)
+
         # Obtener los pares de sustitutos
         sust_pairs = obtener_pares_sustitutos(med_act_en, datos['df_sust'])
         en_orden = []
@@ -666,7 +701,8 @@ Componente Principal: {resultado['componente']}
                 es_name, en_name, notas, 
                 diagnostico, clase_act, 
                 datos['lista_alergenos'], datos['df_info'],
-                razon  # Pasar la razón al evaluador
+                razon,  # Pasar la razón al evaluador
+                contexto
             )
             en_orden.append((en_name, score, just))
         
@@ -681,12 +717,12 @@ Componente Principal: {resultado['componente']}
         # Buscar alternativas adicionales
         alternativas = []
         if not validos:
-            fila_act = datos['df_info'][datos['df_info']["medicamento"].str.lower() == med_act_en.lower()].iloc[0]
+            fila_act = obtener_indice(datos['df_info']).fila_por_nombre(med_act_en)
             alternativas = buscar_alternativas(
                 clase_act, diagnostico, fila_act, 
                 med_act_en, sust_pairs, datos['df_info'], 
                 notas, datos['lista_alergenos'],
-                razon
+                razon, contexto
             )
         
         response = {
@@ -1,6 +1,7 @@
 import pandas as pd
 from Modelo.ReglasClinicas.reglas_apoyo import obtener_componente_principal, obtener_composicion
 from Modelo.MotorInferencia.Motor_inferencia import obtener_efectos
+from Modelo.MotorInferencia.mapa_nombres import obtener_mapa_nombres
 
 def mostrar_presentacion_inicial(notas, diagnostico, med_input):
     """Muestra los datos iniciales del paciente"""
@@ -38,19 +39,11 @@ def mostrar_resultado_final(composicion_act, med_act_es, clase_act, best_n, best
         f"Justificación: {best_j}"
     ]
 
-    # —> lookup del nombre comercial en español en el DataFrame de sustitutos
+    # —> nombre comercial en español desde el mapa bilingüe de df_sust
     nombre_comercial_es = best_n  # valor por defecto
 
     try:
-        fila_sust = df_sust[
-        df_sust["medicamento_en"].str.lower().str.contains(best_n.lower(), na=False)
-    ]
-        if not fila_sust.empty:
-            nombre_comercial_es = str(fila_sust.iloc[0]["medicamento_principal"]).strip()
-            if not nombre_comercial_es:
-                nombre_comercial_es = best_n
-        else:
-            nombre_comercial_es = best_n
+        nombre_comercial_es = obtener_mapa_nombres(df_sust).nombre_comercial_es(best_n)
     except Exception as e:
         print(f"⚠️ Error buscando nombre comercial: {e}")
         nombre_comercial_es = best_n
@@ -1,6 +1,8 @@
 import os
 import pandas as pd
 from pathlib import Path
+from Modelo.MotorInferencia.preparacion_datos import preparar_datos
+from Modelo.BaseConocimiento.snapshot import cargar_snapshot, guardar_snapshot
 
 def configurar_rutas():
     """Configura las rutas de los archivos CSV con verificación de existencia"""
@@ -39,16 +41,30 @@ def configurar_rutas():
         print("└── ... (otras carpetas del proyecto)")
         raise
 
-def cargar_datos(rutas):
-    """Carga los datos CSV con manejo de errores"""
+def cargar_datos(rutas, usar_snapshot=True):
+    """
+    Carga los datos de la base de conocimiento preparados para todas las consultas.
+    Si existe un snapshot binario vigente lo usa; si no, lee los CSV y lo regenera.
+    """
     try:
-        return {
+        if usar_snapshot:
+            datos = cargar_snapshot(rutas)
+            if datos is not None:
+                return datos
+
+        df_alerg = pd.read_csv(str(rutas['alergenos']))
+        datos = {
             'df_info': pd.read_csv(str(rutas['info'])),
             'df_sust': pd.read_csv(str(rutas['sustitutos'])),
-            'df_alerg': pd.read_csv(str(rutas['alergenos'])),
+            'df_alerg': df_alerg,
             'df_clinical': pd.read_csv(str(rutas['clinical'])),
-            'lista_alergenos': pd.read_csv(str(rutas['alergenos']))["posibles_alergenos"].tolist()
+            'lista_alergenos': df_alerg["posibles_alergenos"].tolist()
         }
+        preparar_datos(datos)
+
+        if usar_snapshot:
+            datos['version'] = guardar_snapshot(rutas, datos)
+        return datos
     except Exception as e:
         print(f"❌ Error cargando datos: {str(e)}")
         raise
\ No newline at end of file
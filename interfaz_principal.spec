@@ -5,7 +5,7 @@ a = Analysis(
     ['Vista\\interfaz_principal.py'],
     pathex=[],
     binaries=[],
-    datas=[('Modelo\\01Hechos\\clinical_data.csv', 'Modelo\\01Hechos'), ('Modelo\\BaseConocimiento\\medicamentos_info.csv', 'Modelo\\BaseConocimiento'), ('Modelo\\BaseConocimiento\\sustitutos_medicamentos.csv', 'Modelo\\BaseConocimiento'), ('Modelo\\ReglasClinicas\\posibles_alergenos.csv', 'Modelo\\ReglasClinicas')],
+    datas=[('Modelo\\01Hechos\\clinical_data.csv', 'Modelo\\01Hechos'), ('Modelo\\BaseConocimiento\\medicamentos_info.csv', 'Modelo\\BaseConocimiento'), ('Modelo\\BaseConocimiento\\sustitutos_medicamentos.csv', 'Modelo\\BaseConocimiento'), ('Modelo\\ReglasClinicas\\posibles_alergenos.csv', 'Modelo\\ReglasClinicas'), ('Modelo\\ReglasClinicas\\familias_alergenicas.csv', 'Modelo\\ReglasClinicas')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},